@@ -0,0 +1,174 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+build_cache.py
+~~~~~~~~~~~~~~
+
+On-disk cache of optimisation problems built as arrays, keyed by a hash of
+the model data and the definition of the model math, so that identical models
+are only built once. The least recently used entries are removed once the
+cache exceeds a given size.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from calliope._version import __version__
+from calliope.core.util import sparse_data
+
+logger = logging.getLogger(__name__)
+
+# Run configuration options which have no effect on the problem that is built
+_RUN_CONFIG_IGNORED = [
+    "build_cache_path",
+    "build_cache_max_size",
+    "save_logs",
+    "solver",
+    "solver_io",
+    "solver_options",
+]
+
+_CACHE_FILE_SUFFIX = ".npz"
+
+# Modules (in `calliope/backend`) which define the math of the problems built
+# as arrays, and so are part of the cache key
+_MATH_MODULES = [
+    "equation_parser.py",
+    "linear.py",
+    "sparse.py",
+    "subset_parser.py",
+    "subsets.py",
+    "vectorised.py",
+]
+
+
+def _to_json(obj):
+    return json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+
+
+def _update_with_array(key_hash, values):
+    values = np.asarray(values)
+    key_hash.update(f"{values.dtype.str}{values.shape}".encode("utf-8"))
+    if values.dtype.kind == "O":
+        values = pd.util.hash_array(values.ravel())
+    key_hash.update(np.ascontiguousarray(values).tobytes())
+
+
+def _math_hash():
+    # The constraint definitions are not part of the model data, so the source
+    # of the modules defining them is hashed, as the Calliope version is not
+    # changed by editing them (e.g. in a development install)
+    key_hash = hashlib.sha1(__version__.encode("utf-8"))
+    backend_dir = os.path.dirname(__file__)
+    for module_file in _MATH_MODULES:
+        with open(os.path.join(backend_dir, module_file), "rb") as f:
+            key_hash.update(f.read())
+    return key_hash.hexdigest()
+
+
+def model_data_hash(model_data):
+    """
+    Returns a hash of the values, coordinates and attributes of all variables
+    in `model_data`, of the model attributes which define the problem built
+    from it (run configuration, subsets and defaults), and of the source code
+    of the modules defining the constraints. Variables stored in long format
+    are not expanded.
+
+    """
+    key_hash = hashlib.sha1(_math_hash().encode("utf-8"))
+    run_config = {
+        k: v
+        for k, v in model_data.attrs["run_config"].items()
+        if k not in _RUN_CONFIG_IGNORED
+    }
+    for attr in [run_config, model_data.attrs["subsets"], model_data.attrs["defaults"]]:
+        key_hash.update(_to_json(attr))
+
+    for var_name in sorted(model_data.variables):
+        var = model_data[var_name].variable
+        key_hash.update(_to_json([var_name, var.dims, var.attrs]))
+        long_format_array = sparse_data.get_long_format_array(var)
+        if long_format_array is not None:
+            _update_with_array(key_hash, long_format_array.flat_index)
+            _update_with_array(key_hash, long_format_array.values)
+        else:
+            _update_with_array(key_hash, var.values)
+
+    return key_hash.hexdigest()
+
+
+def _cache_file(cache_path, key):
+    return os.path.join(cache_path, key + _CACHE_FILE_SUFFIX)
+
+
+def read_cached_build(cache_path, key):
+    """
+    Returns the arrays cached under `key` in `cache_path` as a dictionary,
+    or None if there is no such cache entry.
+
+    """
+    cache_file = _cache_file(cache_path, key)
+    try:
+        with np.load(cache_file, allow_pickle=False) as cached:
+            arrays = {k: cached[k] for k in cached.files}
+        # The modification time marks when an entry was last used
+        os.utime(cache_file)
+    except (OSError, ValueError):
+        return None
+    logger.debug(f"Loaded built problem from {cache_file}")
+    return arrays
+
+
+def write_cached_build(cache_path, key, arrays, max_size):
+    """
+    Cache `arrays` (a dictionary of NumPy arrays) under `key` in `cache_path`,
+    then remove the least recently used entries until the cache is no larger
+    than `max_size` megabytes.
+
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    cache_file = _cache_file(cache_path, key)
+    # Written under a temporary name and then renamed, so that an entry is only
+    # ever read once it is complete
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, cache_file)
+    logger.debug(f"Cached built problem in {cache_file}")
+    evict_cached_builds(cache_path, max_size)
+
+
+def evict_cached_builds(cache_path, max_size):
+    """
+    Remove the least recently used entries of the cache in `cache_path` until
+    it is no larger than `max_size` megabytes.
+
+    """
+    entries = []
+    for cached_file in os.listdir(cache_path):
+        if not cached_file.endswith(_CACHE_FILE_SUFFIX):
+            continue
+        cached_file = os.path.join(cache_path, cached_file)
+        try:
+            stat = os.stat(cached_file)
+        except OSError:  # e.g. removed by another process
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, cached_file))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, cached_file in sorted(entries):
+        if total_size <= max_size * 1e6:
+            break
+        try:
+            os.remove(cached_file)
+        except OSError:
+            continue
+        total_size -= size
+        logger.debug(f"Removed least recently used cached build {cached_file}")
@@ -28,7 +28,9 @@ from __future__ import annotations
 
 from typing import Callable, Any, Union, Optional, Iterator, Iterable
 from abc import ABC
+import functools
 import pyparsing as pp
+import numpy as np
 import pandas as pd
 
 from calliope.exceptions import BackendError
@@ -93,16 +95,17 @@ class EvalOperatorOperand(EvalString):
         val = self.value[0].eval(**eval_kwargs)
         for operator_, operand in self.operatorOperands(self.value[1:]):
             evaluated_operand = operand.eval(**eval_kwargs)
+            # Not in-place, as operands may be arrays
             if operator_ == "**":
                 val = val**evaluated_operand
             elif operator_ == "*":
-                val *= evaluated_operand
+                val = val * evaluated_operand
             elif operator_ == "/":
-                val /= evaluated_operand
+                val = val / evaluated_operand
             elif operator_ == "+":
-                val += evaluated_operand
+                val = val + evaluated_operand
             elif operator_ == "-":
-                val -= evaluated_operand
+                val = val - evaluated_operand
 
         return val
 
@@ -428,9 +431,12 @@ class EvalIndexItems(EvalString):
             and index_item_dict is not None
         ):
             index_item: str = index_item_dict[self.set_item][0].eval(**eval_kwargs)
-            if index_item not in eval_kwargs["backend_interface"].get_set(
-                self.set_name
-            ):
+            set_items = eval_kwargs["backend_interface"].get_set(self.set_name)
+            if isinstance(index_item, np.ndarray):  # one set item per subset member
+                is_valid = np.isin(index_item, set_items).all()
+            else:
+                is_valid = index_item in set_items
+            if not is_valid:
                 raise BackendError(
                     f"Index item `{self.set_item}` evaluates to a set item not found in `{self.set_name}`"
                 )
@@ -800,6 +806,7 @@ def foreach_parser() -> pp.ParserElement:
     return pp.Group(set_iterator + pp.Suppress(in_) + set_name)
 
 
+@functools.lru_cache(maxsize=None)
 def generate_index_item_parser():
     number, identifier = setup_base_parser_elements()
     unindexed_param = unindexed_param_parser(identifier)
@@ -817,6 +824,7 @@ def generate_index_item_parser():
     return helper_function | indexed_param | unindexed_param
 
 
+@functools.lru_cache(maxsize=None)
 def generate_arithmetic_parser():
     number, identifier = setup_base_parser_elements()
     unindexed_param = unindexed_param_parser(identifier)
@@ -843,6 +851,7 @@ def generate_arithmetic_parser():
     return arithmetic
 
 
+@functools.lru_cache(maxsize=None)
 def generate_equation_parser():
     arithmetic = generate_arithmetic_parser()
     equation_comparison = equation_comparison_parser(arithmetic)
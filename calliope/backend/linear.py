@@ -0,0 +1,653 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+linear.py
+~~~~~~~~~
+
+Backend-agnostic, array-based representation of the linear expressions and
+constraints of a model. Rather than evaluating one Python rule per member of a
+subset, expressions are evaluated over all members of the subset at once, as
+NumPy arrays of coefficients and decision variable IDs.
+
+"""
+from __future__ import annotations
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from calliope.backend.backends import BackendModel
+from calliope.backend.subsets import (
+    MaskCache,
+    create_valid_subset_mask,
+    positions_to_index,
+)
+from calliope.exceptions import BackendError
+
+
+class Rows:
+    """
+    Members of a subset, held as the integer positions of each member along
+    each of the subset dimensions (in the order given by `model_data.coords`).
+
+    Args:
+        dims (tuple[str, ...]): Subset dimension names.
+        positions (dict[str, np.ndarray]): Positions of each member along each dimension.
+        shape (dict[str, int]): Length of each dimension in the model data.
+    """
+
+    def __init__(
+        self, dims: tuple[str, ...], positions: dict[str, np.ndarray], shape: dict
+    ):
+        self.dims = dims
+        self.positions = positions
+        self.shape = shape
+
+    @classmethod
+    def from_mask(cls, mask: xr.DataArray) -> Rows:
+        """Get the members of a subset from its boolean mask, in C order."""
+        positions = dict(zip(mask.dims, np.nonzero(mask.values)))
+        return cls(mask.dims, positions, dict(mask.sizes))
+
+    @classmethod
+    def from_index(cls, index: pd.Index, model_data: xr.Dataset) -> Rows:
+        """
+        Get the members of a subset from their labels, as returned by
+        :meth:`to_index`, with one index level per subset dimension.
+        """
+        dims = tuple(index.names)
+        positions = {
+            dim: model_data.coords[dim]
+            .to_index()
+            .get_indexer(index.get_level_values(i))
+            for i, dim in enumerate(dims)
+        }
+        return cls(dims, positions, {dim: model_data.sizes[dim] for dim in dims})
+
+    def __len__(self) -> int:
+        return len(next(iter(self.positions.values())))
+
+    def keys(self) -> np.ndarray:
+        """Flattened integer key of each member, sorted if rows are in C order."""
+        return np.ravel_multi_index(
+            [self.positions[dim] for dim in self.dims],
+            [self.shape[dim] for dim in self.dims],
+        )
+
+    def select(self, keep: np.ndarray) -> Rows:
+        """Get the subset of rows for which `keep` is True."""
+        return Rows(
+            self.dims, {k: v[keep] for k, v in self.positions.items()}, self.shape
+        )
+
+    def project(self, dims: tuple[str, ...]) -> Rows:
+        """Get the rows over a subset of their dimensions, retaining duplicates."""
+        return Rows(dims, {dim: self.positions[dim] for dim in dims}, self.shape)
+
+    def index_of(self, other: Rows) -> np.ndarray:
+        """
+        Get the position in these rows of each of the `other` rows, matching
+        on the dimensions of these rows. Rows which cannot be found are -1.
+        """
+        keys = self.keys()
+        if len(keys) == 0:
+            return np.full(len(other), -1)
+        other_keys = np.ravel_multi_index(
+            [other.positions[dim] for dim in self.dims],
+            [self.shape[dim] for dim in self.dims],
+        )
+        idx = np.searchsorted(keys, other_keys).clip(max=len(keys) - 1)
+        return np.where(keys[idx] == other_keys, idx, -1)
+
+    def to_index(self, model_data: xr.Dataset) -> pd.Index:
+        """
+        Get the labels of all members, as returned by
+        :func:`calliope.backend.subsets.create_valid_subset`.
+        """
+        return positions_to_index(
+            model_data.coords, {dim: self.positions[dim] for dim in self.dims}
+        )
+
+
+class LinearArray:
+    """
+    One linear expression per member of a subset, held in coordinate format:
+    each term is a (row, variable ID, coefficient) triplet.
+    Arithmetic with arrays of length `n` (or scalars) applies row-wise.
+
+    Args:
+        n (int): Number of rows (i.e., subset members).
+        rows (np.ndarray): Row of each term.
+        ids (np.ndarray): Decision variable ID of each term.
+        coefs (np.ndarray): Coefficient of each term.
+        constant (np.ndarray, optional): Constant of each row. Defaults to zero.
+    """
+
+    __slots__ = ("n", "rows", "ids", "coefs", "constant")
+    # Make NumPy defer to this class in arithmetic with arrays (e.g. `array * self`)
+    __array_ufunc__ = None
+
+    def __init__(
+        self,
+        n: int,
+        rows: np.ndarray,
+        ids: np.ndarray,
+        coefs: np.ndarray,
+        constant: Optional[np.ndarray] = None,
+    ):
+        self.n = n
+        self.rows = rows
+        self.ids = ids
+        self.coefs = coefs
+        self.constant = np.zeros(n) if constant is None else constant
+
+    @classmethod
+    def from_constant(
+        cls, n: int, constant: Union[float, np.ndarray] = 0
+    ) -> LinearArray:
+        empty = np.array([], dtype=np.int64)
+        return cls(n, empty, empty, np.array([], dtype=float), _broadcast(constant, n))
+
+    @property
+    def has_variables(self) -> np.ndarray:
+        """
+        Whether each row references any decision variable, irrespective of its
+        coefficient value (cf. Pyomo's `is_potentially_variable`).
+        """
+        return np.bincount(self.rows, minlength=self.n) > 0
+
+    def where(self, cond: np.ndarray) -> LinearArray:
+        """Keep rows for which `cond` is True, setting all others to zero."""
+        cond = _broadcast(cond, self.n).astype(bool)
+        keep = cond[self.rows]
+        return LinearArray(
+            self.n,
+            self.rows[keep],
+            self.ids[keep],
+            self.coefs[keep],
+            np.where(cond, self.constant, 0),
+        )
+
+    def __add__(self, other) -> LinearArray:
+        if isinstance(other, LinearArray):
+            return LinearArray(
+                self.n,
+                np.concatenate([self.rows, other.rows]),
+                np.concatenate([self.ids, other.ids]),
+                np.concatenate([self.coefs, other.coefs]),
+                self.constant + other.constant,
+            )
+        else:
+            return LinearArray(
+                self.n, self.rows, self.ids, self.coefs, self.constant + other
+            )
+
+    __radd__ = __add__
+
+    def __neg__(self) -> LinearArray:
+        return LinearArray(self.n, self.rows, self.ids, -self.coefs, -self.constant)
+
+    def __sub__(self, other) -> LinearArray:
+        return self + (-other)
+
+    def __rsub__(self, other) -> LinearArray:
+        return (-self) + other
+
+    def __mul__(self, other) -> LinearArray:
+        if isinstance(other, LinearArray):
+            raise BackendError("Cannot multiply two linear expressions.")
+        other = _broadcast(other, self.n)
+        return LinearArray(
+            self.n,
+            self.rows,
+            self.ids,
+            self.coefs * other[self.rows],
+            self.constant * other,
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other) -> LinearArray:
+        # Coefficients are computed as 1 / `other`, then applied, to match
+        # coefficients generated by Pyomo for `variable / param`.
+        other = _broadcast(other, self.n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self * (1 / other)
+
+    def group(self, groups: np.ndarray, n: int) -> LinearArray:
+        """
+        Sum rows into `n` new rows, row `i` being added to row `groups[i]`.
+        Terms retain their order of appearance.
+        """
+        return LinearArray(
+            n,
+            groups[self.rows],
+            self.ids,
+            self.coefs,
+            np.bincount(groups, weights=self.constant, minlength=n),
+        )
+
+    def merged(self) -> LinearArray:
+        """Get the expressions with repeated variables in a row merged."""
+        indptr, ids, coefs = self.to_csr()
+        rows = np.repeat(np.arange(self.n), np.diff(indptr))
+        return LinearArray(self.n, rows, ids, coefs, self.constant)
+
+    def to_csr(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the linear terms in compressed sparse row format, with repeated
+        variables in a row merged (in order of appearance) and zero coefficients
+        dropped.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: indptr, variable IDs, coefficients.
+        """
+        order = np.lexsort((self.ids, self.rows))
+        rows, ids, coefs = self.rows[order], self.ids[order], self.coefs[order]
+        if len(rows) > 0:
+            is_new = np.r_[True, (rows[1:] != rows[:-1]) | (ids[1:] != ids[:-1])]
+            starts = np.flatnonzero(is_new)
+            rows, ids = rows[starts], ids[starts]
+            coefs = np.add.reduceat(coefs, starts)
+            nonzero = coefs != 0
+            rows, ids, coefs = rows[nonzero], ids[nonzero], coefs[nonzero]
+        indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=self.n))]
+        return indptr, ids, coefs
+
+
+class ConstraintArray:
+    """
+    One linear constraint `lower <= body <= upper` per member of a subset.
+    NaN bounds are undefined (i.e., the constraint is one-sided).
+
+    Args:
+        rows (Rows): Subset members over which constraints are defined.
+        lower (np.ndarray): Lower bound of each constraint.
+        body (LinearArray): Linear expression of each constraint.
+        upper (np.ndarray): Upper bound of each constraint.
+        expressions (dict[str, tuple[Rows, LinearArray]], optional):
+            Expressions evaluated alongside the constraints, to be stored in
+            the backend model. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        rows: Rows,
+        lower: np.ndarray,
+        body: LinearArray,
+        upper: np.ndarray,
+        expressions: Optional[dict[str, tuple[Rows, LinearArray]]] = None,
+    ):
+        self.rows = rows
+        self.lower = lower
+        self.body = body
+        self.upper = upper
+        self.expressions = {} if expressions is None else expressions
+
+    def with_expressions(
+        self, **expressions: tuple[Rows, LinearArray]
+    ) -> ConstraintArray:
+        """Attach expressions to be stored in the backend model."""
+        self.expressions.update(expressions)
+        return self
+
+    def select(self, keep: np.ndarray) -> ConstraintArray:
+        """Get the constraints for which `keep` is True."""
+        idx = np.flatnonzero(keep)
+        remap = np.full(self.body.n, -1)
+        remap[idx] = np.arange(len(idx))
+        term_keep = keep[self.body.rows]
+        body = LinearArray(
+            len(idx),
+            remap[self.body.rows[term_keep]],
+            self.body.ids[term_keep],
+            self.body.coefs[term_keep],
+            self.body.constant[idx],
+        )
+        return ConstraintArray(
+            self.rows.select(keep),
+            self.lower[idx],
+            body,
+            self.upper[idx],
+            self.expressions,
+        )
+
+
+class ObjectiveArray:
+    """
+    A linear objective function.
+
+    Args:
+        sense (str): "minimize" or "maximize".
+        expression (LinearArray): Single-row linear expression to optimise.
+    """
+
+    def __init__(self, sense: str, expression: LinearArray):
+        self.sense = sense
+        self.expression = expression
+
+
+def _broadcast(val, n: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(val, dtype=float), (n,))
+
+
+def less_equal(rows: Rows, lhs: LinearArray, rhs: LinearArray) -> ConstraintArray:
+    """
+    `lhs <= rhs` in each of `rows`, normalised per row to `body <= upper` or
+    `lower <= body` in the same way as Pyomo normalises relational expressions.
+    """
+    lhs_var, rhs_var = lhs.has_variables, rhs.has_variables
+    rhs_const = ~rhs_var
+    lhs_const = rhs_var & ~lhs_var
+    both = lhs_var & rhs_var
+    body = lhs.where(rhs_const) + rhs.where(lhs_const) + (lhs - rhs).where(both)
+    lower = np.where(lhs_const, lhs.constant, np.nan)
+    upper = np.where(rhs_const, rhs.constant, np.where(both, 0, np.nan))
+    return ConstraintArray(rows, lower, body, upper)
+
+
+def greater_equal(rows: Rows, lhs: LinearArray, rhs: LinearArray) -> ConstraintArray:
+    """`lhs >= rhs` in each of `rows`, which Pyomo treats as `rhs <= lhs`."""
+    return less_equal(rows, rhs, lhs)
+
+
+def equal(rows: Rows, lhs: LinearArray, rhs: LinearArray) -> ConstraintArray:
+    """
+    `lhs == rhs` in each of `rows`, normalised per row to `bound == body` in the
+    same way as Pyomo normalises equality expressions.
+    """
+    lhs_var, rhs_var = lhs.has_variables, rhs.has_variables
+    lhs_const = ~lhs_var
+    rhs_const = lhs_var & ~rhs_var
+    both = lhs_var & rhs_var
+    body = rhs.where(lhs_const) + lhs.where(rhs_const) + (lhs - rhs).where(both)
+    bound = np.select(
+        [lhs_const, rhs_const], [lhs.constant, rhs.constant], default=0
+    ).astype(float)
+    return ConstraintArray(rows, bound, body, bound.copy())
+
+
+def select(
+    conditions: list[np.ndarray],
+    choices: list[ConstraintArray],
+    default: ConstraintArray,
+) -> ConstraintArray:
+    """
+    Choose, in each row, the constraint corresponding to the first True
+    condition, or `default` if all conditions are False (cf. `numpy.select`).
+    """
+    taken = np.zeros(default.body.n, dtype=bool)
+    selected = []
+    for condition in conditions:
+        selected.append(condition & ~taken)
+        taken = taken | condition
+    body = default.body.where(~taken)
+    expressions = dict(default.expressions)
+    for condition, choice in zip(selected, choices):
+        body = choice.body.where(condition) + body
+        expressions.update(choice.expressions)
+    return ConstraintArray(
+        default.rows,
+        np.select(selected, [i.lower for i in choices], default.lower),
+        body,
+        np.select(selected, [i.upper for i in choices], default.upper),
+        expressions,
+    )
+
+
+def ranged(
+    rows: Rows, lower: LinearArray, body: LinearArray, upper: LinearArray
+) -> ConstraintArray:
+    """`lower <= body <= upper` in each of `rows`, for constant bounds."""
+    if lower.has_variables.any() or upper.has_variables.any():
+        raise BackendError(
+            "Cannot define a ranged constraint with a decision variable as one of "
+            "its bounds."
+        )
+    return ConstraintArray(rows, lower.constant, body, upper.constant)
+
+
+class ArrayModel:
+    """
+    Decision variables and input parameters of a model, from which linear
+    expressions and constraints can be evaluated over whole subsets at once.
+    Each member of each decision variable subset is assigned a unique integer ID,
+    in the order in which variables are added and, within each variable, in the
+    order of its subset.
+
+    Args:
+        model_data (xr.Dataset): Calliope model data.
+        mask_cache (Optional[MaskCache], optional):
+            Masks to share with other components built from the same model data.
+            Defaults to None, in which case a new cache is used.
+    """
+
+    def __init__(self, model_data: xr.Dataset, mask_cache: Optional[MaskCache] = None):
+        self._model_data = model_data
+        self.mask_cache = MaskCache() if mask_cache is None else mask_cache
+        self._defaults = model_data.attrs["defaults"]
+        self.run_config = model_data.attrs["run_config"]
+        self.variables: dict[str, Rows] = {}
+        self._variable_keys: dict[str, tuple[np.ndarray, int]] = {}
+        self._params: dict[str, xr.DataArray] = {}
+        self.n_variables = 0
+
+    @property
+    def model_data(self) -> xr.Dataset:
+        return self._model_data
+
+    def build_variables(self, variable_definitions: dict) -> None:
+        for var_name, var_config in variable_definitions.items():
+            mask = create_valid_subset_mask(
+                self._model_data, var_name, var_config, self.mask_cache
+            )
+            if mask is None:
+                continue
+            self.add_variable(var_name, Rows.from_mask(mask))
+
+    def add_variable(self, name: str, rows: Rows) -> None:
+        self.variables[name] = rows
+        self._variable_keys[name] = (rows.keys(), self.n_variables)
+        self.n_variables += len(rows)
+
+    def rows(self, name: str, config: dict) -> Optional[Rows]:
+        """Get the members of the subset of a constraint/expression, if not empty."""
+        mask = create_valid_subset_mask(self._model_data, name, config, self.mask_cache)
+        if mask is None:
+            return None
+        else:
+            return Rows.from_mask(mask)
+
+    def positions(self, dim: str, labels: np.ndarray) -> np.ndarray:
+        """Get the integer position of each label along the model dimension `dim`."""
+        return self._model_data.coords[dim].to_index().get_indexer(labels)
+
+    def variable(self, name: str, rows: Rows, **positions) -> LinearArray:
+        """
+        Reference decision variable `name` in each row, where it exists.
+
+        Args:
+            name (str): Decision variable name.
+            rows (Rows): Rows in which to reference the variable.
+            **positions: Positions along any of the variable dimensions to use
+                instead of those of the rows (e.g. the previous timestep).
+                Scalars are broadcast over all rows.
+
+        Returns:
+            LinearArray: Single term, with a coefficient of one, in each row in
+                which the variable exists.
+        """
+        n = len(rows)
+        if name not in self.variables:
+            return LinearArray.from_constant(n)
+        var_rows = self.variables[name]
+        pos = [
+            np.broadcast_to(positions.get(dim, rows.positions.get(dim)), (n,))
+            for dim in var_rows.dims
+        ]
+        keys, offset = self._variable_keys[name]
+        valid = np.logical_and.reduce([i >= 0 for i in pos])
+        lookup = np.full(n, -1)
+        if valid.any():
+            row_keys = np.ravel_multi_index(
+                [i[valid] for i in pos], [var_rows.shape[dim] for dim in var_rows.dims]
+            )
+            idx = np.searchsorted(keys, row_keys).clip(max=len(keys) - 1)
+            lookup[valid] = np.where(keys[idx] == row_keys, idx, -1)
+        term_rows = np.flatnonzero(lookup >= 0)
+        return LinearArray(
+            n,
+            term_rows,
+            lookup[term_rows] + offset,
+            np.ones(len(term_rows)),
+        )
+
+    def variable_sum(self, name: str, rows: Rows) -> LinearArray:
+        """
+        Reference all members of decision variable `name` in each row, summing
+        over any variable dimensions that are not dimensions of the rows
+        (e.g. summing over `techs`).
+        """
+        n = len(rows)
+        if name not in self.variables or n == 0:
+            return LinearArray.from_constant(n)
+        var_rows = self.variables[name]
+        _, offset = self._variable_keys[name]
+        row_keys = rows.keys()
+        var_keys = np.ravel_multi_index(
+            [var_rows.positions[dim] for dim in rows.dims],
+            [rows.shape[dim] for dim in rows.dims],
+        )
+        idx = np.searchsorted(row_keys, var_keys).clip(max=n - 1)
+        found = np.flatnonzero(row_keys[idx] == var_keys)
+        return LinearArray(
+            n,
+            idx[found],
+            found + offset,
+            np.ones(len(found)),
+        )
+
+    def param(self, name: str, rows: Rows, **positions) -> np.ndarray:
+        """
+        Get the value of input parameter `name` in each row, falling back to its
+        default value where it is undefined (NaN or infinite), as
+        :func:`calliope.backend.pyomo.util.get_param` does.
+
+        Args:
+            name (str): Parameter name.
+            rows (Rows): Rows in which to get the parameter value.
+            **positions: Positions along any of the parameter dimensions to use
+                instead of those of the rows.
+
+        Returns:
+            np.ndarray: One value per row.
+        """
+        n = len(rows)
+        default = self._defaults.get(name, None)
+        default = np.nan if default is None else default
+        param = self._get_param_array(name, default)
+        if param is None or not all(
+            dim in positions or dim in rows.positions for dim in param.dims
+        ):
+            return np.full(n, default, dtype=np.array(default).dtype)
+        values = param.values[
+            tuple(
+                np.broadcast_to(positions.get(dim, rows.positions.get(dim)), (n,))
+                for dim in param.dims
+            )
+        ]
+        return values
+
+    def _get_param_array(self, name: str, default) -> Optional[xr.DataArray]:
+        if name not in self._params:
+            if name not in self._model_data.data_vars:
+                self._params[name] = None
+            else:
+                param = self._model_data[name]
+                values = param.values
+                if values.dtype.kind == "f":
+                    invalid = ~np.isfinite(values)
+                elif values.dtype.kind == "O":
+                    invalid = pd.isnull(values) | np.isin(values, [np.inf, -np.inf])
+                else:
+                    invalid = np.zeros(values.shape, dtype=bool)
+                if invalid.any():
+                    values = np.where(invalid, default, values)
+                self._params[name] = param.copy(data=values)
+        return self._params[name]
+
+
+class ArrayBackendInterface(BackendModel):
+    """
+    Backend interface with which math parsed from YAML (see
+    :mod:`calliope.backend.parsing`) is evaluated over all members of a subset at
+    once: set iterators and index items are arrays with one set item per member,
+    and input parameters and decision variables are looked up as arrays of values
+    and :class:`LinearArray` objects, respectively.
+
+    Args:
+        array_model (ArrayModel): Model in which to look up parameters and variables.
+    """
+
+    def __init__(self, array_model: ArrayModel):
+        self._array_model = array_model
+        # Members of the subset being evaluated
+        self.rows: Optional[Rows] = None
+
+    @property
+    def _lookup_param_or_var_set_names(self) -> dict[str, Optional[tuple[str, ...]]]:
+        # Parameters only defined by their default value are unindexed
+        lookup: dict = {k: () for k in self._array_model.model_data.attrs["defaults"]}
+        lookup.update(
+            {
+                k: v.dims if v.dims else None
+                for k, v in self._array_model.model_data.data_vars.items()
+            }
+        )
+        lookup.update({k: v.dims for k, v in self._array_model.variables.items()})
+        return lookup
+
+    def get_set(self, set_name: str) -> pd.Index:
+        return self._array_model.model_data.coords[set_name].to_index()
+
+    def get_parameter_or_variable(
+        self, name: str, index: tuple = ()
+    ) -> Union[np.ndarray, LinearArray]:
+        """
+        Get parameter values or decision variable references in each of `self.rows`.
+
+        Args:
+            name (str): Parameter or decision variable name.
+            index (tuple, optional):
+                Set items at which to get the parameter or variable, given as an
+                array with one set item per row or a single set item for all rows,
+                for each dimension of the parameter or variable in turn.
+                Defaults to (), i.e. the parameter is unindexed.
+
+        Returns:
+            Union[np.ndarray, LinearArray]: Parameter value or variable term per row.
+        """
+        n = len(self.rows)
+        dims = self._lookup_param_or_var_set_names.get(name, None) or ()
+        positions = {
+            dim: np.broadcast_to(
+                self._array_model.positions(dim, np.atleast_1d(labels)), (n,)
+            )
+            for dim, labels in zip(dims, index)
+        }
+        if name in self._array_model.variables:
+            return self._array_model.variable(name, self.rows, **positions)
+
+        values = self._array_model.param(name, self.rows, **positions)
+        if positions:
+            # Set items which cannot be found fall back to the default value
+            missing = np.logical_or.reduce([i < 0 for i in positions.values()])
+            if missing.any():
+                default = self._array_model.model_data.attrs["defaults"].get(name)
+                values = np.where(
+                    missing, np.nan if default is None else default, values
+                )
+        return values
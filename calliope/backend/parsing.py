@@ -8,11 +8,13 @@ import operator
 from abc import ABC, abstractmethod
 
 import pyparsing as pp
+import numpy as np
 import xarray as xr
 import pandas as pd
 
-from calliope.backend import equation_parser, subset_parser
+from calliope.backend import equation_parser, subset_parser, linear
 from calliope.backend.backends import BackendModel
+from calliope.backend.subsets import MaskCache, positions_to_index
 from calliope.exceptions import BackendError
 from calliope.backend import helper_functions
 
@@ -113,6 +115,7 @@ class ParsedBackendComponent(ABC, Generic[T]):
         model_data: xr.Dataset,
         equation_where: list[Optional[pp.ParseResults]],
         equation_name: Optional[str] = None,
+        mask_cache: Optional[MaskCache] = None,
     ) -> Optional[pd.Index]:
         """
         Get subset of product of "foreach" sets that matches the "where" string conditions.
@@ -123,13 +126,16 @@ class ParsedBackendComponent(ABC, Generic[T]):
             equation_name (Optional[str], optional): s
                 String to name subset items in self.index.
                 Defaults to None, in which case self.name is used.
+            mask_cache (Optional[MaskCache], optional):
+                Masks to share with other components evaluated over the same model data.
+                Defaults to None.
 
         Returns:
             Optional[pd.Index]:
                 If no valid index items are found in the set product, return None.
         """
 
-        subset_ = self._create_subset_from_where(model_data, equation_where)
+        subset_ = self._create_subset_from_where(model_data, equation_where, mask_cache)
 
         if equation_name is None:
             equation_name = self.name
@@ -177,6 +183,69 @@ class ParsedBackendComponent(ABC, Generic[T]):
 
         return _rule
 
+    def evaluate_arrays(
+        self,
+        equation_name: str,
+        equation_dict: ParsedEquationDict,
+        backend_interface: linear.ArrayBackendInterface,
+        subset: pd.Index,
+    ) -> Union[linear.ConstraintArray, linear.LinearArray]:
+        """
+        Evaluate a parsed equation over all members of its subset at once,
+        walking the parsed expression tree only once, with arrays of set items in
+        place of the set iterators that are passed one at a time to the function
+        returned by `evaluate_rule`.
+
+        Args:
+            equation_name (str): For use in raising exeptions.
+            equation_dict (ParsedEquationDict): Provides parsed strings to evaluate.
+            backend_interface (linear.ArrayBackendInterface):
+                Provides interface to the array representation of the model on evaluation.
+            subset (pd.Index): Subset over which to evaluate the equation, as returned by `evaluate_subset`.
+
+        Returns:
+            Union[linear.ConstraintArray, linear.LinearArray]:
+                One constraint per subset member if the equation is a comparison,
+                otherwise one linear expression per subset member.
+        """
+        rows = linear.Rows.from_index(subset, backend_interface._array_model.model_data)
+        backend_interface.rows = rows
+        iterator_dict = {
+            iterator: subset.get_level_values(idx).values
+            for idx, iterator in enumerate(self.sets.keys())
+        }
+        eval_kwargs = dict(
+            equation_name=equation_name,
+            iterator_dict=iterator_dict,
+            index_item_dict=equation_dict["index_items"],
+            component_dict=equation_dict["components"],
+            backend_interface=backend_interface,
+            helper_func_dict=VALID_HELPER_FUNCTIONS,
+            sets=self.sets,
+            as_dict=False,
+        )
+
+        def _to_linear_array(val):
+            if isinstance(val, linear.LinearArray):
+                return val
+            else:
+                return linear.LinearArray.from_constant(len(rows), val)
+
+        expression = equation_dict["expression"][0]
+        if isinstance(expression, equation_parser.EvalComparisonOp):
+            comparison = {
+                "<=": linear.less_equal,
+                ">=": linear.greater_equal,
+                "==": linear.equal,
+            }[expression.op]
+            return comparison(
+                rows,
+                _to_linear_array(expression.lhs.eval(**eval_kwargs)),
+                _to_linear_array(expression.rhs.eval(**eval_kwargs)),
+            )
+        else:
+            return _to_linear_array(expression.eval(**eval_kwargs))
+
     @abstractmethod
     def parse_strings(self) -> None:
         pass
@@ -201,7 +270,10 @@ class ParsedBackendComponent(ABC, Generic[T]):
         self._errors.add(f"({expression_group}, {instring}): {error_message}")
 
     def _create_subset_from_where(
-        self, model_data: xr.Dataset, where_list: list[Optional[pp.ParseResults]]
+        self,
+        model_data: xr.Dataset,
+        where_list: list[Optional[pp.ParseResults]],
+        mask_cache: Optional[MaskCache] = None,
     ) -> Optional[pd.Index]:
         """
         Returns the subset of combined constraint set items (given by "foreach")
@@ -210,6 +282,9 @@ class ParsedBackendComponent(ABC, Generic[T]):
         Args:
             model_data (xr.Dataset): Calliope model dataset.
             where_list (list[Optional[pp.ParseResults]]): List of parsed "where" strings.
+            mask_cache (Optional[MaskCache], optional):
+                Masks to share with other components evaluated over the same model data.
+                Defaults to None.
 
         Returns:
             Optional[pd.Index]: If no valid subset of set product, returns None.
@@ -217,7 +292,13 @@ class ParsedBackendComponent(ABC, Generic[T]):
 
         # Start with a mask that is True where the tech exists at a node
         # (across all timesteps and for a each carrier and cost, where appropriate)
-        imask_foreach: xr.DataArray = self._imask_foreach(model_data)
+        if mask_cache is None:
+            imask_foreach: xr.DataArray = self._imask_foreach(model_data)
+        else:
+            imask_foreach = mask_cache.get(
+                ("parsed_foreach", tuple(sorted(set(self.sets.values())))),
+                lambda: self._imask_foreach(model_data),
+            )
 
         evaluated_wheres = [
             where[0].eval(  # type: ignore
@@ -226,6 +307,7 @@ class ParsedBackendComponent(ABC, Generic[T]):
                 errors=self._errors,
                 imask=imask_foreach,
                 defaults=model_data.attrs["defaults"],
+                mask_cache=mask_cache,
             )
             for where in [self.top_level_where, *where_list]
         ]
@@ -256,15 +338,10 @@ class ParsedBackendComponent(ABC, Generic[T]):
         Returns:
             pd.Index: Index or MultiIndex listing all valid combinations of set items.
         """
-        if len(imask.dims) == 1:
-            return imask[imask].coords.to_index()
-        else:
-            mask_stacked = imask.stack(dim_0=imask.dims)
-            return (
-                mask_stacked[mask_stacked]  # type: ignore
-                .coords.to_index()
-                .reorder_levels(self.sets.values())
-            )
+        positions = dict(zip(imask.dims, np.nonzero(imask.values)))
+        return positions_to_index(
+            imask.coords, {dim: positions[dim] for dim in self.sets.values()}
+        )
 
     def _imask_foreach(self, model_data: xr.Dataset) -> xr.DataArray:
         """
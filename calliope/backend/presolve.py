@@ -0,0 +1,153 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+presolve.py
+~~~~~~~~~~~
+
+Find the members of model components that are zero in an optimal solution
+before the backend model is built, so that they can be left out of the
+backend model (or fixed to zero) rather than being removed by the solver.
+
+"""
+
+import logging
+
+import numpy as np
+import xarray as xr
+
+logger = logging.getLogger(__name__)
+
+# Lower limits on the capacities of a technology which could force them to be
+# positive (or make the model infeasible) even if its energy capacity is zero
+CAPACITY_LOWER_LIMITS = [
+    "energy_cap_min",
+    "energy_cap_equals_systemwide",
+    "storage_cap_min",
+    "storage_cap_equals",
+    "resource_cap_min",
+    "resource_cap_equals",
+    "resource_area_min",
+    "resource_area_equals",
+    "units_min",
+    "units_equals",
+]
+
+
+class Presolve:
+    """
+    Members of the model found to be zero in an optimal solution from the
+    model data alone.
+
+    Node/tech combinations whose energy capacity is forced to zero are removed
+    from the valid subsets of all variables, expressions and constraints
+    (by :func:`calliope.backend.subsets.create_valid_subset_mask`, given a
+    :class:`calliope.backend.subsets.MaskCache` holding this object).
+    The carrier production of supply technologies in timesteps with zero
+    resource is left to the backend to fix to zero.
+
+    Parameters
+    ----------
+    model_data : xarray.Dataset
+
+    Attributes
+    ----------
+    removed_node_techs : xarray.DataArray
+        Boolean array over (nodes, techs), True for removed node/tech combinations.
+    node_tech : xarray.DataArray
+        `model_data.node_tech`, without the removed node/tech combinations.
+    zero_resource : xarray.DataArray or None
+        Boolean array over (nodes, techs, timesteps), True where the carrier
+        production of a supply technology is zero as its resource is zero.
+    removed : dict
+        The members removed from the valid subset of each variable, expression
+        and constraint, as a pandas Index, so that results can be filled in
+        with zeros.
+
+    """
+
+    def __init__(self, model_data):
+        self.removed_node_techs = zero_capacity_node_techs(model_data)
+        self.node_tech = model_data.node_tech.where(~self.removed_node_techs)
+        self.zero_resource = zero_resource_timesteps(model_data, self.node_tech)
+        self.removed = {}
+        logger.debug(
+            f"Presolve: removing {int(self.removed_node_techs.sum())} node/tech "
+            "combinations with zero energy capacity, fixing "
+            f"{0 if self.zero_resource is None else int(self.zero_resource.sum())} "
+            "supply technology timesteps with zero resource"
+        )
+
+
+def _get_param(model_data, name):
+    default = model_data.attrs["defaults"].get(name, None)
+    default = np.nan if default is None else default
+    if name in model_data.data_vars:
+        return model_data[name].fillna(default)
+    else:
+        return xr.DataArray(default)
+
+
+def _reduce_to(array, dims):
+    return array.any([i for i in array.dims if i not in dims])
+
+
+def zero_capacity_node_techs(model_data):
+    """
+    Returns a boolean array over (nodes, techs) which is True for node/tech
+    combinations whose energy capacity is forced to zero by
+    `energy_cap_equals` or `energy_cap_max`, if that makes all their other
+    decision variables zero in an optimal solution. That is not the case for
+    technologies with integer/binary capacities, forced resource use, lower
+    limits on other capacities, or negative costs.
+    Both ends of a transmission link are only removed together.
+
+    """
+    node_tech_dims = ("nodes", "techs")
+    equals = _get_param(model_data, "energy_cap_equals")
+    zero_cap = (equals == 0) | (
+        equals.isnull() & (_get_param(model_data, "energy_cap_max") == 0)
+    )
+    keep = _get_param(model_data, "force_resource").astype(bool)
+    keep = keep | (_get_param(model_data, "cap_method") != "linear")
+    for param in CAPACITY_LOWER_LIMITS:
+        keep = keep | (_get_param(model_data, param) > 0)
+    for cost in [i for i in model_data.data_vars if i.startswith("cost_")]:
+        keep = keep | _reduce_to(model_data[cost] < 0, node_tech_dims)
+
+    removed = model_data.node_tech.notnull() & zero_cap & ~keep
+    removed = removed.transpose(*node_tech_dims).copy()
+
+    if "link_remote_nodes" in model_data.data_vars and removed.any():
+        links = model_data.link_remote_nodes.notnull() & removed
+        nodes, techs = np.nonzero(links.transpose(*node_tech_dims).values)
+        remote_nodes = removed.indexes["nodes"].get_indexer(
+            model_data.link_remote_nodes.transpose(*node_tech_dims).values[nodes, techs]
+        )
+        remote_techs = removed.indexes["techs"].get_indexer(
+            model_data.link_remote_techs.transpose(*node_tech_dims).values[nodes, techs]
+        )
+        remote_removed = removed.values[remote_nodes, remote_techs]
+        removed.values[nodes[~remote_removed], techs[~remote_removed]] = False
+
+    return removed
+
+
+def zero_resource_timesteps(model_data, node_tech):
+    """
+    Returns a boolean array over (nodes, techs, timesteps) which is True
+    where a supply technology (excluding `supply_plus`) has zero resource, so
+    that its carrier production is zero, for node/tech combinations in
+    `node_tech`. None if no resource is defined.
+
+    """
+    if "resource" not in model_data.data_vars or "timesteps" not in model_data.dims:
+        return None
+    supply = model_data.inheritance.str.endswith("supply")
+    zero_resource = (
+        (model_data.resource == 0)
+        & supply
+        & node_tech.notnull()
+        & model_data.timesteps.notnull()
+    )
+    return zero_resource.transpose("nodes", "techs", "timesteps")
@@ -11,7 +11,12 @@ Cost constraints.
 
 import pyomo.core as po
 
-from calliope.backend.pyomo.util import get_param, get_timestep_weight, loc_tech_is_in
+from calliope.backend.pyomo.util import (
+    get_param,
+    get_sparsity_index,
+    get_timestep_weight,
+    loc_tech_is_in,
+)
 
 
 def cost_expression_rule(backend_model, cost, node, tech):
@@ -33,10 +38,10 @@ def cost_expression_rule(backend_model, cost, node, tech):
         cost_investment = 0
 
     if hasattr(backend_model, "cost_var"):
+        sparsity_index = get_sparsity_index(backend_model, "cost_var", "timesteps")
         cost_var = po.quicksum(
-            backend_model.cost_var[cost, node, tech, timestep]
-            for timestep in backend_model.timesteps
-            if [cost, node, tech, timestep] in backend_model.cost_var.index_set()
+            backend_model.cost_var[idx]
+            for idx in sparsity_index.get((cost, node, tech), [])
         )
     else:
         cost_var = 0
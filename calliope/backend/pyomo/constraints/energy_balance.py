@@ -14,6 +14,7 @@ import pyomo.core as po
 from calliope.backend.pyomo.util import (
     get_param,
     get_previous_timestep,
+    get_sparsity_index,
 )
 
 
@@ -34,11 +35,10 @@ def system_balance_constraint_rule(backend_model, carrier, node, timestep):
     """
 
     def _sum(var_name):
+        sparsity_index = get_sparsity_index(backend_model, var_name, "techs")
         return po.quicksum(
-            getattr(backend_model, var_name)[carrier, node, tech, timestep]
-            for tech in backend_model.techs
-            if [carrier, node, tech, timestep]
-            in getattr(backend_model, var_name).index_set()
+            getattr(backend_model, var_name)[idx]
+            for idx in sparsity_index.get((carrier, node, timestep), [])
         )
 
     carrier_prod = _sum("carrier_prod")
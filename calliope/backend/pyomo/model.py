@@ -7,12 +7,18 @@ Licensed under the Apache 2.0 License (see LICENSE file).
 from calliope.backend.pyomo.constraints.capacity import get_capacity_bounds
 import logging
 import os
+import time
 from contextlib import redirect_stdout, redirect_stderr
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+import scipy.sparse
 import pyomo.core as po
+from pyomo.core.expr.numeric_expr import LinearExpression
+from pyomo.core.expr.numvalue import NumericConstant
+from pyomo.core.expr.visitor import identify_mutable_parameters, identify_variables
 from pyomo.opt import SolverFactory
 
 # pyomo.environ is needed for pyomo solver plugins
@@ -22,13 +28,25 @@ import pyomo.environ as pe  # pylint: disable=unused-import,import-error
 from pyomo.common.tempfiles import TempfileManager  # pylint: disable=import-error
 
 from calliope.backend.pyomo.util import (
+    ParamLookup,
     get_var,
+    get_component_values,
+    get_suffix_values,
     get_domain,
+    get_param_values,
     string_to_datetime,
     datetime_to_string,
+    datetime_to_integer,
 )
-from calliope.backend.subsets import create_valid_subset
+from calliope.backend.subsets import (
+    MaskCache,
+    cache_parsed_where_strings,
+    create_valid_subset,
+)
+from calliope.backend.linear import ArrayModel, Rows
+from calliope.backend.presolve import Presolve
 from calliope.backend.pyomo import constraints
+from calliope.backend import vectorised
 from calliope.core.util.tools import load_function
 from calliope.core.util.logging import LogWriter
 from calliope.core.util.dataset import reorganise_xarray_dimensions
@@ -52,28 +70,34 @@ def build_params(model_data, backend_model):
 
     backend_model.__calliope_defaults = model_data.attrs["defaults"]
     backend_model.__calliope_run_config = model_data.attrs["run_config"]
+    backend_model.__calliope_param_lookup = {}
 
     for k, v in model_data.data_vars.items():
         if v.attrs["is_result"] == 0 or (
             v.attrs.get("operate_param", 0) == 1
             and backend_model.__calliope_run_config["mode"] == "operate"
         ):
-            with pd.option_context("mode.use_inf_as_na", True):
-                _kwargs = {
-                    "initialize": v.to_series().dropna().to_dict(),
-                    "mutable": True,
-                    "within": getattr(po, get_domain(v)),
-                }
+            param_start = time.time()
+            domain = get_domain(v)
+            _kwargs = {"mutable": True, "within": getattr(po, domain)}
             if not pd.isnull(backend_model.__calliope_defaults.get(k, None)):
                 _kwargs["default"] = backend_model.__calliope_defaults[k]
             dims = [getattr(backend_model, i) for i in v.dims]
+            values = get_param_values(v)
+            param = po.Param(*dims, initialize=values, **_kwargs)
             if hasattr(backend_model, k):
                 logger.debug(
                     f"The parameter {k} is already an attribute of the Pyomo model."
                     "It will be prepended with `calliope_` for differentiatation."
                 )
-                k = f"calliope_{k}"
-            setattr(backend_model, k, po.Param(*dims, **_kwargs))
+                setattr(backend_model, f"calliope_{k}", param)
+            else:
+                setattr(backend_model, k, param)
+            backend_model.__calliope_param_lookup[k] = ParamLookup(param, len(v.dims))
+            logger.debug(
+                f"Built parameter {k} with {len(values)} values in "
+                f"{time.time() - param_start:.3f} seconds"
+            )
 
     for option_name, option_val in backend_model.__calliope_run_config[
         "objective_options"
@@ -99,11 +123,19 @@ def build_params(model_data, backend_model):
     )
 
 
-def build_variables(backend_model, model_data, variable_definitions):
+def build_variables(
+    backend_model, model_data, variable_definitions, array_model=None, mask_cache=None
+):
     for var_name, var_config in variable_definitions.items():
-        subset = create_valid_subset(model_data, var_name, var_config)
+        if array_model is not None:
+            if var_name not in array_model.variables:
+                continue
+            subset = array_model.variables[var_name].to_index(model_data)
+        else:
+            subset = create_valid_subset(model_data, var_name, var_config, mask_cache)
         if subset is None:
             continue
+        backend_model.__calliope_subsets[var_name] = subset
         if "bounds" in var_config:
             kwargs = {"bounds": get_capacity_bounds(var_config.bounds)}
         else:
@@ -123,22 +155,123 @@ def _load_rule_function(name):
         return None
 
 
-def build_constraints(backend_model, model_data, constraint_definitions):
+def _load_array_function(name):
+    try:
+        return getattr(vectorised, name)
+    except AttributeError:
+        return None
+
+
+def build_constraints(
+    backend_model,
+    model_data,
+    constraint_definitions,
+    array_model=None,
+    mask_cache=None,
+):
+    if array_model is not None:
+        variable_data = [
+            getattr(backend_model, var_name)[idx]
+            for var_name, var_rows in array_model.variables.items()
+            for idx in var_rows.to_index(model_data)
+        ]
     for constraint_name, constraint_config in constraint_definitions.items():
-        subset = create_valid_subset(model_data, constraint_name, constraint_config)
-        if subset is None:
-            continue
+        array_function = None
+        if array_model is not None:
+            array_function = _load_array_function(f"{constraint_name}_constraint_array")
+        if array_function is not None:
+            rows = array_model.rows(constraint_name, constraint_config)
+            if rows is None:
+                continue
+            subset = rows.to_index(model_data)
+            constraint_array = array_function(array_model, rows)
+            rule = _constraint_array_to_rule(
+                backend_model, model_data, constraint_array, variable_data
+            )
+        else:
+            subset = create_valid_subset(
+                model_data, constraint_name, constraint_config, mask_cache
+            )
+            if subset is None:
+                continue
+            rule = _load_rule_function(f"{constraint_name}_constraint_rule")
+        backend_model.__calliope_subsets[f"{constraint_name}_constraint"] = subset
         setattr(
             backend_model,
             f"{constraint_name}_constraint",
-            po.Constraint(
-                subset,
-                rule=_load_rule_function(f"{constraint_name}_constraint_rule"),
-            ),
+            po.Constraint(subset, rule=rule),
         )
 
 
-def build_expressions(backend_model, model_data, expression_definitions):
+def _linear_expressions(linear_array, variable_data):
+    """
+    Convert a `calliope.backend.linear.LinearArray` to one Pyomo
+    LinearExpression per row.
+    """
+    indptr, ids, coefs = linear_array.to_csr()
+    indptr = indptr.tolist()
+    coefs = coefs.tolist()
+    variables = [variable_data[i] for i in ids.tolist()]
+    constants = linear_array.constant.tolist()
+    return [
+        LinearExpression(
+            constant=constants[i],
+            linear_coefs=coefs[start:end],
+            linear_vars=variables[start:end],
+        )
+        for i, (start, end) in enumerate(zip(indptr[:-1], indptr[1:]))
+    ]
+
+
+def _bound(val):
+    if val != val:  # NaN, i.e. no bound
+        return None
+    elif val in [float("inf"), -float("inf")]:
+        # Pyomo would otherwise map infinite bounds to None
+        return NumericConstant(val)
+    else:
+        return val
+
+
+def _constraint_array_to_rule(
+    backend_model, model_data, constraint_array, variable_data
+):
+    """
+    Convert a `calliope.backend.linear.ConstraintArray` to a Pyomo constraint rule,
+    also setting the value of any expressions evaluated alongside the constraints.
+    """
+    for expr_name, (rows, linear_array) in constraint_array.expressions.items():
+        backend_model.__calliope_linear_expressions.setdefault(expr_name, []).append(
+            (rows, linear_array)
+        )
+        expression = getattr(backend_model, expr_name)
+        for idx, expr in zip(
+            rows.to_index(model_data),
+            _linear_expressions(linear_array, variable_data),
+        ):
+            expression[idx].expr = expr
+
+    constraint_dict = {}
+    for idx, lower, body, upper in zip(
+        constraint_array.rows.to_index(model_data),
+        constraint_array.lower.tolist(),
+        _linear_expressions(constraint_array.body, variable_data),
+        constraint_array.upper.tolist(),
+    ):
+        if lower == upper:
+            constraint_dict[idx] = (body, lower)
+        else:
+            constraint_dict[idx] = (_bound(lower), body, _bound(upper))
+
+    def _rule(backend_model, *idx):
+        return constraint_dict.get(idx if len(idx) > 1 else idx[0], po.Constraint.Skip)
+
+    return _rule
+
+
+def build_expressions(
+    backend_model, model_data, expression_definitions, mask_cache=None
+):
     build_order_dict = {
         expr: config.get("build_order", 0)
         for expr, config in expression_definitions.items()
@@ -147,10 +280,11 @@ def build_expressions(backend_model, model_data, expression_definitions):
 
     for expr_name in build_order:
         subset = create_valid_subset(
-            model_data, expr_name, expression_definitions[expr_name]
+            model_data, expr_name, expression_definitions[expr_name], mask_cache
         )
         if subset is None:
             continue
+        backend_model.__calliope_subsets[expr_name] = subset
         expression_function = _load_rule_function(f"{expr_name}_expression_rule")
         if expression_function:
             kwargs = dict(rule=expression_function)
@@ -173,16 +307,63 @@ def generate_model(model_data):
 
     """
     backend_model = po.ConcreteModel()
+    # Variable/expression/constraint subsets, used to sum over only the valid index items
+    backend_model.__calliope_subsets = {}
+    # Groupings of those subsets, set on first use by `get_sparsity_index`
+    backend_model.__calliope_sparsity_index = {}
+    # Positions of variable/expression members in result arrays, set on first use
+    backend_model.__calliope_result_rows = {}
+    # Expressions evaluated as linear arrays, by the vectorised backend
+    backend_model.__calliope_linear_expressions = {}
+    backend_model.__calliope_array_variables = []
+    subsets_config = model_data.attrs["subsets"]
+    run_config = model_data.attrs["run_config"]
     # remove pandas datetime from xarrays, to reduce memory usage on creating pyomo objects
-    model_data = datetime_to_string(backend_model, model_data)
+    if run_config.get("integer_timesteps", False):
+        model_data = datetime_to_integer(backend_model, model_data)
+    else:
+        model_data = datetime_to_string(backend_model, model_data)
+    cache_parsed_where_strings(subsets_config, run_config)
+    # Parameters can change between operate mode windows, so members found
+    # to be zero over one window may not be zero over the next
+    if run_config.get("presolve", False) and run_config["mode"] != "operate":
+        presolve = Presolve(model_data)
+    else:
+        presolve = None
+    backend_model.__calliope_presolve = presolve
+    # Masks shared between the variables, expressions and constraints of this build
+    mask_cache = MaskCache(presolve)
+    if run_config["backend"] == "pyomo_vectorised" and run_config["mode"] != "operate":
+        array_model = ArrayModel(model_data, mask_cache)
+        array_model.build_variables(subsets_config["variables"])
+        backend_model.__calliope_array_variables = list(array_model.variables)
+    else:
+        array_model = None
 
-    subsets_config = model_data.attrs["subsets"]
     build_sets(model_data, backend_model)
     build_params(model_data, backend_model)
-    build_variables(backend_model, model_data, subsets_config["variables"])
-    build_expressions(backend_model, model_data, subsets_config["expressions"])
-    build_constraints(backend_model, model_data, subsets_config["constraints"])
+    build_variables(
+        backend_model, model_data, subsets_config["variables"], array_model, mask_cache
+    )
+    if presolve is not None:
+        fix_zero_resource_variables(backend_model, presolve)
+    build_expressions(
+        backend_model, model_data, subsets_config["expressions"], mask_cache
+    )
+    build_constraints(
+        backend_model,
+        model_data,
+        subsets_config["constraints"],
+        array_model,
+        mask_cache,
+    )
     build_objective(backend_model)
+    if presolve is not None:
+        deactivate_fixed_constraints(backend_model, presolve)
+    if run_config.get("extract_duals", False):
+        # Filled with all dual values and reduced costs when the solution is loaded
+        backend_model.dual = po.Suffix(direction=po.Suffix.IMPORT)
+        backend_model.rc = po.Suffix(direction=po.Suffix.IMPORT)
     # FIXME: Optional constraints
     # FIXME re-enable loading custom objectives
 
@@ -192,6 +373,67 @@ def generate_model(model_data):
     return backend_model
 
 
+def fix_zero_resource_variables(backend_model, presolve):
+    """
+    Fix the carrier production (and export) of supply technologies to zero in
+    timesteps in which their resource is zero, as found by `presolve`, so that
+    they are written to the solver as constants.
+
+    """
+    zero_resource = presolve.zero_resource
+    if zero_resource is None or not zero_resource.any():
+        return None
+    for var_name in ["carrier_prod", "carrier_export"]:
+        subset = backend_model.__calliope_subsets.get(var_name, None)
+        if subset is None:
+            continue
+        positions = tuple(
+            zero_resource.indexes[dim].get_indexer(subset.get_level_values(dim))
+            for dim in zero_resource.dims
+        )
+        var = getattr(backend_model, var_name)
+        for idx in subset[zero_resource.values[positions]]:
+            var[idx].fix(0)
+
+
+def deactivate_fixed_constraints(backend_model, presolve):
+    """
+    Deactivate those members of constraints over the supply technology
+    timesteps with zero resource found by `presolve` in which all decision
+    variables have been fixed (see :func:`fix_zero_resource_variables`),
+    if they are satisfied, so that they are not written to the solver.
+
+    """
+    zero_resource = presolve.zero_resource
+    if zero_resource is None or not zero_resource.any():
+        return None
+    for name, subset in backend_model.__calliope_subsets.items():
+        constraint = backend_model.find_component(name)
+        if constraint is None or constraint.ctype is not po.Constraint:
+            continue
+        if not set(zero_resource.dims).issubset(subset.names):
+            continue
+        positions = tuple(
+            zero_resource.indexes[dim].get_indexer(subset.get_level_values(dim))
+            for dim in zero_resource.dims
+        )
+        for idx in subset[zero_resource.values[positions]]:
+            if idx not in constraint:
+                continue
+            member = constraint[idx]
+            if all(i.fixed for i in identify_variables(member.body)) and (
+                _is_satisfied(member)
+            ):
+                member.deactivate()
+
+
+def _is_satisfied(constraint, tolerance=1e-10):
+    body = po.value(constraint.body)
+    return (
+        constraint.lower is None or po.value(constraint.lower) - tolerance <= body
+    ) and (constraint.upper is None or body <= po.value(constraint.upper) + tolerance)
+
+
 def solve_model(
     backend_model,
     solver,
@@ -206,10 +448,11 @@ def solve_model(
 
     Returns a Pyomo results object
     """
+    if "persistent" in solver:
+        solve_kwargs.update({"save_results": False, "load_solutions": False})
     if opt is None:
         opt = SolverFactory(solver, solver_io=solver_io)
         if "persistent" in solver:
-            solve_kwargs.update({"save_results": False, "load_solutions": False})
             opt.set_instance(backend_model)
 
     if solver_options:
@@ -239,6 +482,103 @@ def solve_model(
     return results, opt
 
 
+def update_timeseries_params(backend_model, window_model_data, previous_model_data):
+    """
+    Update timeseries Params in-place with the data of the next operate mode
+    window. The backend model keeps the timesteps of the window it was built
+    with, so data are matched by position along the `timesteps` dimension.
+    Only those values that differ from the previous window are updated. New
+    values that are NaN or infinite are replaced by the Param default.
+
+    Parameters
+    ----------
+    backend_model : Pyomo model instance
+    window_model_data : xarray Dataset
+        Timeseries parameters over the next window.
+    previous_model_data : xarray Dataset
+        Timeseries parameters over the window that the Params currently hold.
+
+    Returns
+    -------
+    changed_params : list of Pyomo ParamData
+        The Param items whose values have been updated.
+
+    """
+    timesteps = list(backend_model.timesteps)
+    changed_params = []
+    for var_name, var in window_model_data.data_vars.items():
+        previous = previous_model_data[var_name].values
+        new = var.values
+        changed = ~((previous == new) | (pd.isnull(previous) & pd.isnull(new)))
+        if not changed.any():
+            continue
+        param = backend_model.__calliope_param_lookup[var_name].param
+        default = param.default()
+        new_values = {}
+        for idx, val in get_param_values(
+            var.assign_coords(timesteps=timesteps), where=changed
+        ).items():
+            if pd.isnull(val) or val in [np.inf, -np.inf]:
+                if default is po.Param.NoValue:
+                    continue
+                val = default
+            new_values[idx] = val
+        param.store_values(new_values)
+        changed_params.extend(param[idx] for idx in new_values)
+
+    logger.debug(f"Updated {len(changed_params)} timeseries parameter values")
+
+    return changed_params
+
+
+def update_persistent_solver(backend_model, opt, changed_params):
+    """
+    Push updated Param values to a persistent solver instance (e.g.
+    "gurobi_persistent") by regenerating only the constraints, and the
+    objective, in which those Params appear, rather than the whole problem.
+
+    Parameters
+    ----------
+    backend_model : Pyomo model instance
+    opt : Pyomo persistent solver instance
+        Solver instance to which `backend_model` has already been passed.
+    changed_params : list of Pyomo ParamData
+
+    """
+    if not hasattr(backend_model, "__calliope_param_constraints"):
+        # Which Params appear in which constraints is fixed once the model is
+        # built, so is only found on the first update.
+        param_constraints = {}
+        for constraint in backend_model.component_data_objects(
+            ctype=po.Constraint, active=True
+        ):
+            for param in identify_mutable_parameters(constraint.expr):
+                param_constraints.setdefault(id(param), []).append(constraint)
+        backend_model.__calliope_param_constraints = param_constraints
+        backend_model.__calliope_objective_params = set(
+            id(param) for param in identify_mutable_parameters(backend_model.obj.expr)
+        )
+
+    # Ordered and without duplicates
+    constraints = {
+        constraint: None
+        for param in changed_params
+        for constraint in backend_model.__calliope_param_constraints.get(id(param), [])
+    }
+    for constraint in constraints.keys():
+        opt.remove_constraint(constraint)
+        opt.add_constraint(constraint)
+    if any(
+        id(param) in backend_model.__calliope_objective_params
+        for param in changed_params
+    ):
+        opt.set_objective(backend_model.obj)
+
+    logger.debug(
+        f"Regenerated {len(constraints)} constraints in the persistent solver instance"
+    )
+
+
 def load_results(backend_model, results, opt):
     """Load results into model instance for access via model variables."""
     termination = results.solver.termination_condition
@@ -247,6 +587,8 @@ def load_results(backend_model, results, opt):
         try:
             opt.load_vars()
             this_result = True
+            if backend_model.find_component("dual") is not None:
+                _load_persistent_duals(backend_model, opt)
         except AttributeError:
             this_result = backend_model.solutions.load_from(results)
 
@@ -268,38 +610,223 @@ def load_results(backend_model, results, opt):
     return str(termination)
 
 
+def _load_persistent_duals(backend_model, opt):
+    """
+    Load dual values and reduced costs from a persistent solver instance into
+    the `dual` and `rc` Suffixes. Solvers have none for problems with integer
+    or binary variables, so nothing is loaded and the empty Suffixes are warned
+    about when results are extracted, as with other solver interfaces.
+    """
+    variables = list(backend_model.component_data_objects(po.Var, active=True))
+    if any(not var.is_continuous() for var in variables):
+        return None
+    opt.load_duals()
+    opt.load_rc(variables)
+
+
+def _get_result_dims(dims):
+    # Dimensions are ordered as in `reorganise_xarray_dimensions`
+    steps = [i for i in ["datesteps", "timesteps"] if i in dims]
+    return tuple(sorted(set(dims) - set(steps))) + tuple(steps)
+
+
+def _get_result_rows(backend_model, component):
+    """
+    Get the position of each member of a variable/expression along each of its
+    dimensions, as ordered in the backend model sets, in the order in which the
+    members were constructed. Positions are only computed the first time
+    results are extracted.
+    """
+    result_rows = backend_model.__calliope_result_rows
+    if component.name not in result_rows:
+        dims = tuple(backend_model.__calliope_subsets[component.name].names)
+        keys = list(component._data.keys())
+        if len(dims) == 1:
+            labels = [pd.Index(keys)]
+        else:
+            keys = pd.MultiIndex.from_tuples(keys)
+            labels = [keys.get_level_values(i) for i in range(len(dims))]
+        set_items = {
+            dim: pd.Index(getattr(backend_model, dim)._ordered_values) for dim in dims
+        }
+        result_rows[component.name] = Rows(
+            dims,
+            {dim: set_items[dim].get_indexer(i) for dim, i in zip(dims, labels)},
+            {dim: len(set_items[dim]) for dim in dims},
+        )
+    return result_rows[component.name]
+
+
+def _get_linear_expression_values(backend_model, expression, variable_values):
+    """
+    Get the values of an expression that was evaluated as linear arrays, from
+    the values of all variables, as sparse matrix-vector products.
+    Returns None if not all members of the expression were evaluated this way.
+    """
+    linear_expressions = backend_model.__calliope_linear_expressions.get(
+        expression.name, []
+    )
+    if sum(len(rows) for rows, _ in linear_expressions) != len(expression) or any(
+        i not in variable_values for i in backend_model.__calliope_array_variables
+    ):
+        return None
+
+    all_variable_values = np.concatenate(
+        [variable_values[i] for i in backend_model.__calliope_array_variables]
+    )
+    expression_values = []
+    for rows, linear_array in linear_expressions:
+        indptr, ids, coefs = linear_array.to_csr()
+        matrix = scipy.sparse.csr_matrix(
+            (coefs, ids, indptr), shape=(linear_array.n, len(all_variable_values))
+        )
+        expression_values.append(
+            (rows, matrix @ all_variable_values + linear_array.constant)
+        )
+    return expression_values
+
+
+def _get_result_array(backend_model, name, values):
+    """
+    Place the values of members of variable/expression `name`, given as a list of
+    (`calliope.backend.linear.Rows`, values) pairs, into an array over its
+    dimensions, which is NaN wherever the variable/expression is undefined.
+    """
+    dims = _get_result_dims(backend_model.__calliope_subsets[name].names)
+    coords = {dim: list(getattr(backend_model, dim)._ordered_values) for dim in dims}
+    array = np.full([len(coords[dim]) for dim in dims], np.nan)
+    for rows, row_values in values:
+        array[tuple(rows.positions[dim] for dim in dims)] = row_values
+    return xr.DataArray(array, dims=dims, coords=coords)
+
+
+def _get_dual_result_arrays(backend_model):
+    """
+    Get the dual values of all constraints, as `dual_{constraint name}`, and
+    the reduced costs of all variables, as `reduced_cost_{variable name}`, from
+    those imported by the solver into the `dual` and `rc` Suffixes.
+    """
+    if len(backend_model.dual) == 0 and len(backend_model.rc) == 0:
+        exceptions.warn(
+            "No dual values were returned by the solver (e.g. because the problem "
+            "has integer/binary variables), so none are added to the results."
+        )
+        return {}
+
+    arrays = {}
+    for ctype, suffix, prefix in [
+        (po.Constraint, backend_model.dual, "dual_"),
+        (po.Var, backend_model.rc, "reduced_cost_"),
+    ]:
+        for i in backend_model.component_objects(ctype=ctype):
+            if i.name not in backend_model.__calliope_subsets or len(i) == 0:
+                continue
+            name = i.name[: -len("_constraint")] if ctype is po.Constraint else i.name
+            arrays[prefix + name] = _get_result_array(
+                backend_model,
+                i.name,
+                [(_get_result_rows(backend_model, i), get_suffix_values(suffix, i))],
+            )
+    return arrays
+
+
+def _add_presolved_results(backend_model, all_variables, names):
+    """
+    Set the members of variables/expressions `names` removed by presolve to zero
+    in `all_variables`, adding arrays for those that were removed entirely.
+    """
+    removed = backend_model.__calliope_presolve.removed
+    for name in names:
+        if name not in removed:
+            continue
+        members = removed[name]
+        dims = _get_result_dims(members.names)
+        if name in all_variables:
+            array = all_variables[name].transpose(*dims).copy()
+        else:
+            coords = {
+                dim: list(getattr(backend_model, dim)._ordered_values) for dim in dims
+            }
+            array = xr.DataArray(
+                np.full([len(coords[dim]) for dim in dims], np.nan),
+                dims=dims,
+                coords=coords,
+            )
+        positions = tuple(
+            array.indexes[dim].get_indexer(members.get_level_values(dim))
+            for dim in dims
+        )
+        array.values[positions] = 0
+        all_variables[name] = array
+
+
 def get_result_array(backend_model, model_data):
     """
     From a Pyomo model object, extract decision variable data and return it as
     an xarray Dataset. Any rogue input parameters that are constructed inside
     the backend (instead of being passed by calliope.Model().inputs) are also
     added to calliope.Model()._model_data in-place.
+
+    The values of each variable and expression are read into one array, in the
+    order of their members, and placed into result arrays at integer positions
+    computed from the variable/expression members.
     """
     subsets_config = model_data.attrs["subsets"]
 
     def _get_dim_order(foreach):
         return tuple([i for i in model_data.dims.keys() if i in foreach])
 
-    all_variables = {
-        i.name: get_var(
-            backend_model,
-            i.name,
-            dims=_get_dim_order(subsets_config.variables[i.name].foreach),
-        )
-        for i in backend_model.component_objects(ctype=po.Var)
-    }
-    # Add in expressions, which are combinations of variables (e.g. costs)
-    all_variables.update(
-        {
-            i.name: get_var(
+    variable_values = {}
+    all_variables = {}
+    for i in backend_model.component_objects(ctype=po.Var):
+        if i.name in backend_model.__calliope_subsets:
+            variable_values[i.name] = get_component_values(i)
+            all_variables[i.name] = _get_result_array(
                 backend_model,
                 i.name,
-                dims=_get_dim_order(subsets_config.expressions[i.name].foreach),
-                expr=True,
+                [(_get_result_rows(backend_model, i), variable_values[i.name])],
             )
-            for i in backend_model.component_objects(ctype=po.Expression)
-        }
-    )
+        else:
+            all_variables[i.name] = reorganise_xarray_dimensions(
+                get_var(
+                    backend_model,
+                    i.name,
+                    dims=_get_dim_order(subsets_config.variables[i.name].foreach),
+                )
+            )
+    # Add in expressions, which are combinations of variables (e.g. costs)
+    for i in backend_model.component_objects(ctype=po.Expression):
+        if i.name in backend_model.__calliope_subsets:
+            values = _get_linear_expression_values(backend_model, i, variable_values)
+            if values is None:
+                values = [
+                    (
+                        _get_result_rows(backend_model, i),
+                        get_component_values(i, expr=True),
+                    )
+                ]
+            all_variables[i.name] = _get_result_array(backend_model, i.name, values)
+        else:
+            all_variables[i.name] = reorganise_xarray_dimensions(
+                get_var(
+                    backend_model,
+                    i.name,
+                    dims=_get_dim_order(subsets_config.expressions[i.name].foreach),
+                    expr=True,
+                )
+            )
+
+    # Fill in the members removed by presolve, which are zero
+    if backend_model.__calliope_presolve is not None:
+        _add_presolved_results(
+            backend_model,
+            all_variables,
+            [*subsets_config.variables.keys(), *subsets_config.expressions.keys()],
+        )
+
+    # Add in dual values and reduced costs, if they have been imported from the solver
+    if backend_model.find_component("dual") is not None:
+        all_variables.update(_get_dual_result_arrays(backend_model))
 
     # Get any parameters that did not appear in the user's model.inputs Dataset
     all_params = {
@@ -308,9 +835,7 @@ def get_result_array(backend_model, model_data):
         if i.name not in model_data.data_vars.keys() and "objective_" not in i.name
     }
 
-    results = string_to_datetime(
-        backend_model, reorganise_xarray_dimensions(xr.Dataset(all_variables))
-    )
+    results = string_to_datetime(backend_model, xr.Dataset(all_variables))
 
     if all_params:
         additional_inputs = reorganise_xarray_dimensions(xr.Dataset(all_params))
@@ -318,6 +843,5 @@ def get_result_array(backend_model, model_data):
             additional_inputs[var].attrs["is_result"] = 0
         model_data.update(additional_inputs)
         model_data = string_to_datetime(backend_model, model_data)
-    results = string_to_datetime(backend_model, results)
 
     return results
@@ -11,6 +11,8 @@ Objective functions.
 """
 
 import pyomo.core as po
+
+from calliope.backend.pyomo.util import get_sparsity_index
 from calliope.core.util.tools import load_function
 
 
@@ -38,6 +40,9 @@ def minmax_cost_optimization(backend_model):
     """
 
     def obj_rule(backend_model):
+        cost_sparsity_index = get_sparsity_index(
+            backend_model, "cost", ("nodes", "techs")
+        )
         if backend_model.__calliope_run_config.get("ensure_feasibility", False):
             unmet_demand = (
                 po.quicksum(
@@ -46,11 +51,7 @@ def minmax_cost_optimization(backend_model):
                         - backend_model.unused_supply[carrier, node, timestep]
                     )
                     * backend_model.timestep_weights[timestep]
-                    for [carrier, node, timestep] in backend_model.carriers
-                    * backend_model.nodes
-                    * backend_model.timesteps
-                    if [carrier, node, timestep]
-                    in backend_model.unmet_demand.index_set()
+                    for [carrier, node, timestep] in backend_model.unmet_demand
                 )
                 * backend_model.bigM
             )
@@ -62,9 +63,8 @@ def minmax_cost_optimization(backend_model):
         return (
             po.quicksum(
                 po.quicksum(
-                    backend_model.cost[class_name, node, tech]
-                    for [node, tech] in backend_model.nodes * backend_model.techs
-                    if [class_name, node, tech] in backend_model.cost.index_set()
+                    backend_model.cost[idx]
+                    for idx in cost_sparsity_index.get(class_name, [])
                 )
                 * weight
                 for class_name, weight in backend_model.objective_cost_class.items()
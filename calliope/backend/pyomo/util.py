@@ -6,20 +6,64 @@ Licensed under the Apache 2.0 License (see LICENSE file).
 
 import logging
 import re
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 import xarray as xr
 import pyomo.core as po
+from pyomo.core.base.component_namer import index_repr
+from pyomo.core.base.label import cpxlp_label_from_name
 
-from calliope.core.util.tools import memoize
+from calliope.core.util import sparse_data
 from calliope import exceptions
 
 logger = logging.getLogger(__name__)
 
 
-@memoize
+class ParamLookup:
+    """
+    Lookup table for the values of a single Pyomo Param, held on the backend
+    model (and so released with it) and used by :func:`get_param`.
+
+    Initialised values are read straight from a dictionary. Any other index
+    item that is valid for the Param (i.e. one that takes the Param default)
+    is added to the dictionary the first time it is requested, so that the same
+    mutable Pyomo object is returned every time.
+
+    Parameters
+    ----------
+    param : Pyomo Param
+    ndims : int
+        Number of dimensions over which the Param is indexed.
+
+    """
+
+    def __init__(self, param, ndims):
+        self.param = param
+        self.ndims = ndims
+        self.values = dict(param.sparse_items())
+
+    def get(self, dims, default=None):
+        """
+        Get the Param value at `dims`. If `dims` has one more item than the Param
+        has dimensions (e.g. a timestep for a non-timeseries Param), it is
+        dropped. If the resulting index item is not valid for the Param,
+        `default` is returned.
+
+        """
+        if isinstance(dims, tuple) and len(dims) == self.ndims + 1:
+            dims = dims[:-1] if self.ndims > 1 else dims[0]
+        val = self.values.get(dims, None)
+        if val is None:
+            if dims in self.param.index_set():
+                val = self.values[dims] = self.param[dims]
+            else:
+                return default
+        return val
+
+
 def get_param(backend_model, var, dims):
     """
     Get an input parameter held in a Pyomo object, or held in the defaults
@@ -32,26 +76,11 @@ def get_param(backend_model, var, dims):
     dims : single value or tuple
 
     """
-    try:
-        return getattr(backend_model, var)[dims]
-    except AttributeError:  # i.e. parameter doesn't exist at all
-        logger.debug(
-            "get_param: var {} and dims {} leading to default lookup".format(var, dims)
-        )
-        return backend_model.__calliope_defaults.get(var, None)
-    except KeyError:  # try removing timestep
-        try:
-            if len(dims) > 2:
-                return getattr(backend_model, var)[dims[:-1]]
-            else:
-                return getattr(backend_model, var)[dims[0]]
-        except KeyError:  # Static default value
-            logger.debug(
-                "get_param: var {} and dims {} leading to default lookup".format(
-                    var, dims
-                )
-            )
-            return backend_model.__calliope_defaults.get(var, None)
+    default = backend_model.__calliope_defaults.get(var, None)
+    lookup = backend_model.__calliope_param_lookup.get(var, None)
+    if lookup is None:  # i.e. parameter doesn't exist at all
+        return default
+    return lookup.get(dims, default)
 
 
 def get_previous_timestep(timesteps, timestep):
@@ -59,7 +88,51 @@ def get_previous_timestep(timesteps, timestep):
     return timesteps.at(timesteps.ord(timestep) - 1)
 
 
-@memoize
+def get_sparsity_index(backend_model, component_name, sum_over):
+    """
+    Group the members of the index of a variable or expression by all
+    dimensions except those in `sum_over`, so that sums over `sum_over`
+    only iterate over members that exist, rather than testing every
+    possible combination for membership of the index.
+
+    Parameters
+    ----------
+    backend_model : Pyomo model instance
+    component_name : str
+        Name of a variable or expression.
+    sum_over : str or tuple of str
+        Dimension(s) to sum over, e.g. 'techs'.
+
+    Returns
+    -------
+    dict
+        Maps the labels along the dimensions not summed over (a single value if
+        only one dimension remains, a tuple otherwise) to the list of members
+        of the index in that group, in the order of the index.
+        Empty if the component does not exist.
+
+    """
+    if isinstance(sum_over, str):
+        sum_over = (sum_over,)
+    # Each grouping is found once per model and kept on the model itself
+    sparsity_indices = backend_model.__calliope_sparsity_index
+    if (component_name, sum_over) in sparsity_indices:
+        return sparsity_indices[(component_name, sum_over)]
+    subset = backend_model.__calliope_subsets.get(component_name, None)
+    if subset is None:
+        return {}
+    if set(subset.names).issubset(sum_over):
+        keys = [()] * len(subset)
+    else:
+        keys = subset.droplevel([i for i in subset.names if i in sum_over])
+
+    sparsity_index = {}
+    for key, idx in zip(keys, subset):
+        sparsity_index.setdefault(key, []).append(idx)
+    sparsity_indices[(component_name, sum_over)] = sparsity_index
+    return sparsity_index
+
+
 def get_timestep_weight(backend_model):
     """
     Get the total number of years this model considers, by summing all
@@ -67,12 +140,16 @@ def get_timestep_weight(backend_model):
     and divide it by number of hours in the year. Weight/resolution will almost
     always be 1 per step, unless time clustering/masking/resampling has taken place.
     """
-    time_res = [po.value(i) for i in backend_model.timestep_resolution.values()]
-    weights = [po.value(i) for i in backend_model.timestep_weights.values()]
-    return sum(np.multiply(time_res, weights)) / 8760
+    # Found once per model and kept on the model itself
+    if not hasattr(backend_model, "__calliope_timestep_weight"):
+        time_res = [po.value(i) for i in backend_model.timestep_resolution.values()]
+        weights = [po.value(i) for i in backend_model.timestep_weights.values()]
+        backend_model.__calliope_timestep_weight = (
+            sum(np.multiply(time_res, weights)) / 8760
+        )
+    return backend_model.__calliope_timestep_weight
 
 
-@memoize
 def get_conversion_plus_io(backend_model, tier):
     """
     from a carrier_tier, return the primary tier (of `in`, `out`) and
@@ -141,6 +218,72 @@ def get_var(backend_model, var, dims=None, sparse=False, expr=False):
     return da_resorted
 
 
+def symbolic_labeler(backend_model):
+    """
+    If the components of `backend_model` are indexed over integer-coded
+    datetimes (see datetime_to_integer), returns a labeler for Pyomo problem
+    writers giving each variable and constraint the same symbolic label as if
+    it was indexed over datetime strings (see datetime_to_string).
+    Otherwise, returns None.
+
+    """
+    datetime_labels = getattr(backend_model, "__calliope_datetime_labels", {})
+    string_labels = {
+        set_name: datetime_labels[set_name].strftime("%Y-%m-%d %H:%M").tolist()
+        for attr, set_name in backend_model.__calliope_datetime_data
+        if attr == "coords" and set_name in datetime_labels
+    }
+    if not string_labels:
+        return None
+    # Position of each integer-coded dimension in the index of each component
+    label_positions = {
+        name: [
+            (position, string_labels[dim])
+            for position, dim in enumerate(subset.names)
+            if dim in string_labels
+        ]
+        for name, subset in backend_model.__calliope_subsets.items()
+    }
+
+    def _labeler(component_data):
+        component = component_data.parent_component()
+        if component is component_data or not label_positions.get(component.name):
+            return cpxlp_label_from_name(component_data.name)
+        idx = component_data.index()
+        idx = list(idx) if isinstance(idx, tuple) else [idx]
+        for position, labels in label_positions[component.name]:
+            idx[position] = labels[idx[position]]
+        idx = tuple(idx) if len(idx) > 1 else idx[0]
+        return cpxlp_label_from_name(component.name + index_repr(idx))
+
+    return _labeler
+
+
+def get_component_values(component, expr=False) -> np.ndarray:
+    """
+    Get the values of all members of a Pyomo Var (or Expression, if `expr` is
+    True) as one array, in the order in which the members were constructed.
+    Members without a value are NaN.
+
+    """
+    if expr:
+        values = [po.value(i) for i in component._data.values()]
+    else:
+        values = [i.value for i in component._data.values()]
+    return np.array(values, dtype=np.float_)
+
+
+def get_suffix_values(suffix, component) -> np.ndarray:
+    """
+    Get the values held in a Pyomo Suffix (e.g. dual values imported from the
+    solver) for all members of `component` as one array, in the order in which
+    the members were constructed. Members without a value are NaN.
+
+    """
+    values = [suffix.get(i, np.nan) for i in component._data.values()]
+    return np.array(values, dtype=np.float_)
+
+
 def loc_tech_is_in(backend_model, loc_tech, model_set):
     """
     Check if set exists and if loc_tech is in the set
@@ -174,6 +317,50 @@ def get_domain(var: xr.DataArray) -> str:
         return "Any"
 
 
+def get_param_values(var: xr.DataArray, where: Optional[np.ndarray] = None) -> dict:
+    """
+    Get the values of an input DataArray with which to initialise a Pyomo Param,
+    keyed by index item (a single value for one dimension, a tuple otherwise).
+    NaN and infinite values are dropped, so that the Param default is used in
+    their place.
+
+    This is equivalent to, but much faster than,
+    `var.to_series().dropna().to_dict()` with pandas treating infinite values
+    as NaN, since only valid values are converted to Python objects.
+
+    If given, `where` is a boolean array of the same shape as `var` marking
+    the values to get instead, whether they are valid or not.
+
+    Variables stored in long format are read without expanding them, unless
+    `where` is given.
+
+    """
+    long_format_array = sparse_data.get_long_format_array(var)
+    if where is None and long_format_array is not None:
+        values = long_format_array.values
+    else:
+        values = var.values
+    if where is not None:
+        valid = where
+    else:
+        valid = pd.notnull(values)
+        if values.dtype.kind in "fcO":
+            valid &= (values != np.inf) & (values != -np.inf)
+    if where is None and long_format_array is not None:
+        positions = tuple(i[valid] for i in long_format_array.positions())
+    else:
+        positions = np.nonzero(valid)
+    coords = [
+        var.get_index(dim)[dim_positions].tolist()
+        for dim, dim_positions in zip(var.dims, positions)
+    ]
+    if len(coords) == 1:
+        keys = coords[0]
+    else:
+        keys = zip(*coords)
+    return dict(zip(keys, values[valid].tolist()))
+
+
 def invalid(val) -> bool:
     if isinstance(val, po.base.param._ParamData):
         return val._value == po.Param.NoValue or po.value(val) is None
@@ -211,20 +398,92 @@ def datetime_to_string(
     return model_data
 
 
+def datetime_to_integer(
+    backend_model: po.ConcreteModel, model_data: xr.Dataset
+) -> xr.Dataset:
+    """
+    Convert datetime coordinates (e.g. timesteps) to contiguous integer codes,
+    i.e. the position of each datetime, and the values of datetime data
+    variables to the codes of those values along the coordinate they are taken
+    from, so that Pyomo components are indexed by integers rather than strings.
+    The datetime labels are kept on the backend model, to revert the process
+    with string_to_datetime.
+
+    Parameters
+    ----------
+    backend_model : the backend pyomo model object
+    model_data : the Calliope xarray Dataset of model data
+    """
+    datetime_data = set()
+    datetime_labels = {}
+    for set_name, set_data in list(model_data.coords.items()):
+        if set_data.dtype.kind == "M":
+            attrs = model_data[set_name].attrs
+            datetime_labels[set_name] = set_data.to_index()
+            model_data.coords[set_name] = np.arange(len(datetime_labels[set_name]))
+            model_data[set_name].attrs = attrs
+            datetime_data.add(("coords", set_name))
+
+    for var_name, var_data in list(model_data.data_vars.items()):
+        if var_data.dtype.kind != "M":
+            continue
+        values = var_data.values
+        notnull = pd.notnull(values)
+        for set_name in datetime_labels.keys():
+            codes = datetime_labels[set_name].get_indexer(values[notnull])
+            if (codes >= 0).all():
+                break
+        else:
+            raise exceptions.BackendError(
+                f"Values of `{var_name}` are not all found in any datetime dimension."
+            )
+        if notnull.all():
+            coded_values = np.empty(values.shape, dtype=np.int_)
+        else:
+            coded_values = np.full(values.shape, np.nan, dtype=object)
+        coded_values[notnull] = codes.tolist()
+        model_data[var_name] = var_data.copy(data=coded_values)
+        datetime_labels[var_name] = datetime_labels[set_name]
+        datetime_data.add(("data_vars", var_name))
+
+    backend_model.__calliope_datetime_data = datetime_data
+    backend_model.__calliope_datetime_labels = datetime_labels
+
+    return model_data
+
+
+def _integer_to_datetime(codes, labels):
+    notnull = pd.notnull(codes)
+    datetimes = np.full(codes.shape, np.datetime64("NaT"), dtype="datetime64[ns]")
+    datetimes[notnull] = labels.values[codes[notnull].astype(int)]
+    return datetimes
+
+
 def string_to_datetime(
     backend_model: po.ConcreteModel, model_data: xr.Dataset
 ) -> xr.Dataset:
     """
-    Convert from string to datetime xarray dataarrays, reverting the process
-    undertaken in datetime_to_string
+    Convert from string (or integer code) to datetime xarray dataarrays,
+    reverting the process undertaken in datetime_to_string (or datetime_to_integer)
 
     Parameters
     ----------
     backend_model : the backend pyomo model object
     model_data : the Calliope xarray Dataset of model data
     """
+    datetime_labels = getattr(backend_model, "__calliope_datetime_labels", {})
     for attr, set_name in backend_model.__calliope_datetime_data:
-        if attr == "coords" and set_name in model_data:
+        if set_name in datetime_labels and set_name in model_data:
+            datetimes = _integer_to_datetime(
+                model_data[set_name].values, datetime_labels[set_name]
+            )
+            if attr == "coords":
+                attrs = model_data[set_name].attrs
+                model_data.coords[set_name] = datetimes
+                model_data[set_name].attrs = attrs
+            else:
+                model_data[set_name] = model_data[set_name].copy(data=datetimes)
+        elif attr == "coords" and set_name in model_data:
             model_data.coords[set_name] = model_data[set_name].astype("datetime64[ns]")
         elif set_name in model_data:
             model_data[set_name] = xr.apply_ufunc(
@@ -4,6 +4,7 @@ Licensed under the Apache 2.0 License (see LICENSE file).
 
 """
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
@@ -19,6 +20,10 @@ from calliope.core.attrdict import AttrDict
 
 logger = logging.getLogger(__name__)
 
+BACKEND = {"pyomo": run_pyomo, "pyomo_vectorised": run_pyomo}
+
+INTERFACE = {"pyomo": pyomo_interface, "pyomo_vectorised": pyomo_interface}
+
 
 def run(model_data, timings, build_only=False):
     """
@@ -35,11 +40,21 @@ def run(model_data, timings, build_only=False):
 
     """
 
-    BACKEND = {"pyomo": run_pyomo}
+    run_config = model_data.attrs["run_config"]
 
-    INTERFACE = {"pyomo": pyomo_interface}
+    if run_config.backend == "sparse":
+        raise exceptions.BackendError(
+            "The `sparse` backend can only write models to file, with "
+            "`Model.to_lp` or `Model.to_mps`. Use the `pyomo` backend to "
+            "build and solve models."
+        )
 
-    run_config = model_data.attrs["run_config"]
+    if run_config.backend == "pyomo_vectorised" and run_config["mode"] == "operate":
+        exceptions.warn(
+            "Vectorised constraint generation is not available in operate mode, "
+            "as parameter values are updated between optimisation windows. "
+            "Constraints will be generated by the `pyomo` backend instead."
+        )
 
     if run_config["mode"] == "plan":
         results, backend, opt = run_plan(
@@ -59,6 +74,11 @@ def run(model_data, timings, build_only=False):
             build_only=build_only,
         )
 
+    elif run_config["mode"] == "spores" and (
+        run_config["spores_options"].get("batches", None) and not build_only
+    ):
+        results, backend, opt = run_spores_batches(model_data, run_config, timings)
+
     elif run_config["mode"] == "spores":
         results, backend, opt = run_spores(
             model_data,
@@ -436,6 +456,112 @@ def run_spores(
     return results, backend_model, opt
 
 
+def _run_spores_batch(model_data, run_config):
+    """
+    Run one batch of SPORES in full, in a worker process of
+    :func:`run_spores_batches`, and return its results.
+
+    """
+    model_data.attrs["run_config"] = run_config
+    results, _, _ = run_spores(
+        model_data,
+        run_config,
+        timings={},
+        interface=INTERFACE[run_config.backend],
+        backend=BACKEND[run_config.backend],
+        build_only=False,
+    )
+    return results
+
+
+def combine_spores_batches(batch_results):
+    """
+    Concatenate the results of several batches of SPORES along the `spores`
+    dimension, renumbering SPORES consecutively in the order of the batches.
+    The batch each SPORE comes from is given by the `spores_batch` coordinate.
+
+    Parameters
+    ----------
+    batch_results : list of xarray.Dataset
+        Results of each batch, with a `spores` dimension.
+
+    Returns
+    -------
+    results : xarray.Dataset
+
+    """
+    renumbered_results = []
+    spores_num = 0
+    for batch_num, results in enumerate(batch_results):
+        batch_spores = np.arange(spores_num, spores_num + results.spores.size)
+        spores_num += results.spores.size
+        renumbered_results.append(
+            results.assign_coords(
+                spores=batch_spores,
+                spores_batch=("spores", [batch_num] * len(batch_spores)),
+            )
+        )
+    results = xr.concat(
+        renumbered_results, dim="spores", combine_attrs="drop_conflicts"
+    )
+
+    terminations = [i.attrs.get("termination_condition", "") for i in batch_results]
+    if all(i == "optimal" for i in terminations):
+        results.attrs["termination_condition"] = "optimal"
+    elif all(i in ["optimal", "feasible"] for i in terminations):
+        results.attrs["termination_condition"] = "feasible"
+    else:
+        results.attrs["termination_condition"] = ",".join(terminations)
+
+    return results
+
+
+def run_spores_batches(model_data, run_config, timings):
+    """
+    For use when mode is 'spores' and batches of SPORES are defined in
+    `run.spores_options.batches`. Each batch updates `run.spores_options` with
+    its own settings (e.g. a different `slack`) and is run independently, in
+    a separate process, building its own backend model once.
+    Results are combined along the `spores` dimension.
+
+    """
+    log_time(
+        logger,
+        timings,
+        "run_start",
+        comment="Backend: starting model run in SPORES mode, with batches of SPORES",
+    )
+    spores_config = run_config["spores_options"]
+    batch_run_configs = []
+    for batch in spores_config["batches"]:
+        batch_run_config = run_config.copy()
+        batch_run_config["spores_options"].union(AttrDict(batch), allow_override=True)
+        batch_run_config["spores_options"]["batches"] = None
+        batch_run_configs.append(batch_run_config)
+
+    batch_results = [None] * len(batch_run_configs)
+    with ProcessPoolExecutor(max_workers=spores_config["processes"]) as executor:
+        futures = {
+            executor.submit(_run_spores_batch, model_data, batch_run_config): batch_num
+            for batch_num, batch_run_config in enumerate(batch_run_configs)
+        }
+        for future in as_completed(futures):
+            batch_num = futures[future]
+            batch_results[batch_num] = future.result()
+            log_time(
+                logger,
+                timings,
+                f"run_solution_returned_batch_{batch_num}",
+                time_since_run_start=True,
+                comment=f"Backend: generated solution arrays for SPORES batch {batch_num}",
+            )
+
+    results = combine_spores_batches(batch_results)
+
+    # Backend models only exist in the worker processes
+    return results, None, None
+
+
 def run_operate(model_data, run_config, timings, backend, build_only):
     """
     For use when mode is 'operate', to allow the model to be built, edited, and
@@ -449,6 +575,10 @@ def run_operate(model_data, run_config, timings, backend, build_only):
         comment="Backend: starting model run in operational mode",
     )
 
+    # Parameters are updated in place between windows, so variables stored in
+    # long format (`model.sparse_model_data`) have to be expanded first
+    model_data.load()
+
     defaults = model_data.attrs["defaults"]
 
     # New param defaults = old maximum param defaults (e.g. energy_cap gets default from energy_cap_max)
@@ -535,6 +665,14 @@ def run_operate(model_data, run_config, timings, backend, build_only):
         if "timesteps" in v.dims and v.attrs["is_result"] == 0
     ]
 
+    # Persistent solver instances are kept between windows in which the model is
+    # updated, rather than rebuilt, and only receive the parts of the problem
+    # that have changed
+    persistent = "persistent" in solver
+    _opt = None
+    changed_params = []
+    previous_window_model_data = None
+
     # Loop through each window, solve over the horizon length, and add result to
     # result_array we only go as far as the end of the last horizon, which may
     # clip the last bit of data
@@ -605,19 +743,15 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             )
             # Pyomo model sees the same timestamps each time, we just change the
             # values associated with those timestamps
-            for var in timeseries_data_vars:
-                # New values
-                var_series = (
-                    window_model_data[var].to_series().dropna().replace("inf", np.inf)
+            changed_params.extend(
+                backend.update_timeseries_params(
+                    backend_model,
+                    window_model_data[timeseries_data_vars],
+                    previous_window_model_data[timeseries_data_vars],
                 )
-                # Same timestamps
-                var_series.index = backend_model.__calliope_model_data["data"][
-                    var
-                ].keys()
-                var_dict = var_series.to_dict()
-                # Update pyomo Param with new dictionary
+            )
 
-                getattr(backend_model, var).store_values(var_dict)
+        previous_window_model_data = window_model_data
 
         if not build_only:
             log_time(
@@ -627,6 +761,12 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 time_since_run_start=True,
                 comment="Backend: iteration {}: sending model to solver".format(i + 1),
             )
+            if persistent and warmstart:
+                backend.update_persistent_solver(backend_model, _opt, changed_params)
+            else:
+                _opt = None
+            changed_params = []
+
             # After iteration 1, warmstart = True, which should speed up the process
             # Note: Warmstart isn't possible with GLPK (dealt with later on)
             _results, _opt = backend.solve_model(
@@ -635,6 +775,7 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 solver_io=solver_io,
                 solver_options=solver_options,
                 save_logs=save_logs,
+                opt=_opt,
                 warmstart=warmstart,
             )
 
@@ -675,8 +816,10 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 model_data["storage_initial"].loc[
                     storage_initial.coords
                 ] = storage_initial.values
-                backend_model.storage_initial.store_values(
-                    storage_initial.to_series().dropna().to_dict()
+                storage_initial_values = storage_initial.to_series().dropna().to_dict()
+                backend_model.storage_initial.store_values(storage_initial_values)
+                changed_params.extend(
+                    backend_model.storage_initial[idx] for idx in storage_initial_values
                 )
 
             # Set up total operated units for the next iteration
@@ -685,8 +828,10 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             ).any() and _termination in ["optimal", "feasible"]:
                 operated_units = _results.operating_units.sum("timesteps").astype(int)
                 model_data["operated_units"].loc[{}] += operated_units.values
-                backend_model.operated_units.store_values(
-                    operated_units.to_series().dropna().to_dict()
+                operated_units_values = operated_units.to_series().dropna().to_dict()
+                backend_model.operated_units.store_values(operated_units_values)
+                changed_params.extend(
+                    backend_model.operated_units[idx] for idx in operated_units_values
                 )
 
             log_time(
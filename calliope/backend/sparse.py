@@ -0,0 +1,735 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+sparse.py
+~~~~~~~~~
+
+Assemble the optimisation problem as sparse arrays, straight from the model
+data and the subset definitions in `subsets.yaml`, and write it to file in LP or
+MPS format. No Pyomo objects are built, so a problem can be generated on one
+machine and shipped to a solver on another at a fraction of the time and memory
+cost of building a Pyomo model.
+
+LP files written here are identical to those written by Pyomo for the same
+model (with `symbolic_solver_labels`), except for the header comment.
+
+"""
+from __future__ import annotations
+
+import logging
+from typing import Iterator, Optional
+
+import numpy as np
+import scipy.sparse
+import xarray as xr
+from pyomo.core.base.component_namer import name_repr
+from pyomo.core.base.label import cpxlp_label_from_name
+
+from calliope.backend import build_cache, vectorised
+from calliope.backend.linear import (
+    ArrayModel,
+    ConstraintArray,
+    LinearArray,
+    ObjectiveArray,
+    Rows,
+)
+from calliope.backend.subsets import cache_parsed_where_strings
+from calliope.exceptions import BackendError
+
+logger = logging.getLogger(__name__)
+
+# Lower bound, upper bound, and variable type of each domain
+# (cf. `domain.bounds()` of the equivalent Pyomo sets).
+DOMAINS = {
+    "Reals": (np.nan, np.nan, "continuous"),
+    "NonNegativeReals": (0, np.nan, "continuous"),
+    "NonPositiveReals": (np.nan, 0, "continuous"),
+    "NegativeReals": (np.nan, 0, "continuous"),
+    "PositiveReals": (0, np.nan, "continuous"),
+    "Integers": (np.nan, np.nan, "integer"),
+    "NonNegativeIntegers": (0, np.nan, "integer"),
+    "Binary": (0, 1, "binary"),
+}
+
+
+def _datetime_to_string(model_data: xr.Dataset) -> xr.Dataset:
+    # cf. `calliope.backend.pyomo.util.datetime_to_string`, but on a copy
+    model_data = model_data.copy()
+    for attr in ["coords", "data_vars"]:
+        for set_name, set_data in getattr(model_data, attr).items():
+            if set_data.dtype.kind == "M":
+                attrs = model_data[set_name].attrs
+                model_data[set_name] = model_data[set_name].dt.strftime(
+                    "%Y-%m-%d %H:%M"
+                )
+                model_data[set_name].attrs = attrs
+    return model_data
+
+
+def _load_array_function(name: str):
+    try:
+        return getattr(vectorised, name)
+    except AttributeError:
+        raise BackendError(
+            f"`{name}` is not available, so the model cannot be written "
+            "using the `sparse` backend. Use the `pyomo` backend instead."
+        )
+
+
+class SparseModel:
+    """
+    A Calliope model assembled as sparse arrays, from which LP and MPS files can
+    be written without building a Pyomo model.
+
+    Decision variables, their bounds and domains are taken from the `variables`
+    in `subsets.yaml`, and each constraint and the objective function are
+    evaluated with their array-based equivalent in
+    :mod:`calliope.backend.vectorised`. Constraints are evaluated on demand,
+    one at a time, so that they can be written to file without holding the
+    whole problem in memory.
+
+    Args:
+        model_data (xr.Dataset): Calliope model data.
+    """
+
+    def __init__(self, model_data: xr.Dataset):
+        run_config = model_data.attrs["run_config"]
+        if run_config["mode"] == "operate":
+            raise BackendError(
+                "The `sparse` backend is not available in operate mode, as "
+                "parameter values are updated between optimisation windows."
+            )
+        self._model_data = _datetime_to_string(model_data)
+        self._subsets_config = self._model_data.attrs["subsets"]
+        cache_parsed_where_strings(self._subsets_config, run_config)
+        self._array_model = ArrayModel(self._model_data)
+        self._array_model.build_variables(self._subsets_config["variables"])
+        self._variable_labels: Optional[np.ndarray] = None
+
+    @property
+    def model_data(self) -> xr.Dataset:
+        return self._model_data
+
+    @property
+    def n_variables(self) -> int:
+        return self._array_model.n_variables
+
+    @property
+    def variables(self) -> dict[str, Rows]:
+        return self._array_model.variables
+
+    def index_labels(self, name: str, rows: Rows) -> np.ndarray:
+        """
+        Get the label of component `name` at each of `rows`, as generated by
+        Pyomo's symbolic solver labels (e.g., `energy_cap(a_ccgt)`).
+        """
+        labels = np.full(len(rows), cpxlp_label_from_name(name) + "(", dtype=object)
+        for i, dim in enumerate(rows.dims):
+            coord_labels = np.array(
+                [
+                    cpxlp_label_from_name(name_repr(label))
+                    for label in self._model_data.coords[dim].to_index()
+                ],
+                dtype=object,
+            )
+            if i > 0:
+                labels = labels + "_"
+            labels = labels + coord_labels[rows.positions[dim]]
+        return labels + ")"
+
+    def label_order(self, rows: Rows) -> np.ndarray:
+        """
+        Get the order of `rows` when sorted by their index labels, which is the
+        order in which Pyomo writes the members of unordered index sets.
+        """
+        ranks = [
+            np.argsort(
+                np.argsort(self._model_data.coords[dim].values, kind="stable"),
+                kind="stable",
+            )[rows.positions[dim]]
+            for dim in rows.dims
+        ]
+        return np.lexsort(ranks[::-1])
+
+    @property
+    def variable_labels(self) -> np.ndarray:
+        """Label of each decision variable, ordered by variable ID."""
+        if self._variable_labels is None:
+            labels = [
+                self.index_labels(name, rows) for name, rows in self.variables.items()
+            ]
+            self._variable_labels = (
+                np.concatenate(labels) if labels else np.array([], dtype=object)
+            )
+        return self._variable_labels
+
+    def variable_bounds(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the bounds of each decision variable, ordered by variable ID.
+        Bounds are the tighter of the variable domain and any `bounds` given in
+        `subsets.yaml` (cf. :func:`calliope.backend.pyomo.constraints.capacity.get_capacity_bounds`).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]:
+                Lower bounds, upper bounds (both NaN where unbounded),
+                and the type of each variable ("continuous", "integer" or "binary").
+        """
+        lower, upper, var_types = [], [], []
+        for name, rows in self.variables.items():
+            config = self._subsets_config["variables"][name]
+            if config.domain not in DOMAINS:
+                raise BackendError(
+                    f"Cannot write variable `{name}` with domain `{config.domain}` "
+                    "using the `sparse` backend."
+                )
+            domain_lb, domain_ub, var_type = DOMAINS[config.domain]
+            lb, ub = self._capacity_bounds(rows, config.get("bounds", {}))
+            lb = np.fmax(lb, domain_lb)
+            ub = np.fmin(ub, domain_ub)
+            lower.append(np.where(lb == -np.inf, np.nan, lb))
+            upper.append(np.where(ub == np.inf, np.nan, ub))
+            var_types.append(np.full(len(rows), var_type))
+        if not lower:
+            return np.array([]), np.array([]), np.array([], dtype=str)
+        return np.concatenate(lower), np.concatenate(upper), np.concatenate(var_types)
+
+    def _capacity_bounds(self, rows: Rows, bounds: dict) -> tuple[np.ndarray, ...]:
+        # Array-based equivalent of `get_capacity_bounds`
+        def _get_bound(bound):
+            if bounds.get(bound) is not None:
+                return self._array_model.param(bounds[bound], rows).astype(float)
+            else:
+                return np.full(len(rows), np.nan)
+
+        scale = _get_bound("scale")
+        _equals = _get_bound("equals")
+        _min = _get_bound("min")
+        _max = _get_bound("max")
+
+        valid_scale = ~np.isnan(scale)
+        _equals = np.where(valid_scale, _equals * scale, _equals)
+        valid_equals = ~np.isnan(_equals)
+        lb = np.where(valid_equals, _equals, _min)
+        ub = np.where(valid_equals, _equals, _max)
+        lb = np.where(valid_scale, lb * scale, lb)
+        ub = np.where(valid_scale, ub * scale, ub)
+        return lb, ub
+
+    def constraints(self) -> Iterator[tuple[str, ConstraintArray]]:
+        """
+        Evaluate each constraint in `subsets.yaml` in turn.
+
+        Yields:
+            tuple[str, ConstraintArray]: Constraint name and its constraints.
+        """
+        for name, config in self._subsets_config["constraints"].items():
+            rows = self._array_model.rows(name, config)
+            if rows is None:
+                continue
+            array_function = _load_array_function(f"{name}_constraint_array")
+            yield name, array_function(self._array_model, rows)
+
+    def objective(self) -> ObjectiveArray:
+        """Evaluate the objective function given by `run.objective`."""
+        name = self._model_data.attrs["run_config"]["objective"]
+        return _load_array_function(f"{name}_objective_array")(self._array_model)
+
+    def to_arrays(self) -> dict:
+        """
+        Assemble the whole problem as SciPy sparse arrays, in the form
+        `min/max c @ x + c0` such that `row_lower <= A @ x <= row_upper` and
+        `lb <= x <= ub`. Constraints without bounds are omitted.
+
+        Returns:
+            dict: `A` (scipy.sparse.csr_array), `row_lower`, `row_upper`,
+                `row_labels`, `c`, `c0`, `sense`, `lb`, `ub`, `integrality`
+                (1 for integer variables, 0 otherwise, as expected by
+                :func:`scipy.optimize.milp`), and `column_labels`.
+                Infinite bounds are `-inf`/`inf`.
+        """
+        indptr, ids, coefs = [np.array([0])], [], []
+        row_lower, row_upper, row_labels = [], [], []
+        n_rows = 0
+        for name, constraint_array in self.constraints():
+            constraint_array = _bounded_rows(constraint_array)
+            _indptr, _ids, _coefs = constraint_array.body.to_csr()
+            indptr.append(_indptr[1:] + indptr[-1][-1])
+            ids.append(_ids)
+            coefs.append(_coefs)
+            constant = constraint_array.body.constant
+            row_lower.append(np.nan_to_num(constraint_array.lower, nan=-np.inf))
+            row_upper.append(np.nan_to_num(constraint_array.upper, nan=np.inf))
+            row_lower[-1] = row_lower[-1] - constant
+            row_upper[-1] = row_upper[-1] - constant
+            row_labels.append(
+                self.index_labels(f"{name}_constraint", constraint_array.rows)
+            )
+            n_rows += len(constraint_array.rows)
+
+        objective = self.objective()
+        _, objective_ids, objective_coefs = objective.expression.to_csr()
+        lb, ub, var_types = self.variable_bounds()
+
+        def _concat(arrays, dtype=float):
+            return np.concatenate(arrays) if arrays else np.array([], dtype=dtype)
+
+        return {
+            "A": scipy.sparse.csr_array(
+                (_concat(coefs), _concat(ids, int), np.concatenate(indptr)),
+                shape=(n_rows, self.n_variables),
+            ),
+            "row_lower": _concat(row_lower),
+            "row_upper": _concat(row_upper),
+            "row_labels": _concat(row_labels, object),
+            "c": np.bincount(
+                objective_ids, weights=objective_coefs, minlength=self.n_variables
+            ),
+            "c0": objective.expression.constant[0],
+            "sense": objective.sense,
+            "lb": np.nan_to_num(lb, nan=-np.inf),
+            "ub": np.nan_to_num(ub, nan=np.inf),
+            "integrality": (var_types != "continuous").astype(int),
+            "column_labels": self.variable_labels,
+        }
+
+    def to_cache(self) -> dict[str, np.ndarray]:
+        """
+        Evaluate the whole problem as a flat dictionary of arrays, from which
+        it can be loaded again without evaluating it with :class:`CachedSparseModel`.
+        Each linear expression is stored in compressed sparse row format, and
+        the members of each variable and constraint by their positions along
+        each of their dimensions.
+        """
+        arrays = {}
+
+        def _add_rows(prefix, rows):
+            arrays[f"{prefix}/dims"] = np.array(rows.dims, dtype=str)
+            for dim in rows.dims:
+                arrays[f"{prefix}/positions/{dim}"] = rows.positions[dim]
+
+        def _add_linear_array(prefix, linear_array):
+            indptr, ids, coefs = linear_array.to_csr()
+            arrays[f"{prefix}/indptr"] = indptr
+            arrays[f"{prefix}/ids"] = ids
+            arrays[f"{prefix}/coefs"] = coefs
+            arrays[f"{prefix}/constant"] = linear_array.constant
+
+        arrays["variables"] = np.array(list(self.variables.keys()), dtype=str)
+        for name, rows in self.variables.items():
+            _add_rows(f"variables/{name}", rows)
+        lb, ub, var_types = self.variable_bounds()
+        arrays["bounds/lower"] = lb
+        arrays["bounds/upper"] = ub
+        arrays["bounds/types"] = var_types.astype(str)
+
+        constraint_names = []
+        for name, constraint_array in self.constraints():
+            constraint_names.append(name)
+            _add_rows(f"constraints/{name}", constraint_array.rows)
+            arrays[f"constraints/{name}/lower"] = constraint_array.lower
+            arrays[f"constraints/{name}/upper"] = constraint_array.upper
+            _add_linear_array(f"constraints/{name}", constraint_array.body)
+        arrays["constraints"] = np.array(constraint_names, dtype=str)
+
+        objective = self.objective()
+        arrays["objective/sense"] = np.array(objective.sense)
+        _add_linear_array("objective", objective.expression)
+
+        return arrays
+
+
+class CachedSparseModel(SparseModel):
+    """
+    A Calliope model assembled as sparse arrays, loaded from the arrays returned
+    by :meth:`SparseModel.to_cache` rather than evaluated from the model data.
+
+    Args:
+        model_data (xr.Dataset):
+            Calliope model data from which the cached arrays were evaluated.
+        arrays (dict[str, np.ndarray]): Arrays returned by :meth:`SparseModel.to_cache`.
+    """
+
+    def __init__(self, model_data: xr.Dataset, arrays: dict[str, np.ndarray]):
+        self._model_data = _datetime_to_string(model_data)
+        self._subsets_config = self._model_data.attrs["subsets"]
+        self._arrays = arrays
+        self._variables = {
+            name: self._rows(f"variables/{name}")
+            for name in arrays["variables"].tolist()
+        }
+        self._variable_labels = None
+
+    def _rows(self, prefix: str) -> Rows:
+        dims = tuple(self._arrays[f"{prefix}/dims"].tolist())
+        return Rows(
+            dims,
+            {dim: self._arrays[f"{prefix}/positions/{dim}"] for dim in dims},
+            {dim: self._model_data.sizes[dim] for dim in dims},
+        )
+
+    def _linear_array(self, prefix: str) -> LinearArray:
+        indptr = self._arrays[f"{prefix}/indptr"]
+        n = len(indptr) - 1
+        return LinearArray(
+            n,
+            np.repeat(np.arange(n), np.diff(indptr)),
+            self._arrays[f"{prefix}/ids"],
+            self._arrays[f"{prefix}/coefs"],
+            self._arrays[f"{prefix}/constant"],
+        )
+
+    @property
+    def n_variables(self) -> int:
+        return sum(len(rows) for rows in self._variables.values())
+
+    @property
+    def variables(self) -> dict[str, Rows]:
+        return self._variables
+
+    def variable_bounds(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (
+            self._arrays["bounds/lower"],
+            self._arrays["bounds/upper"],
+            self._arrays["bounds/types"],
+        )
+
+    def constraints(self) -> Iterator[tuple[str, ConstraintArray]]:
+        for name in self._arrays["constraints"].tolist():
+            prefix = f"constraints/{name}"
+            yield name, ConstraintArray(
+                self._rows(prefix),
+                self._arrays[f"{prefix}/lower"],
+                self._linear_array(prefix),
+                self._arrays[f"{prefix}/upper"],
+            )
+
+    def objective(self) -> ObjectiveArray:
+        return ObjectiveArray(
+            str(self._arrays["objective/sense"]), self._linear_array("objective")
+        )
+
+    def to_cache(self) -> dict[str, np.ndarray]:
+        return self._arrays
+
+
+def get_sparse_model(model_data: xr.Dataset) -> SparseModel:
+    """
+    Get the model assembled as sparse arrays. If `run.build_cache_path` is set,
+    it is loaded from the build cache if the same model has been assembled
+    before, and otherwise added to it (see :mod:`calliope.backend.build_cache`).
+
+    Args:
+        model_data (xr.Dataset): Calliope model data.
+
+    Returns:
+        SparseModel: Model to write to file.
+    """
+    run_config = model_data.attrs["run_config"]
+    cache_path = run_config.get("build_cache_path", None)
+    if cache_path is None:
+        return SparseModel(model_data)
+
+    key = build_cache.model_data_hash(model_data)
+    arrays = build_cache.read_cached_build(cache_path, key)
+    if arrays is None:
+        arrays = SparseModel(model_data).to_cache()
+        build_cache.write_cached_build(
+            cache_path, key, arrays, run_config["build_cache_max_size"]
+        )
+    return CachedSparseModel(model_data, arrays)
+
+
+def _no_negative_zero(values: np.ndarray) -> np.ndarray:
+    return np.where(values == 0, 0, values)
+
+
+def _format_terms(
+    indptr: np.ndarray,
+    ids: np.ndarray,
+    coefs: np.ndarray,
+    labels: np.ndarray,
+    rank: np.ndarray,
+) -> list[str]:
+    """
+    Format the linear terms of each row, ordered by variable label,
+    as `+coef label` lines.
+    """
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.lexsort((rank[ids], rows))
+    terms = [
+        "%+.17g %s\n" % term
+        for term in zip(coefs[order].tolist(), labels[ids[order]].tolist())
+    ]
+    return [
+        "".join(terms[start:end]) or "+0 ONE_VAR_CONSTANT\n"
+        for start, end in zip(indptr[:-1].tolist(), indptr[1:].tolist())
+    ]
+
+
+def _bounded_rows(constraint_array: ConstraintArray) -> ConstraintArray:
+    # Constraints without bounds are non-binding
+    return constraint_array.select(
+        ~(np.isnan(constraint_array.lower) & np.isnan(constraint_array.upper))
+    )
+
+
+def _reorder(constraint_array: ConstraintArray, order: np.ndarray) -> ConstraintArray:
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return ConstraintArray(
+        constraint_array.rows.select(order),
+        constraint_array.lower[order],
+        constraint_array.body.group(inverse, len(order)),
+        constraint_array.upper[order],
+    )
+
+
+def _format_constraints(
+    con_labels: list[str],
+    bodies: list[str],
+    lower: list[float],
+    upper: list[float],
+    equality: list[bool],
+) -> str:
+    output = []
+    for label, body, lb, ub, eq in zip(con_labels, bodies, lower, upper, equality):
+        if eq:
+            output.append("c_e_%s_:\n%s= %.17g\n\n" % (label, body, lb))
+            continue
+        has_lb, has_ub = lb == lb, ub == ub
+        if has_lb:
+            prefix = "r_l_" if has_ub else "c_l_"
+            output.append("%s%s_:\n%s>= %.17g\n\n" % (prefix, label, body, lb))
+        if has_ub:
+            prefix = "r_u_" if has_lb else "c_u_"
+            output.append("%s%s_:\n%s<= %.17g\n\n" % (prefix, label, body, ub))
+    return "".join(output)
+
+
+def write_lp(sparse_model: SparseModel, path: str, chunk_size: int = 10000) -> None:
+    """
+    Write a model to file in CPLEX LP format, formatting `chunk_size`
+    constraints at a time.
+
+    Args:
+        sparse_model (SparseModel): Model to write.
+        path (str): Path of the LP file.
+        chunk_size (int, optional): Number of constraints to format before
+            writing them to file. Defaults to 10000.
+    """
+    labels = sparse_model.variable_labels
+    rank = np.argsort(np.argsort(labels.astype(str), kind="stable"))
+    referenced = np.zeros(sparse_model.n_variables, dtype=bool)
+    variables = sparse_model.variables
+    model_name = sparse_model.model_data.attrs.get("model_config", {}).get(
+        "name", "unknown"
+    )
+
+    with open(path, "w") as f:
+        f.write("\\* Source Calliope model name=%s *\\\n\n" % model_name)
+
+        objective = sparse_model.objective()
+        f.write("min \n" if objective.sense == "minimize" else "max \n")
+        f.write("obj:\n")
+        indptr, ids, coefs = objective.expression.to_csr()
+        referenced[ids] = True
+        constant = objective.expression.constant[0]
+        if len(ids) == 0:
+            logger.warning(
+                "Constant objective detected, replacing "
+                "with a placeholder to prevent solver failure."
+            )
+        else:
+            f.write(_format_terms(indptr, ids, coefs, labels, rank)[0])
+        if len(ids) == 0 or constant != 0:
+            f.write("%+.17g ONE_VAR_CONSTANT\n" % constant)
+
+        f.write("\ns.t.\n\n")
+        for name, constraint_array in sparse_model.constraints():
+            constraint_array = _bounded_rows(constraint_array)
+            constraint_array = _reorder(
+                constraint_array, sparse_model.label_order(constraint_array.rows)
+            )
+            indptr, ids, coefs = constraint_array.body.to_csr()
+            referenced[ids] = True
+            con_labels = sparse_model.index_labels(
+                f"{name}_constraint", constraint_array.rows
+            ).tolist()
+            constant = constraint_array.body.constant
+            lower = _no_negative_zero(constraint_array.lower - constant).tolist()
+            upper = _no_negative_zero(constraint_array.upper - constant).tolist()
+            equality = (constraint_array.lower == constraint_array.upper).tolist()
+            for start in range(0, len(con_labels), chunk_size):
+                end = min(start + chunk_size, len(con_labels))
+                terms = slice(indptr[start], indptr[end])
+                bodies = _format_terms(
+                    indptr[start : end + 1] - indptr[start],
+                    ids[terms],
+                    coefs[terms],
+                    labels,
+                    rank,
+                )
+                f.write(
+                    _format_constraints(
+                        con_labels[start:end],
+                        bodies,
+                        lower[start:end],
+                        upper[start:end],
+                        equality[start:end],
+                    )
+                )
+
+        f.write("c_e_ONE_VAR_CONSTANT: \nONE_VAR_CONSTANT = 1.0\n\n")
+
+        # Only variables referenced in the objective or constraints are written
+        f.write("bounds\n")
+        lb, ub, var_types = sparse_model.variable_bounds()
+        ids = np.concatenate(
+            [
+                offset + sparse_model.label_order(rows)
+                for offset, rows in zip(
+                    np.cumsum([0] + [len(rows) for rows in variables.values()]),
+                    variables.values(),
+                )
+            ]
+            or [np.array([], dtype=int)]
+        )
+        ids = ids[referenced[ids]]
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start : start + chunk_size]
+            f.write(
+                "".join(
+                    "   "
+                    + (" -inf <= " if _lb != _lb else "%.17g <= " % _lb)
+                    + label
+                    + (" <= +inf\n" if _ub != _ub else " <= %.17g\n" % _ub)
+                    for _lb, label, _ub in zip(
+                        _no_negative_zero(lb[chunk]).tolist(),
+                        labels[chunk].tolist(),
+                        _no_negative_zero(ub[chunk]).tolist(),
+                    )
+                )
+            )
+        for var_type, section in [("integer", "general"), ("binary", "binary")]:
+            type_ids = ids[var_types[ids] == var_type]
+            if len(type_ids) > 0:
+                f.write(f"{section}\n")
+                f.write("".join(f"  {label}\n" for label in labels[type_ids]))
+
+        f.write("end\n")
+
+
+def write_mps(sparse_model: SparseModel, path: str, chunk_size: int = 10000) -> None:
+    """
+    Write a model to file in free MPS format, formatting `chunk_size`
+    variables at a time. Rows and columns are named as in LP files written by
+    :func:`write_lp`. Constraints without finite bounds are omitted, as are
+    variables which are not referenced in the objective or any constraint.
+
+    Args:
+        sparse_model (SparseModel): Model to write.
+        path (str): Path of the MPS file.
+        chunk_size (int, optional): Number of variables to format before
+            writing them to file. Defaults to 10000.
+    """
+    arrays = sparse_model.to_arrays()
+    row_lower, row_upper = arrays["row_lower"], arrays["row_upper"]
+    equality = row_lower == row_upper
+    has_lb, has_ub = row_lower != -np.inf, row_upper != np.inf
+    keep = equality | has_lb | has_ub
+    A = arrays["A"][keep].tocsc()
+    row_labels = arrays["row_labels"][keep]
+    row_lower, row_upper = row_lower[keep], row_upper[keep]
+    equality, has_lb, has_ub = equality[keep], has_lb[keep], has_ub[keep]
+    row_types = np.where(equality, "E", np.where(has_lb, "G", "L"))
+    rhs = np.where(equality | has_lb, row_lower, row_upper)
+    is_ranged = ~equality & has_lb & has_ub
+
+    c = arrays["c"]
+    referenced = (np.diff(A.indptr) > 0) | (c != 0)
+    labels = arrays["column_labels"]
+    model_name = sparse_model.model_data.attrs.get("model_config", {}).get(
+        "name", "unknown"
+    )
+
+    with open(path, "w") as f:
+        f.write(f"NAME {model_name}\n")
+        if arrays["sense"] == "maximize":
+            f.write("OBJSENSE\n    MAX\n")
+        f.write("ROWS\n N  obj\n")
+        f.write(
+            "".join(
+                f" {row_type}  {label}\n"
+                for row_type, label in zip(row_types.tolist(), row_labels.tolist())
+            )
+        )
+
+        f.write("COLUMNS\n")
+        is_integer = arrays["integrality"] == 1
+        in_integer_block = False
+        ids = np.flatnonzero(referenced)
+        for start in range(0, len(ids), chunk_size):
+            output = []
+            for i in ids[start : start + chunk_size].tolist():
+                if is_integer[i] != in_integer_block:
+                    marker = "INTORG" if is_integer[i] else "INTEND"
+                    output.append(f"    MARKER 'MARKER' '{marker}'\n")
+                    in_integer_block = is_integer[i]
+                label = labels[i]
+                if c[i] != 0:
+                    output.append("    %s obj %.17g\n" % (label, c[i]))
+                col = slice(A.indptr[i], A.indptr[i + 1])
+                output.extend(
+                    "    %s %s %.17g\n" % (label, row_labels[j], coef)
+                    for j, coef in zip(A.indices[col].tolist(), A.data[col].tolist())
+                )
+            f.write("".join(output))
+        if in_integer_block:
+            f.write("    MARKER 'MARKER' 'INTEND'\n")
+
+        f.write("RHS\n")
+        if arrays["c0"] != 0:
+            f.write("    RHS obj %.17g\n" % -arrays["c0"])
+        f.write(
+            "".join(
+                "    RHS %s %.17g\n" % (label, val)
+                for label, val in zip(row_labels[rhs != 0].tolist(), rhs[rhs != 0])
+            )
+        )
+
+        if is_ranged.any():
+            f.write("RANGES\n")
+            f.write(
+                "".join(
+                    "    RNG %s %.17g\n" % (label, val)
+                    for label, val in zip(
+                        row_labels[is_ranged].tolist(),
+                        (row_upper - row_lower)[is_ranged].tolist(),
+                    )
+                )
+            )
+
+        # Bounds are always given explicitly, as defaults differ between solvers
+        f.write("BOUNDS\n")
+        lb, ub = arrays["lb"], arrays["ub"]
+        output = []
+        for i in ids.tolist():
+            label, _lb, _ub = labels[i], lb[i], ub[i]
+            if _lb == _ub:
+                output.append(" FX BND %s %.17g\n" % (label, _lb))
+                continue
+            if _lb == -np.inf:
+                output.append(" MI BND %s\n" % label)
+            else:
+                output.append(" LO BND %s %.17g\n" % (label, _lb))
+            if _ub == np.inf:
+                output.append(" PL BND %s\n" % label)
+            else:
+                output.append(" UP BND %s %.17g\n" % (label, _ub))
+            if len(output) > chunk_size:
+                f.write("".join(output))
+                output = []
+        f.write("".join(output))
+
+        f.write("ENDATA\n")
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
-from typing import Union
+from typing import Optional, Union, TYPE_CHECKING
+import functools
+import hashlib
+import logging
 import operator
+import os
+import pickle
 
 import pyparsing as pp
 import numpy as np
@@ -11,8 +16,13 @@ import pandas as pd
 from calliope.backend import equation_parser
 from calliope.exceptions import BackendError
 
+if TYPE_CHECKING:
+    from calliope.backend.subsets import MaskCache
+
 pp.ParserElement.enablePackrat()
 
+logger = logging.getLogger(__name__)
+
 BOOLEANTYPE = Union[np.bool_, np.typing.NDArray[np.bool_]]
 
 
@@ -124,7 +134,12 @@ class DataVarParser:
             return model_data_var.where(pd.notnull(model_data_var)).notnull()
 
     def eval(
-        self, model_data: xr.Dataset, defaults: dict, apply_imask: bool = True, **kwargs
+        self,
+        model_data: xr.Dataset,
+        defaults: dict,
+        apply_imask: bool = True,
+        mask_cache: Optional[MaskCache] = None,
+        **kwargs,
     ) -> Union[np.bool_, xr.DataArray]:
         """
         Get parsed model data variable from the Calliope model dataset.
@@ -136,6 +151,9 @@ class DataVarParser:
                 If True, return boolean array corresponding to whether there is data or
                 not in each element of the array. If False, return original array.
                 Defaults to True.
+            mask_cache (Optional[MaskCache], optional):
+                If given, the boolean array is shared with all other "where" strings
+                evaluated with the same cache. Defaults to None.
 
         Returns:
             Union[np.bool_, xr.DataArray]:
@@ -145,7 +163,13 @@ class DataVarParser:
             return np.False_
 
         if apply_imask:
-            return self._data_var_exists(model_data[self.data_var])
+            if mask_cache is None:
+                return self._data_var_exists(model_data[self.data_var])
+            else:
+                return mask_cache.get(
+                    ("data_var", self.data_var),
+                    lambda: self._data_var_exists(model_data[self.data_var]),
+                )
         else:
             return model_data[self.data_var].fillna(defaults.get(self.data_var))
 
@@ -431,13 +455,14 @@ def imasking_parser(
     return imask_rules
 
 
+@functools.lru_cache(maxsize=None)
 def generate_where_string_parser() -> pp.ParserElement:
     """
-    Args:
-        parse_string (str): Constraint subsetting "where" string.
+    The grammar is only generated once per process, after which the same parser
+    element is returned on every call.
 
     Returns:
-        pp.ParseResults: evaluatable to a bool/boolean array.
+        pp.ParserElement: Parser of constraint subsetting "where" strings.
     """
     number, generic_identifier = equation_parser.setup_base_parser_elements()
     data_var = data_var_parser(generic_identifier)
@@ -457,3 +482,111 @@ def generate_where_string_parser() -> pp.ParserElement:
     )
     subset = subset_parser(generic_identifier, evaluatable_string, number)
     return imasking_parser(bool_operand, helper_function, data_var, comparison, subset)
+
+
+# Parsed "where" strings, keyed by the string, shared by all models in a process
+_PARSED_WHERE_STRINGS: dict[str, pp.ParseResults] = {}
+# Whether any strings have been parsed since the parsed strings were last loaded/saved
+_PARSED_WHERE_STRINGS_UPDATED = False
+
+
+def parse_where_string(where_string: str) -> pp.ParseResults:
+    """
+    Parse a "where" string, reusing the result if the same string has already
+    been parsed in this process.
+
+    Args:
+        where_string (str): Constraint subsetting "where" string.
+
+    Returns:
+        pp.ParseResults: evaluatable to a bool/boolean array.
+    """
+    global _PARSED_WHERE_STRINGS_UPDATED
+    if where_string not in _PARSED_WHERE_STRINGS:
+        _PARSED_WHERE_STRINGS[
+            where_string
+        ] = generate_where_string_parser().parse_string(where_string, parse_all=True)
+        _PARSED_WHERE_STRINGS_UPDATED = True
+    return _PARSED_WHERE_STRINGS[where_string]
+
+
+def _parsed_where_strings_key() -> str:
+    # Parsed strings saved to file are only valid for the grammar they were parsed
+    # with, so they are keyed by the parser source code and the pyparsing version
+    key = hashlib.sha1(pp.__version__.encode("utf-8"))
+    for module_file in [__file__, equation_parser.__file__]:
+        with open(module_file, "rb") as f:
+            key.update(f.read())
+    return key.hexdigest()
+
+
+def _is_private_file(fd: int) -> bool:
+    # Owned by the current user and not writable by anyone else (POSIX only)
+    if not hasattr(os, "getuid"):
+        return True
+    stat = os.fstat(fd)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def load_parsed_where_strings(path: str) -> None:
+    """
+    Load "where" strings previously parsed and saved to file with
+    :func:`save_parsed_where_strings`, so that they are not parsed again in
+    this process. Nothing is loaded if the file does not exist, was saved with
+    a different version of the parsing grammar, or could have been written by
+    another user (since unpickling it could then run their code).
+
+    Args:
+        path (str): Path to file of parsed "where" strings.
+    """
+    global _PARSED_WHERE_STRINGS_UPDATED
+    try:
+        with open(path, "rb") as f:
+            if not _is_private_file(f.fileno()):
+                logger.debug(
+                    f"Ignoring parsed `where` strings in {path}, as it can be "
+                    "written by other users"
+                )
+                return None
+            key, parsed_where_strings = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if key != _parsed_where_strings_key():
+        logger.debug(f"Ignoring outdated parsed `where` strings in {path}")
+        return None
+    new_where_strings = parsed_where_strings.keys() - _PARSED_WHERE_STRINGS.keys()
+    _PARSED_WHERE_STRINGS.update(
+        {k: parsed_where_strings[k] for k in new_where_strings}
+    )
+    # Only strings not already in the file need saving
+    _PARSED_WHERE_STRINGS_UPDATED = (
+        _PARSED_WHERE_STRINGS.keys() != parsed_where_strings.keys()
+    )
+
+
+def save_parsed_where_strings(path: str) -> None:
+    """
+    Save all "where" strings parsed in this process to file, if any have been
+    parsed since they were last loaded from or saved to file. If the file cannot
+    be written (e.g. the directory is read-only), nothing is saved. The
+    directory is created, readable by the current user only, if it does not
+    exist.
+
+    Args:
+        path (str): Path to file of parsed "where" strings.
+    """
+    global _PARSED_WHERE_STRINGS_UPDATED
+    if not _PARSED_WHERE_STRINGS_UPDATED:
+        return None
+    # The file is written under a temporary name and then renamed, so that it is
+    # only ever read once it is complete
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump((_parsed_where_strings_key(), _PARSED_WHERE_STRINGS), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.debug(f"Could not save parsed `where` strings to {path}: {e}")
+    else:
+        _PARSED_WHERE_STRINGS_UPDATED = False
@@ -11,14 +11,36 @@ Create subsets over which the model objects are valid.
 
 import operator
 import functools
+import os
 import re
 import ast
 
+import numpy as np
+import pandas as pd
 import xarray as xr
 from calliope.core.util.dataset import reorganise_xarray_dimensions
-from calliope.backend.subset_parser import generate_where_string_parser
+from calliope.backend import subset_parser
 from calliope.exceptions import print_warnings_and_raise_errors
 
+# Name of the file in which parsed "where" strings are saved
+PARSED_WHERE_STRINGS_FILE = "subsets.parsed.pkl"
+
+
+def _user_cache_dir():
+    """
+    Per-user cache directory, following the XDG base directory specification
+    (or using the local application data directory on Windows).
+    """
+    if os.name == "nt":
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser(
+            os.path.join("~", "AppData", "Local")
+        )
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+            os.path.join("~", ".cache")
+        )
+    return os.path.join(base_dir, "calliope")
+
 
 def _inheritance(model_data, **kwargs):
     def __inheritance(tech_group):
@@ -33,7 +55,80 @@ VALID_HELPER_FUNCTIONS = {
 }
 
 
-def create_valid_subset(model_data, name, config):
+class MaskCache:
+    """
+    Boolean masks shared by all the variables, expressions and constraints of a
+    single model build, such as the mask of each combination of `foreach` sets
+    and the evaluation of each data variable and "where" string over it.
+    Masks are stored bit-packed, since they can be large once broadcast over
+    many model dimensions, and a new copy is unpacked on every lookup.
+
+    Parameters
+    ----------
+    presolve : calliope.backend.presolve.Presolve, optional
+        If given, the members it finds to be zero are removed from all valid
+        subsets created with this cache.
+
+    """
+
+    def __init__(self, presolve=None):
+        self._masks = {}
+        self.presolve = presolve
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __contains__(self, key):
+        return key in self._masks
+
+    def get(self, key, create):
+        """
+        Get the mask stored under `key`, first storing the mask returned by
+        `create()` if there is none yet.
+
+        Parameters
+        ----------
+        key : tuple
+        create : callable
+            Function without arguments, returning an xarray.DataArray or a bool.
+
+        Returns
+        -------
+        mask : xarray.DataArray or bool
+
+        """
+        if key not in self._masks:
+            self._masks[key] = _pack_mask(create())
+        return _unpack_mask(self._masks[key])
+
+
+def _pack_mask(mask):
+    if not isinstance(mask, xr.DataArray) or mask.dtype != bool:
+        return mask
+    return (
+        np.packbits(mask.values, axis=None),
+        mask.shape,
+        mask.dims,
+        {k: v.variable for k, v in mask.coords.items()},
+    )
+
+
+def _unpack_mask(packed_mask):
+    if not isinstance(packed_mask, tuple):
+        return packed_mask
+    packed, shape, dims, coords = packed_mask
+    values = np.unpackbits(packed, count=int(np.prod(shape))).reshape(shape)
+    return xr.DataArray(values.astype(bool), coords=coords, dims=dims)
+
+
+def _get_mask(mask_cache, key, create):
+    if mask_cache is None:
+        return create()
+    else:
+        return mask_cache.get(key, create)
+
+
+def create_valid_subset(model_data, name, config, mask_cache=None):
     """
     Returns the subset for which a given constraint, variable or
     expression is valid, based on the given configuration. See `config/subsets.yaml` for
@@ -47,35 +142,77 @@ def create_valid_subset(model_data, name, config):
         Name of the constraint, variable or expression
     config : dict
         Configuration for the constraint, variable or expression
+    mask_cache : MaskCache, optional
+        Masks shared with the other components of the same model build.
 
     Returns
     -------
     valid_subset : pandas.MultiIndex
 
+    """
+    imask = create_valid_subset_mask(model_data, name, config, mask_cache)
+    if imask is None:
+        return None
+    else:
+        return _get_valid_subset(imask)
+
+
+def create_valid_subset_mask(model_data, name, config, mask_cache=None):
+    """
+    Returns the boolean mask from which the valid subset of a given constraint,
+    variable or expression is derived (see :func:`create_valid_subset`).
+
+    Parameters
+    ----------
+
+    model_data : xarray.Dataset (calliope.Model._model_data)
+    name : str
+        Name of the constraint, variable or expression
+    config : dict
+        Configuration for the constraint, variable or expression
+    mask_cache : MaskCache, optional
+        Masks shared with the other components of the same model build.
+
+    Returns
+    -------
+    imask : xarray.DataArray or None
+        Boolean array over the dimensions given in `config.foreach`, ordered
+        according to :func:`calliope.core.util.dataset.reorganise_xarray_dimensions`.
+        None if the subset is empty.
+
     """
 
     # Start with a mask that is True where the tech exists at a node (across all timesteps and for a each carrier and cost, where appropriate)
-    imask = _imask_foreach(model_data, config.foreach)
+    foreach = tuple(config.foreach)
+    imask = _get_mask(
+        mask_cache,
+        ("foreach", foreach),
+        functools.partial(_imask_foreach, model_data, foreach),
+    )
     if imask is False:  # i.e. not all of 'foreach' are in model_data
         return None
     # Add "where" info as imasks
     where_string = config.get_key("where", default=[])
-    parser = generate_where_string_parser()
     if where_string:
-        where_string_evaluated = parser.parse_string(where_string, parse_all=True)[
-            0
-        ].eval(
-            model_data=model_data,
-            helper_func_dict=VALID_HELPER_FUNCTIONS,
-            imask=imask,
-            defaults=model_data.attrs["defaults"],
-        )
-        imask = imask & where_string_evaluated
+
+        def _where_imask():
+            where_string_evaluated = subset_parser.parse_where_string(where_string)[
+                0
+            ].eval(
+                model_data=model_data,
+                helper_func_dict=VALID_HELPER_FUNCTIONS,
+                imask=imask,
+                defaults=model_data.attrs["defaults"],
+                mask_cache=mask_cache,
+            )
+            return imask & where_string_evaluated
+
+        imask = _get_mask(mask_cache, ("where", foreach, where_string), _where_imask)
 
     # Add imask based on subsets
     imask = _subset_imask(name, config, imask)
 
-    # Only build and return imask if there are some non-zero elements
+    # Only return imask if there are some non-zero elements
     if isinstance(imask, xr.DataArray) and imask.sum() != 0:
         # Squeeze out any unwanted dimensions
         if len(imask.dims) > len(config.foreach):
@@ -84,22 +221,78 @@ def create_valid_subset(model_data, name, config):
         if len(imask.dims) < len(config.foreach):
             raise ValueError(f"Missing dimension(s) in imask for set {name}")
 
-        valid_subset = _get_valid_subset(
-            reorganise_xarray_dimensions(imask).astype(bool)
-        )
+        imask = reorganise_xarray_dimensions(imask).astype(bool)
+        if mask_cache is not None and mask_cache.presolve is not None:
+            imask = _presolve_imask(model_data, name, foreach, imask, mask_cache)
+            if not imask.any():
+                return None
 
-        return valid_subset
+        return imask
 
     else:
         return None
 
 
-def _get_valid_subset(imask):
-    if len(imask.dims) == 1:
-        return imask[imask].coords.to_index()
+def cache_parsed_where_strings(subsets_config, run_config):
+    """
+    If ``run.cache_parsed_where_strings`` is set, load the "where" strings of
+    all variables, expressions and constraints in `subsets_config` from the file
+    they were saved to by an earlier process, parse any that are missing, and
+    save them all back to file. The file is kept in the directory given by
+    ``run.cache_parsed_where_strings``, or in a per-user cache directory
+    (e.g. ``~/.cache/calliope``) if it is True.
+
+    In either case, "where" strings are only parsed once per process,
+    on first use (see :func:`calliope.backend.subset_parser.parse_where_string`).
+
+    Parameters
+    ----------
+    subsets_config : AttrDict
+        Variable, expression and constraint configurations, as in ``config/subsets.yaml``.
+    run_config : AttrDict
+
+    """
+    cache_dir = run_config.get("cache_parsed_where_strings", False)
+    if not cache_dir:
+        return None
+    if cache_dir is True:
+        cache_dir = _user_cache_dir()
+    path = os.path.join(cache_dir, PARSED_WHERE_STRINGS_FILE)
+
+    subset_parser.load_parsed_where_strings(path)
+    for component_group in subsets_config.values():
+        for config in component_group.values():
+            where_string = config.get("where", None)
+            if where_string:
+                subset_parser.parse_where_string(where_string)
+    subset_parser.save_parsed_where_strings(path)
+
+
+def positions_to_index(coords, positions):
+    """
+    Returns the Index (or MultiIndex, with one level per dimension) of the
+    members of a subset given their positions along the coordinates `coords`
+    of each dimension, as a dict of dimension name to integer array (ordered
+    as the levels of the index).
+    MultiIndex levels are the full coordinates and its codes are the positions,
+    so the labels of all members are not created.
+
+    """
+    if len(positions) == 1:
+        [(dim, dim_positions)] = positions.items()
+        return coords[dim].to_index()[dim_positions]
     else:
-        mask_stacked = imask.stack(dim_0=imask.dims)
-        return mask_stacked[mask_stacked].coords.to_index()
+        return pd.MultiIndex(
+            levels=[coords[dim].to_index() for dim in positions.keys()],
+            codes=list(positions.values()),
+            names=list(positions.keys()),
+            verify_integrity=False,
+        )
+
+
+def _get_valid_subset(imask):
+    positions = dict(zip(imask.dims, np.nonzero(imask.values)))
+    return positions_to_index(imask.coords, positions)
 
 
 def _subset_imask(set_name, set_config, imask):
@@ -124,6 +317,23 @@ def _subset_imask(set_name, set_config, imask):
     return imask
 
 
+def _presolve_imask(model_data, name, foreach, imask, mask_cache):
+    # The `foreach` mask without the node/tech combinations removed by presolve
+    # also removes e.g. node/carrier combinations left without any technology
+    presolve = mask_cache.presolve
+    presolved_foreach = mask_cache.get(
+        ("presolve", foreach),
+        functools.partial(
+            _imask_foreach, model_data.assign(node_tech=presolve.node_tech), foreach
+        ),
+    )
+    presolved_imask = imask & presolved_foreach
+    removed = imask & ~presolved_imask
+    if removed.any():
+        presolve.removed[name] = _get_valid_subset(removed)
+    return presolved_imask
+
+
 def _imask_foreach(model_data, foreach):
     if not all(i in model_data.dims for i in foreach):
         # ignore constraints/variables if the set doesn't even exist (e.g. datesteps)
@@ -0,0 +1,1414 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+vectorised.py
+~~~~~~~~~~~~~
+
+Array-based equivalents of the most numerous constraints in
+:mod:`calliope.backend.pyomo.constraints`. Each `<name>_constraint_array`
+function evaluates a constraint over all members of its subset at once, and
+gives the same constraint coefficients and bounds as `<name>_constraint_rule`.
+
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from calliope.backend.linear import (
+    ArrayModel,
+    ConstraintArray,
+    LinearArray,
+    ObjectiveArray,
+    Rows,
+    equal,
+    greater_equal,
+    less_equal,
+    ranged,
+    select,
+)
+
+
+def _is_true(values: np.ndarray) -> np.ndarray:
+    return pd.notnull(values) & (values != 0)
+
+
+def _power(base: np.ndarray, exponent: np.ndarray) -> np.ndarray:
+    # Evaluated in Python, to avoid any difference between NumPy's and
+    # Python's floating point power functions (there are few unique pairs).
+    pairs, inverse = np.unique(
+        np.stack(np.broadcast_arrays(base, exponent), axis=1),
+        axis=0,
+        return_inverse=True,
+    )
+    return np.array([float(b) ** float(e) for b, e in pairs])[inverse.ravel()]
+
+
+def _constant(rows: Rows, value=0) -> LinearArray:
+    return LinearArray.from_constant(len(rows), value)
+
+
+def _available_resource(array_model: ArrayModel, rows: Rows) -> LinearArray:
+    resource_scaled = array_model.param("resource", rows) * array_model.param(
+        "resource_scale", rows
+    )
+    resource_unit = array_model.param("resource_unit", rows)
+    per_area = resource_unit == "energy_per_area"
+    per_cap = resource_unit == "energy_per_cap"
+    return (
+        (array_model.variable("resource_area", rows) * resource_scaled).where(per_area)
+        + (array_model.variable("energy_cap", rows) * resource_scaled).where(per_cap)
+        + _constant(rows, resource_scaled).where(~per_area & ~per_cap)
+    )
+
+
+def _storage_previous_step(array_model: ArrayModel, rows: Rows) -> LinearArray:
+    run_config = array_model.run_config
+    timesteps = rows.positions["timesteps"]
+    first_timestep = timesteps == 0
+    initial = first_timestep & (not run_config["cyclic_storage"])
+    previous = timesteps - 1
+    no_previous = initial
+    if "clusters" in array_model.model_data.dims:
+        cluster_first = _is_true(
+            array_model.param("lookup_cluster_first_timestep", rows)
+        )
+        if "storage_inter_cluster" in array_model.variables:
+            no_previous = no_previous | cluster_first
+        cluster_last = array_model.positions(
+            "timesteps", array_model.param("lookup_cluster_last_timestep", rows)
+        )
+        previous = np.where(cluster_first, cluster_last, previous)
+        first_timestep = first_timestep & ~cluster_first
+    previous = np.where(
+        first_timestep, array_model.model_data.dims["timesteps"] - 1, previous
+    )
+
+    storage_loss = array_model.param("storage_loss", rows)
+    time_resolution = array_model.param("timestep_resolution", rows, timesteps=previous)
+    storage_initial = array_model.variable("storage_cap", rows) * array_model.param(
+        "storage_initial", rows
+    )
+    storage_previous = array_model.variable(
+        "storage", rows, timesteps=previous
+    ) * _power(1 - storage_loss, time_resolution)
+
+    return storage_initial.where(initial) + storage_previous.where(~no_previous)
+
+
+def system_balance_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.system_balance_constraint_rule`.
+    """
+    carrier_prod = array_model.variable_sum("carrier_prod", rows)
+    carrier_con = array_model.variable_sum("carrier_con", rows)
+    carrier_export = array_model.variable_sum("carrier_export", rows)
+    unmet_demand = array_model.variable("unmet_demand", rows)
+    unused_supply = array_model.variable("unused_supply", rows)
+
+    return equal(
+        rows,
+        carrier_prod + carrier_con - carrier_export + unmet_demand + unused_supply,
+        _constant(rows),
+    )
+
+
+def balance_supply_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_supply_constraint_rule`.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    min_use = array_model.param("resource_min_use", rows)
+    force_resource = array_model.param("force_resource", rows) == 1
+    carrier_prod = array_model.variable("carrier_prod", rows)
+    available_resource = _available_resource(array_model, rows)
+
+    no_production = energy_eff == 0
+    use_min = ~force_resource & _is_true(min_use)
+    carrier_prod_eff = carrier_prod / energy_eff
+
+    return select(
+        [no_production, force_resource, use_min],
+        [
+            equal(rows, carrier_prod, _constant(rows)),
+            equal(rows, carrier_prod_eff, available_resource),
+            ranged(
+                rows,
+                (available_resource * min_use).where(use_min),
+                carrier_prod_eff,
+                available_resource.where(use_min),
+            ),
+        ],
+        less_equal(rows, carrier_prod_eff, available_resource),
+    )
+
+
+def balance_demand_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_demand_constraint_rule`,
+    including the evaluation of the `required_resource` expression.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    force_resource = array_model.param("force_resource", rows) == 1
+    carrier_con = array_model.variable("carrier_con", rows) * energy_eff
+    required_resource = _available_resource(array_model, rows)
+
+    # `required_resource` is a named expression, so Pyomo always considers
+    # it to be variable when normalising the constraint.
+    zero = np.zeros(len(rows))
+    return select(
+        [force_resource],
+        [ConstraintArray(rows, zero, carrier_con - required_resource, zero)],
+        ConstraintArray(
+            rows, np.full(len(rows), np.nan), required_resource - carrier_con, zero
+        ),
+    ).with_expressions(
+        required_resource=(
+            rows.project(("nodes", "techs", "timesteps")),
+            required_resource,
+        )
+    )
+
+
+def resource_availability_supply_plus_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.resource_availability_supply_plus_constraint_rule`.
+    """
+    force_resource = array_model.param("force_resource", rows) == 1
+    resource_con = array_model.variable("resource_con", rows)
+    available_resource = _available_resource(array_model, rows)
+
+    return select(
+        [force_resource],
+        [equal(rows, resource_con, available_resource)],
+        less_equal(rows, resource_con, available_resource),
+    )
+
+
+def balance_transmission_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_transmission_constraint_rule`.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    remote_techs = array_model.positions(
+        "techs", array_model.param("link_remote_techs", rows)
+    )
+    remote_nodes = array_model.positions(
+        "nodes", array_model.param("link_remote_nodes", rows)
+    )
+    remote_carrier_con = array_model.variable(
+        "carrier_con", rows, nodes=remote_nodes, techs=remote_techs
+    )
+
+    return equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        remote_carrier_con * (-1 * energy_eff),
+    )
+
+
+def balance_supply_plus_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_supply_plus_constraint_rule`.
+    """
+    resource_eff = array_model.param("resource_eff", rows)
+    energy_eff = array_model.param("energy_eff", rows)
+    parasitic_eff = array_model.param("parasitic_eff", rows)
+    total_eff = energy_eff * parasitic_eff
+    include_storage = _is_true(array_model.param("include_storage", rows))
+
+    carrier_prod = (array_model.variable("carrier_prod", rows) / total_eff).where(
+        total_eff != 0
+    )
+    resource = array_model.variable("resource_con", rows) * resource_eff
+    storage = array_model.variable("storage", rows)
+
+    return select(
+        [~include_storage],
+        [equal(rows, resource, carrier_prod)],
+        equal(
+            rows,
+            storage,
+            _storage_previous_step(array_model, rows) + resource - carrier_prod,
+        ),
+    )
+
+
+def balance_storage_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_storage_constraint_rule`.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    carrier_prod = (array_model.variable("carrier_prod", rows) / energy_eff).where(
+        energy_eff != 0
+    )
+    carrier_con = array_model.variable("carrier_con", rows) * energy_eff
+    storage = array_model.variable("storage", rows)
+
+    return equal(
+        rows,
+        storage,
+        _storage_previous_step(array_model, rows) - carrier_prod - carrier_con,
+    )
+
+
+def balance_conversion_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_conversion_constraint_rule`.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    # The first carrier (in `carriers` order) defined for each tech in each tier
+    carrier = array_model.model_data.carrier.notnull()
+    carrier_out, carrier_in = [
+        carrier.loc[{"carrier_tiers": tier}]
+        .argmax("carriers")
+        .values[rows.positions["techs"]]
+        for tier in ["out", "in"]
+    ]
+
+    return equal(
+        rows,
+        array_model.variable("carrier_prod", rows, carriers=carrier_out),
+        array_model.variable("carrier_con", rows, carriers=carrier_in)
+        * (-1 * energy_eff),
+    )
+
+
+def carrier_production_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_max_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    parasitic_eff = array_model.param("parasitic_eff", rows)
+
+    return less_equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        array_model.variable("energy_cap", rows)
+        * (timestep_resolution * parasitic_eff),
+    )
+
+
+def carrier_production_min_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_min_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    min_use = array_model.param("energy_cap_min_use", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        array_model.variable("energy_cap", rows) * (timestep_resolution * min_use),
+    )
+
+
+def carrier_consumption_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_consumption_max_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("carrier_con", rows),
+        array_model.variable("energy_cap", rows) * (-1 * timestep_resolution),
+    )
+
+
+def resource_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.resource_max_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+
+    return less_equal(
+        rows,
+        array_model.variable("resource_con", rows),
+        array_model.variable("resource_cap", rows) * timestep_resolution,
+    )
+
+
+def storage_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_max_constraint_rule`.
+    """
+    return less_equal(
+        rows,
+        array_model.variable("storage", rows),
+        array_model.variable("storage_cap", rows),
+    )
+
+
+def storage_discharge_depth_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_discharge_depth_constraint_rule`.
+    """
+    storage_discharge_depth = array_model.param("storage_discharge_depth", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("storage", rows),
+        array_model.variable("storage_cap", rows) * storage_discharge_depth,
+    )
+
+
+def _ramping_constraint_array(
+    array_model: ArrayModel, rows: Rows, direction: int
+) -> ConstraintArray:
+    # No constraint for first timestep
+    rows = rows.select(rows.positions["timesteps"] > 0)
+    previous = rows.positions["timesteps"] - 1
+    time_res = array_model.param("timestep_resolution", rows)
+    time_res_prev = array_model.param("timestep_resolution", rows, timesteps=previous)
+    ramping_rate = array_model.param("energy_ramping", rows)
+
+    this_step = array_model.variable("carrier_prod", rows) + array_model.variable(
+        "carrier_con", rows
+    )
+    previous_step = array_model.variable(
+        "carrier_prod", rows, timesteps=previous
+    ) + array_model.variable("carrier_con", rows, timesteps=previous)
+    diff = this_step / time_res - previous_step / time_res_prev
+    max_ramping_rate = array_model.variable("energy_cap", rows) * ramping_rate
+
+    if direction == 0:
+        return less_equal(rows, diff, max_ramping_rate)
+    else:
+        return less_equal(rows, max_ramping_rate * -1, diff)
+
+
+def ramping_up_constraint_array(array_model: ArrayModel, rows: Rows) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.ramping_up_constraint_rule`.
+    """
+    return _ramping_constraint_array(array_model, rows, direction=0)
+
+
+def ramping_down_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.ramping_down_constraint_rule`.
+    """
+    return _ramping_constraint_array(array_model, rows, direction=1)
+
+
+def export_balance_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.export_balance_constraint_rule`.
+    """
+    return greater_equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        array_model.variable("carrier_export", rows),
+    )
+
+
+def export_max_constraint_array(array_model: ArrayModel, rows: Rows) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.export_max_constraint_rule`.
+    """
+    # The rule looks up `(node, tech)` in the `operating_units` index, which also
+    # has a `timesteps` dimension, so export is never scaled by operating units.
+    return less_equal(
+        rows,
+        array_model.variable("carrier_export", rows),
+        _constant(rows, array_model.param("export_max", rows)),
+    )
+
+
+def _capacity_ratio_constraint_array(
+    array_model: ArrayModel,
+    rows: Rows,
+    relation,
+    var_name: str,
+    other_var_name: str,
+    param_name: str,
+) -> ConstraintArray:
+    return relation(
+        rows,
+        array_model.variable(var_name, rows),
+        array_model.variable(other_var_name, rows)
+        * array_model.param(param_name, rows),
+    )
+
+
+def energy_capacity_per_storage_capacity_min_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_per_storage_capacity_min_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model,
+        rows,
+        greater_equal,
+        "energy_cap",
+        "storage_cap",
+        "energy_cap_per_storage_cap_min",
+    )
+
+
+def energy_capacity_per_storage_capacity_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_per_storage_capacity_max_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model,
+        rows,
+        less_equal,
+        "energy_cap",
+        "storage_cap",
+        "energy_cap_per_storage_cap_max",
+    )
+
+
+def energy_capacity_per_storage_capacity_equals_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_per_storage_capacity_equals_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model,
+        rows,
+        equal,
+        "energy_cap",
+        "storage_cap",
+        "energy_cap_per_storage_cap_equals",
+    )
+
+
+def resource_capacity_equals_energy_capacity_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.resource_capacity_equals_energy_capacity_constraint_rule`.
+    """
+    return equal(
+        rows,
+        array_model.variable("resource_cap", rows),
+        array_model.variable("energy_cap", rows),
+    )
+
+
+def force_zero_resource_area_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.force_zero_resource_area_constraint_rule`.
+    """
+    return equal(rows, array_model.variable("resource_area", rows), _constant(rows))
+
+
+def resource_area_per_energy_capacity_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.resource_area_per_energy_capacity_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model,
+        rows,
+        equal,
+        "resource_area",
+        "energy_cap",
+        "resource_area_per_energy_cap",
+    )
+
+
+def resource_area_capacity_per_loc_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.resource_area_capacity_per_loc_constraint_rule`.
+    """
+    return less_equal(
+        rows,
+        array_model.variable_sum("resource_area", rows),
+        _constant(rows, array_model.param("available_area", rows)),
+    )
+
+
+def energy_capacity_systemwide_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_systemwide_constraint_rule`.
+    """
+    max_systemwide = array_model.param("energy_cap_max_systemwide", rows)
+    equals_systemwide = array_model.param("energy_cap_equals_systemwide", rows)
+    energy_cap = array_model.variable_sum("energy_cap", rows)
+
+    return select(
+        [pd.notnull(equals_systemwide)],
+        [equal(rows, energy_cap, _constant(rows, equals_systemwide))],
+        less_equal(rows, energy_cap, _constant(rows, max_systemwide)),
+    )
+
+
+def _tier_carriers(array_model: ArrayModel, tier: str) -> np.ndarray:
+    # Whether each carrier (in `carriers` order) is defined for each tech in `tier`.
+    carrier = array_model.model_data.carrier
+    if tier not in carrier.carrier_tiers:
+        return np.zeros((carrier.sizes["carriers"], carrier.sizes["techs"]), dtype=bool)
+    return (
+        carrier.loc[{"carrier_tiers": tier}]
+        .notnull()
+        .transpose("carriers", "techs")
+        .values
+    )
+
+
+def _carrier_ratio_sum(
+    array_model: ArrayModel, rows: Rows, var_name: str, tier: str
+) -> LinearArray:
+    # Sum of `var_name` / `carrier_ratios` over all carriers of `tier` with a
+    # non-zero carrier ratio, as used in conversion_plus balancing constraints.
+    tier_carriers = _tier_carriers(array_model, tier)
+    tier_position = array_model.positions("carrier_tiers", [tier])[0]
+    carrier_sum = _constant(rows)
+    for carrier, techs in enumerate(tier_carriers):
+        ratio = array_model.param(
+            "carrier_ratios", rows, carrier_tiers=tier_position, carriers=carrier
+        )
+        in_sum = techs[rows.positions["techs"]] & (ratio != 0)
+        if in_sum.any():
+            carrier_sum = carrier_sum + (
+                array_model.variable(var_name, rows, carriers=carrier) / ratio
+            ).where(in_sum)
+    return carrier_sum
+
+
+def _carrier_sum(
+    array_model: ArrayModel, rows: Rows, var_name: str, tier: str
+) -> LinearArray:
+    # Sum of `var_name` over all carriers of `tier`
+    carrier_sum = _constant(rows)
+    for carrier, techs in enumerate(_tier_carriers(array_model, tier)):
+        in_sum = techs[rows.positions["techs"]]
+        if in_sum.any():
+            carrier_sum = carrier_sum + array_model.variable(
+                var_name, rows, carriers=carrier
+            ).where(in_sum)
+    return carrier_sum
+
+
+def balance_conversion_plus_primary_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_conversion_plus_primary_constraint_rule`.
+    """
+    energy_eff = array_model.param("energy_eff", rows)
+    carrier_prod = _carrier_ratio_sum(array_model, rows, "carrier_prod", "out")
+
+    tier_position = array_model.positions("carrier_tiers", ["in"])[0]
+    carrier_con = _constant(rows)
+    for carrier, techs in enumerate(_tier_carriers(array_model, "in")):
+        in_sum = techs[rows.positions["techs"]]
+        if in_sum.any():
+            ratio = array_model.param(
+                "carrier_ratios", rows, carrier_tiers=tier_position, carriers=carrier
+            )
+            carrier_con = carrier_con + (
+                array_model.variable("carrier_con", rows, carriers=carrier) * ratio
+            ).where(in_sum)
+
+    return equal(rows, carrier_prod, carrier_con * (-1 * energy_eff))
+
+
+def carrier_production_max_conversion_plus_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_max_conversion_plus_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+
+    return less_equal(
+        rows,
+        _carrier_sum(array_model, rows, "carrier_prod", "out"),
+        array_model.variable("energy_cap", rows) * timestep_resolution,
+    )
+
+
+def carrier_production_min_conversion_plus_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_min_conversion_plus_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    min_use = array_model.param("energy_cap_min_use", rows)
+
+    return greater_equal(
+        rows,
+        _carrier_sum(array_model, rows, "carrier_prod", "out"),
+        array_model.variable("energy_cap", rows) * (timestep_resolution * min_use),
+    )
+
+
+def balance_conversion_plus_non_primary_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_conversion_plus_non_primary_constraint_rule`.
+    """
+    tiers = array_model.model_data.carrier_tiers.values[rows.positions["carrier_tiers"]]
+    c_1 = _constant(rows)
+    c_2 = _constant(rows)
+    for tier in np.unique(tiers):
+        primary_tier, var_name = (
+            ("out", "carrier_prod") if "out" in tier else ("in", "carrier_con")
+        )
+        is_tier = tiers == tier
+        c_1 = c_1 + _carrier_ratio_sum(array_model, rows, var_name, primary_tier).where(
+            is_tier
+        )
+        c_2 = c_2 + _carrier_ratio_sum(array_model, rows, var_name, tier).where(is_tier)
+
+    # No constraint if there are no carriers in the non-primary tier
+    return equal(rows, c_1, c_2).select(c_2.has_variables)
+
+
+def conversion_plus_prod_con_to_zero_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.conversion_plus_prod_con_to_zero_constraint_rule`.
+    """
+    tiers = array_model.model_data.carrier_tiers.values[rows.positions["carrier_tiers"]]
+    is_out = np.array(["out" in tier for tier in tiers], dtype=bool)
+    decision_variable = array_model.variable("carrier_prod", rows).where(
+        is_out
+    ) + array_model.variable("carrier_con", rows).where(~is_out)
+    carrier_ratio = array_model.param("carrier_ratios", rows)
+
+    return equal(rows, decision_variable, _constant(rows)).select(carrier_ratio == 0)
+
+
+def storage_initial_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_initial_constraint_rule`.
+    """
+    storage_initial = array_model.param("storage_initial", rows)
+    storage_loss = array_model.param("storage_loss", rows)
+    if "storage_inter_cluster" in array_model.variables:
+        storage = array_model.variable(
+            "storage_inter_cluster",
+            rows,
+            datesteps=array_model.model_data.dims["datesteps"] - 1,
+        )
+        time_resolution = 24
+    else:
+        final_step = array_model.model_data.dims["timesteps"] - 1
+        storage = array_model.variable("storage", rows, timesteps=final_step)
+        time_resolution = array_model.param(
+            "timestep_resolution", rows, timesteps=final_step
+        )
+
+    return equal(
+        rows,
+        storage * _power(1 - storage_loss, time_resolution),
+        array_model.variable("storage_cap", rows) * storage_initial,
+    )
+
+
+def symmetric_transmission_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.symmetric_transmission_constraint_rule`.
+    """
+    remote_techs = array_model.positions(
+        "techs", array_model.param("link_remote_techs", rows)
+    )
+    remote_nodes = array_model.positions(
+        "nodes", array_model.param("link_remote_nodes", rows)
+    )
+
+    return equal(
+        rows,
+        array_model.variable("energy_cap", rows),
+        array_model.variable(
+            "energy_cap", rows, nodes=remote_nodes, techs=remote_techs
+        ),
+    )
+
+
+def unit_commitment_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.unit_commitment_milp_constraint_rule`.
+    """
+    return less_equal(
+        rows,
+        array_model.variable("operating_units", rows),
+        array_model.variable("units", rows),
+    )
+
+
+def carrier_production_max_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_max_milp_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    parasitic_eff = array_model.param("parasitic_eff", rows)
+    energy_cap = array_model.param("energy_cap_per_unit", rows)
+
+    return less_equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        array_model.variable("operating_units", rows)
+        * (timestep_resolution * energy_cap * parasitic_eff),
+    )
+
+
+def carrier_production_max_conversion_plus_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_max_conversion_plus_milp_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    energy_cap = array_model.param("energy_cap_per_unit", rows)
+
+    return less_equal(
+        rows,
+        _carrier_sum(array_model, rows, "carrier_prod", "out"),
+        array_model.variable("operating_units", rows)
+        * (timestep_resolution * energy_cap),
+    )
+
+
+def carrier_production_min_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_min_milp_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    min_use = array_model.param("energy_cap_min_use", rows)
+    energy_cap = array_model.param("energy_cap_per_unit", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("carrier_prod", rows),
+        array_model.variable("operating_units", rows)
+        * (timestep_resolution * energy_cap * min_use),
+    )
+
+
+def carrier_production_min_conversion_plus_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_production_min_conversion_plus_milp_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    energy_cap = array_model.param("energy_cap_per_unit", rows)
+    min_use = array_model.param("energy_cap_min_use", rows)
+
+    return greater_equal(
+        rows,
+        _carrier_sum(array_model, rows, "carrier_prod", "out"),
+        array_model.variable("operating_units", rows)
+        * (timestep_resolution * energy_cap * min_use),
+    )
+
+
+def carrier_consumption_max_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.carrier_consumption_max_milp_constraint_rule`.
+    """
+    timestep_resolution = array_model.param("timestep_resolution", rows)
+    energy_cap = array_model.param("energy_cap_per_unit", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("carrier_con", rows),
+        array_model.variable("operating_units", rows)
+        * (-1 * timestep_resolution * energy_cap),
+    )
+
+
+def energy_capacity_units_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_units_milp_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model, rows, equal, "energy_cap", "units", "energy_cap_per_unit"
+    )
+
+
+def storage_capacity_units_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_capacity_units_milp_constraint_rule`.
+    """
+    return _capacity_ratio_constraint_array(
+        array_model, rows, equal, "storage_cap", "units", "storage_cap_per_unit"
+    )
+
+
+def energy_capacity_max_purchase_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_max_purchase_milp_constraint_rule`.
+    """
+    energy_cap_max = array_model.param("energy_cap_max", rows)
+    energy_cap_equals = array_model.param("energy_cap_equals", rows)
+    energy_cap_scale = array_model.param("energy_cap_scale", rows)
+    energy_cap = array_model.variable("energy_cap", rows)
+    purchased = array_model.variable("purchased", rows)
+
+    return select(
+        [_is_true(energy_cap_equals)],
+        [equal(rows, energy_cap, purchased * (energy_cap_equals * energy_cap_scale))],
+        less_equal(rows, energy_cap, purchased * (energy_cap_max * energy_cap_scale)),
+    )
+
+
+def energy_capacity_min_purchase_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.energy_capacity_min_purchase_milp_constraint_rule`.
+    """
+    energy_cap_min = array_model.param("energy_cap_min", rows)
+    energy_cap_scale = array_model.param("energy_cap_scale", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("energy_cap", rows),
+        array_model.variable("purchased", rows) * (energy_cap_min * energy_cap_scale),
+    )
+
+
+def storage_capacity_max_purchase_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_capacity_max_purchase_milp_constraint_rule`.
+    """
+    storage_cap_max = array_model.param("storage_cap_max", rows)
+    storage_cap_equals = array_model.param("storage_cap_equals", rows)
+    storage_cap = array_model.variable("storage_cap", rows)
+    purchased = array_model.variable("purchased", rows)
+    use_equals = _is_true(storage_cap_equals)
+    use_max = ~use_equals & _is_true(storage_cap_max)
+
+    return select(
+        [use_equals],
+        [equal(rows, storage_cap, purchased * storage_cap_equals)],
+        less_equal(rows, storage_cap, purchased * storage_cap_max),
+    ).select(use_equals | use_max)
+
+
+def storage_capacity_min_purchase_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_capacity_min_purchase_milp_constraint_rule`.
+    """
+    storage_cap_min = array_model.param("storage_cap_min", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("storage_cap", rows),
+        array_model.variable("purchased", rows) * storage_cap_min,
+    ).select(_is_true(storage_cap_min))
+
+
+def unit_capacity_systemwide_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.unit_capacity_systemwide_milp_constraint_rule`.
+    """
+    max_systemwide = array_model.param("units_max_systemwide", rows)
+    equals_systemwide = array_model.param("units_equals_systemwide", rows)
+    units = array_model.variable_sum("units", rows) + array_model.variable_sum(
+        "purchased", rows
+    )
+
+    return select(
+        [_is_true(equals_systemwide)],
+        [equal(rows, units, _constant(rows, equals_systemwide))],
+        less_equal(rows, units, _constant(rows, max_systemwide)),
+    )
+
+
+def _carrier_variable_sum(
+    array_model: ArrayModel, rows: Rows, var_name: str
+) -> LinearArray:
+    # Sum of `var_name` over all carriers, in each (nodes, techs, timesteps) row
+    carrier_sum = _constant(rows)
+    for carrier in range(array_model.model_data.dims["carriers"]):
+        carrier_sum = carrier_sum + array_model.variable(
+            var_name, rows, carriers=carrier
+        )
+    return carrier_sum
+
+
+def asynchronous_con_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.asynchronous_con_milp_constraint_rule`.
+    """
+    bigM = array_model.run_config.get("bigM", 1e10)
+    carrier_con = _carrier_variable_sum(array_model, rows, "carrier_con")
+    prod_con_switch = array_model.variable("prod_con_switch", rows)
+
+    return less_equal(rows, carrier_con * -1, (1 - prod_con_switch) * bigM)
+
+
+def asynchronous_prod_milp_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.asynchronous_prod_milp_constraint_rule`.
+    """
+    bigM = array_model.run_config.get("bigM", 1e10)
+    carrier_prod = _carrier_variable_sum(array_model, rows, "carrier_prod")
+    prod_con_switch = array_model.variable("prod_con_switch", rows)
+
+    return less_equal(rows, carrier_prod, prod_con_switch * bigM)
+
+
+def _cluster_positions(array_model: ArrayModel, rows: Rows, lookup: str) -> np.ndarray:
+    return array_model.positions("clusters", array_model.param(lookup, rows))
+
+
+def storage_intra_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_intra_max_constraint_rule`.
+    """
+    clusters = _cluster_positions(array_model, rows, "timestep_cluster")
+
+    return less_equal(
+        rows,
+        array_model.variable("storage", rows),
+        array_model.variable("storage_intra_cluster_max", rows, clusters=clusters),
+    )
+
+
+def storage_intra_min_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_intra_min_constraint_rule`.
+    """
+    clusters = _cluster_positions(array_model, rows, "timestep_cluster")
+
+    return greater_equal(
+        rows,
+        array_model.variable("storage", rows),
+        array_model.variable("storage_intra_cluster_min", rows, clusters=clusters),
+    )
+
+
+def storage_inter_max_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_inter_max_constraint_rule`.
+    """
+    clusters = _cluster_positions(array_model, rows, "lookup_datestep_cluster")
+
+    return less_equal(
+        rows,
+        array_model.variable("storage_inter_cluster", rows)
+        + array_model.variable("storage_intra_cluster_max", rows, clusters=clusters),
+        array_model.variable("storage_cap", rows),
+    )
+
+
+def storage_inter_min_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.storage_inter_min_constraint_rule`.
+    """
+    clusters = _cluster_positions(array_model, rows, "lookup_datestep_cluster")
+    storage_loss = array_model.param("storage_loss", rows)
+
+    return greater_equal(
+        rows,
+        array_model.variable("storage_inter_cluster", rows)
+        * _power(1 - storage_loss, 24)
+        + array_model.variable("storage_intra_cluster_min", rows, clusters=clusters),
+        _constant(rows),
+    )
+
+
+def balance_storage_inter_constraint_array(
+    array_model: ArrayModel, rows: Rows
+) -> ConstraintArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.balance_storage_inter_constraint_rule`.
+    """
+    datesteps = rows.positions["datesteps"]
+    first_datestep = datesteps == 0
+    if array_model.run_config["cyclic_storage"]:
+        initial = np.zeros(len(rows), dtype=bool)
+        previous = np.where(
+            first_datestep, array_model.model_data.dims["datesteps"] - 1, datesteps - 1
+        )
+    else:
+        initial = first_datestep
+        previous = np.where(first_datestep, 0, datesteps - 1)
+
+    storage_loss = array_model.param("storage_loss", rows)
+    final_timesteps = array_model.positions(
+        "timesteps",
+        array_model.param(
+            "lookup_datestep_last_cluster_timestep", rows, datesteps=previous
+        ),
+    )
+    storage_previous = array_model.variable(
+        "storage_inter_cluster", rows, datesteps=previous
+    ) * _power(1 - storage_loss, 24) + array_model.variable(
+        "storage", rows, timesteps=final_timesteps
+    )
+    storage_initial = _constant(rows, array_model.param("storage_initial", rows))
+
+    return equal(
+        rows,
+        array_model.variable("storage_inter_cluster", rows),
+        storage_initial.where(initial) + storage_previous.where(~initial),
+    )
+
+
+def _subset_rows(array_model: ArrayModel, kind: str, name: str):
+    config = array_model.model_data.attrs["subsets"][kind][name]
+    return array_model.rows(name, config)
+
+
+def _timestep_weight(array_model: ArrayModel) -> float:
+    # cf. `calliope.backend.pyomo.util.get_timestep_weight`
+    time_res = array_model.model_data.timestep_resolution.values
+    weights = array_model.model_data.timestep_weights.values
+    return sum(np.multiply(time_res, weights)) / 8760
+
+
+def _ends_with(array_model: ArrayModel, rows: Rows, suffix: str) -> np.ndarray:
+    inheritance = array_model.param("inheritance", rows)
+    return np.array([str(i).endswith(suffix) for i in inheritance], dtype=bool)
+
+
+def _primary_carrier_positions(array_model: ArrayModel, rows: Rows, name: str):
+    # First carrier (in `carriers` order) defined as primary carrier for each tech
+    primary_carrier = array_model.model_data[name].notnull()
+    positions = primary_carrier.argmax("carriers").values
+    return positions[rows.positions["techs"]]
+
+
+def cost_investment_expression_array(
+    array_model: ArrayModel, rows: Rows, multiplier=1
+) -> LinearArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.cost_investment_expression_rule`.
+
+    The expression is scaled by `multiplier`, with the coefficients of nested
+    terms computed from the outermost factor inwards, as Pyomo does when
+    generating the standard representation of an expression.
+    """
+    multiplier = np.broadcast_to(np.asarray(multiplier, dtype=float), (len(rows),))
+    ts_weight = _timestep_weight(array_model)
+    depreciation_rate = array_model.param("cost_depreciation_rate", rows)
+    om_annual_investment_fraction = array_model.param(
+        "cost_om_annual_investment_fraction", rows
+    )
+    om_annual = array_model.param("cost_om_annual", rows)
+    cost_purchase = array_model.param("cost_purchase", rows)
+
+    energy_cap = array_model.variable("energy_cap", rows)
+    units = array_model.variable("units", rows)
+    purchased = array_model.variable("purchased", rows).where(~units.has_variables)
+    capacity_costs = (
+        energy_cap * array_model.param("cost_energy_cap", rows)
+        + array_model.variable("storage_cap", rows)
+        * array_model.param("cost_storage_cap", rows)
+        + array_model.variable("resource_cap", rows)
+        * array_model.param("cost_resource_cap", rows)
+        + array_model.variable("resource_area", rows)
+        * array_model.param("cost_resource_area", rows)
+        + units * cost_purchase
+        + purchased * cost_purchase
+    )
+
+    # Transmission technologies exist at two locations, thus their cost is divided by 2
+    is_transmission = _ends_with(array_model, rows, "transmission")
+    cost_cap_multiplier = np.where(is_transmission, multiplier / 2.0, multiplier)
+    om_fraction_multiplier = multiplier * om_annual_investment_fraction
+    om_fraction_multiplier = np.where(
+        is_transmission, om_fraction_multiplier / 2.0, om_fraction_multiplier
+    )
+    depreciation = depreciation_rate * ts_weight
+
+    return (
+        capacity_costs * (om_fraction_multiplier * depreciation)
+        + energy_cap * (multiplier * (om_annual * ts_weight))
+        + capacity_costs * (cost_cap_multiplier * depreciation)
+    )
+
+
+def cost_var_expression_array(
+    array_model: ArrayModel, rows: Rows, multiplier=1
+) -> LinearArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.cost_var_expression_rule`.
+
+    The expression is scaled by `multiplier`, as in
+    :func:`cost_investment_expression_array`.
+    """
+    multiplier = np.broadcast_to(np.asarray(multiplier, dtype=float), (len(rows),))
+    multiplier = multiplier * array_model.param("timestep_weights", rows)
+    cost_om_prod = array_model.param("cost_om_prod", rows)
+    cost_om_con = array_model.param("cost_om_con", rows)
+    cost_export = array_model.param("cost_export", rows)
+    energy_eff = array_model.param("energy_eff", rows)
+    is_conversion_plus = _ends_with(array_model, rows, "conversion_plus")
+    is_supply = _ends_with(array_model, rows, "supply")
+
+    carrier_prod = _carrier_variable_sum(array_model, rows, "carrier_prod")
+    carrier_con = _carrier_variable_sum(array_model, rows, "carrier_con")
+    if is_conversion_plus.any():
+        primary_carrier_prod = array_model.variable(
+            "carrier_prod",
+            rows,
+            carriers=_primary_carrier_positions(
+                array_model, rows, "primary_carrier_out"
+            ),
+        )
+        primary_carrier_con = array_model.variable(
+            "carrier_con",
+            rows,
+            carriers=_primary_carrier_positions(
+                array_model, rows, "primary_carrier_in"
+            ),
+        )
+        carrier_prod = primary_carrier_prod.where(
+            is_conversion_plus
+        ) + carrier_prod.where(~is_conversion_plus)
+        carrier_con = primary_carrier_con.where(is_conversion_plus) + carrier_con.where(
+            ~is_conversion_plus
+        )
+
+    cost_prod = carrier_prod * (multiplier * cost_om_prod)
+
+    # The rule looks up `(node, tech)` in the `resource_con` index, which also has
+    # a `timesteps` dimension, so consumption costs never apply to `resource_con`.
+    # In case energy_eff is zero, consumption costs of supply techs are ignored.
+    has_cost_con = _is_true(cost_om_con)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        supply_cost_con = carrier_prod * ((multiplier * cost_om_con) / energy_eff)
+    cost_con = supply_cost_con.where(has_cost_con & is_supply & (energy_eff > 0)) + (
+        carrier_con * (multiplier * (cost_om_con * -1))
+    ).where(has_cost_con & ~is_supply)
+
+    if "export_carrier" in array_model.model_data:
+        export_carrier = array_model.model_data.export_carrier.notnull()
+        has_export = export_carrier.any("carriers").values[
+            rows.positions["nodes"], rows.positions["techs"]
+        ]
+        carrier_export = array_model.variable(
+            "carrier_export",
+            rows,
+            carriers=export_carrier.argmax("carriers").values[
+                rows.positions["nodes"], rows.positions["techs"]
+            ],
+        ).where(has_export)
+        cost_export = carrier_export * (multiplier * cost_export)
+    else:
+        cost_export = _constant(rows)
+
+    return cost_prod + cost_con + cost_export
+
+
+def cost_expression_array(
+    array_model: ArrayModel, rows: Rows, multiplier=1
+) -> LinearArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.constraints.cost_expression_rule`.
+
+    The expression is scaled by `multiplier`, as in
+    :func:`cost_investment_expression_array`.
+    """
+    multiplier = np.broadcast_to(np.asarray(multiplier, dtype=float), (len(rows),))
+    cost = _constant(rows)
+
+    cost_investment_rows = _subset_rows(array_model, "expressions", "cost_investment")
+    if cost_investment_rows is not None:
+        in_cost_investment = cost_investment_rows.index_of(rows) >= 0
+        cost = cost + cost_investment_expression_array(
+            array_model, rows, multiplier
+        ).where(in_cost_investment)
+
+    cost_var_rows = _subset_rows(array_model, "expressions", "cost_var")
+    if cost_var_rows is not None:
+        cost_rows = rows.index_of(cost_var_rows)
+        cost_var_rows = cost_var_rows.select(cost_rows >= 0)
+        cost_rows = cost_rows[cost_rows >= 0]
+        cost = cost + cost_var_expression_array(
+            array_model, cost_var_rows, multiplier[cost_rows]
+        ).group(cost_rows, len(rows))
+
+    return cost
+
+
+def minmax_cost_optimization_objective_array(
+    array_model: ArrayModel,
+) -> ObjectiveArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.objective.minmax_cost_optimization`.
+    """
+    objective_options = array_model.run_config["objective_options"]
+    sense = objective_options["sense"]
+    objective = LinearArray.from_constant(1)
+
+    cost_rows = _subset_rows(array_model, "expressions", "cost")
+    costs = array_model.model_data.costs.to_index()
+    cost_class = objective_options["cost_class"]
+    for position, class_name in enumerate(costs):
+        weight = cost_class.get(class_name, 0)
+        if cost_rows is None or weight == 0:
+            continue
+        class_rows = cost_rows.select(cost_rows.positions["costs"] == position)
+        class_cost = cost_expression_array(array_model, class_rows, weight)
+        objective = (
+            objective
+            + class_cost.group(np.zeros(len(class_rows), dtype=int), 1).merged()
+        )
+
+    if array_model.run_config.get("ensure_feasibility", False):
+        bigM = array_model.run_config.get("bigM", 1e10)
+        if sense == "maximize":
+            bigM = -1 * bigM
+        unmet_rows = array_model.variables["unmet_demand"]
+        multiplier = bigM * array_model.param("timestep_weights", unmet_rows)
+        unmet_demand = array_model.variable(
+            "unmet_demand", unmet_rows
+        ) * multiplier + array_model.variable("unused_supply", unmet_rows) * (
+            multiplier * -1
+        )
+        objective = objective + unmet_demand.group(
+            np.zeros(len(unmet_rows), dtype=int), 1
+        )
+
+    return ObjectiveArray(sense, objective)
+
+
+def check_feasibility_objective_array(array_model: ArrayModel) -> ObjectiveArray:
+    """
+    Array-based equivalent of
+    :func:`calliope.backend.pyomo.objective.check_feasibility`.
+    """
+    return ObjectiveArray("minimize", LinearArray.from_constant(1, 1))
@@ -23,6 +23,7 @@ import click
 from calliope import AttrDict, Model, examples, read_netcdf
 from calliope._version import __version__
 from calliope.core.util.generate_runs import generate
+from calliope.core.util.run_scenarios import run_scenarios as _run_scenarios
 from calliope.core.util.logging import set_log_verbosity
 from calliope.exceptions import BackendError
 
@@ -376,6 +377,65 @@ def generate_runs(
         generate(kind, **kwargs)
 
 
+@cli.command(
+    name="run_scenarios",
+    short_help="Run multiple scenarios of a model in parallel on this machine.",
+)
+@click.argument("model_file")
+@click.argument("out_dir")
+@click.option("--scenarios")
+@click.option("--override_dict")
+@click.option(
+    "--processes",
+    type=int,
+    help="Number of scenarios to run at the same time. "
+    "Defaults to the number of CPUs.",
+)
+@click.option(
+    "--solver_threads",
+    type=int,
+    help="Number of threads each solver may use.",
+)
+@_debug
+@_quiet
+@_pdb
+def run_scenarios(
+    model_file,
+    out_dir,
+    scenarios,
+    override_dict,
+    processes,
+    solver_threads,
+    debug,
+    quiet,
+    pdb,
+):
+    """
+    Run all given scenarios of a YAML model, saving the results of each
+    to a NetCDF file in ``out_dir`` alongside a ``summary.csv`` of all runs.
+    ``--scenarios`` is given in the same way as for ``calliope generate_runs``.
+
+    """
+    start_time = _cli_start(debug, quiet)
+    click.secho(
+        "Calliope {} starting at {}\n".format(
+            __version__, start_time.strftime(_time_format)
+        )
+    )
+
+    with format_exceptions(debug, pdb, start_time=start_time):
+        summary = _run_scenarios(
+            model_file,
+            out_dir,
+            scenarios=scenarios,
+            override_dict=override_dict,
+            processes=processes,
+            solver_threads=solver_threads,
+        )
+        click.secho(summary.to_string() + "\n")
+        print_end_time(start_time)
+
+
 @cli.command(
     name="generate_scenarios",
     short_help="Generate scenario definitions from given combinations of overrides.",
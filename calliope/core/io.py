@@ -16,13 +16,17 @@ import numpy as np
 
 from calliope._version import __version__
 from calliope import exceptions
+from calliope.backend import sparse
+from calliope.backend.pyomo.util import symbolic_labeler
 from calliope.core.attrdict import AttrDict
+from calliope.core.util import sparse_data
 
 
 def read_netcdf(path):
     """Read model_data from NetCDF file"""
     with xr.open_dataset(path) as model_data:
         model_data.load()
+    model_data = sparse_data.decode_long_format(model_data)
 
     calliope_version = model_data.attrs.get("calliope_version", False)
     if calliope_version:
@@ -86,6 +90,8 @@ def save_netcdf(model_data, path, model=None):
     for k in none_attrs:
         model_data_attrs[k] = "None"
 
+    # Variables stored in long format are saved in long format
+    model_data = sparse_data.encode_long_format(model_data)
     encoding = {
         k: {"zlib": False}
         if v.dtype.kind in ["U", "O"]
@@ -131,10 +137,24 @@ def save_csv(model_data, path, dropna=True):
 
 
 def save_lp(model, path):
-    if not model.run_config["backend"] == "pyomo":
-        raise IOError("Only the pyomo backend can save to LP.")
+    if model.run_config["backend"] == "sparse":
+        sparse.write_lp(sparse.get_sparse_model(model._model_data), path)
+        return
+    if model.run_config["backend"] not in ["pyomo", "pyomo_vectorised"]:
+        raise IOError("Only the pyomo and sparse backends can save to LP.")
     if not hasattr(model, "_backend_model"):
         model.run(build_only=True)
-    model._backend_model.write(
-        path, format="lp", io_options={"symbolic_solver_labels": True}
-    )
+    # Components indexed over integer-coded timesteps are labelled with the
+    # timestep strings, as they would be otherwise
+    labeler = symbolic_labeler(model._backend_model)
+    if labeler is None:
+        io_options = {"symbolic_solver_labels": True}
+    else:
+        io_options = {"labeler": labeler}
+    model._backend_model.write(path, format="lp", io_options=io_options)
+
+
+def save_mps(model, path):
+    if model.run_config["backend"] != "sparse":
+        raise IOError("Only the sparse backend can save to MPS.")
+    sparse.write_mps(sparse.get_sparse_model(model._model_data), path)
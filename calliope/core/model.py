@@ -19,8 +19,13 @@ from calliope.core import io
 from calliope.preprocess import (
     model_run_from_yaml,
     model_run_from_dict,
+    model_run_from_base,
+)
+from calliope.preprocess.model_data import (
+    ModelDataFactory,
+    get_param_updates,
+    update_model_data,
 )
-from calliope.preprocess.model_data import ModelDataFactory
 from calliope.core.attrdict import AttrDict
 from calliope.core.util.logging import log_time
 from calliope import exceptions
@@ -82,8 +87,9 @@ class Model(object):
             )
         self._check_future_deprecation_warnings()
 
-    def _init_from_model_run(self, model_run, debug_data, debug):
+    def _init_from_model_run(self, model_run, debug_data, debug, base_model=None):
         self._model_run = model_run
+        self._config = debug_data["config_initial"]
         log_time(
             logger,
             self._timings,
@@ -91,20 +97,42 @@ class Model(object):
             comment="Model: preprocessing stage 1 (model_run)",
         )
 
-        model_data_factory = ModelDataFactory(model_run)
-        (
-            model_data_pre_clustering,
-            model_data,
-            data_pre_time,
-            stripped_keys,
-        ) = model_data_factory()
+        # Only parameter values differing from an unsolved base model are updated
+        param_updates = None
+        if base_model is not None and not (
+            hasattr(base_model, "results") and base_model.results.data_vars
+        ):
+            param_updates = get_param_updates(
+                base_model._model_run, model_run, base_model._model_data
+            )
 
-        self._model_data_pre_clustering = model_data_pre_clustering
-        self._model_data = model_data
-        if debug:
-            self._debug_data = debug_data
-            self._model_data_pre_time = data_pre_time
-            self._model_data_stripped_keys = stripped_keys
+        if param_updates is not None:
+            self._model_data_pre_clustering = update_model_data(
+                base_model._model_data_pre_clustering,
+                param_updates,
+                model_run,
+                check=False,
+            )
+            self._model_data = update_model_data(
+                base_model._model_data, param_updates, model_run
+            )
+            if debug:
+                self._debug_data = debug_data
+        else:
+            model_data_factory = ModelDataFactory(model_run)
+            (
+                model_data_pre_clustering,
+                model_data,
+                data_pre_time,
+                stripped_keys,
+            ) = model_data_factory()
+
+            self._model_data_pre_clustering = model_data_pre_clustering
+            self._model_data = model_data
+            if debug:
+                self._debug_data = debug_data
+                self._model_data_pre_time = data_pre_time
+                self._model_data_stripped_keys = stripped_keys
         self.inputs = self._model_data.filter_by_attrs(is_result=0)
         log_time(
             logger,
@@ -129,6 +157,56 @@ class Model(object):
             comment="Model: preprocessing complete",
         )
 
+    def derive(
+        self, scenario=None, override_dict=None, timeseries_dataframes=None, debug=False
+    ):
+        """
+        Returns a new Model, built from this model's configuration with
+        a scenario and/or override dictionary applied on top of it.
+
+        Only the preprocessing affected by the overrides is redone. Timeseries
+        data is reused unless the overrides change which timeseries are loaded.
+        If the overrides only change the values of node/technology constraints
+        or costs which this model already defines, and this model has not been
+        run, the model data of this model is copied with those values updated
+        instead of being built from scratch.
+
+        Parameters
+        ----------
+        scenario : str, optional
+            Name of scenario to apply. Can either be a named scenario, or a
+            comma-separated list of individual overrides to be combined
+            ad-hoc, e.g. 'my_scenario_name' or 'override1,override2'.
+        override_dict : str or dict or AttrDict, optional
+        timeseries_dataframes : dict, optional
+            Dictionary of timeseries dataframes, if the derived model loads
+            timeseries from dataframes (`df=...`). If given, all timeseries
+            data is loaded again.
+        debug : bool, optional
+
+        """
+        if not hasattr(self, "_config"):
+            raise exceptions.ModelError(
+                "Can only derive new models from a model built from its "
+                "configuration, not one loaded from file."
+            )
+        model = self.__class__.__new__(self.__class__)
+        model._timings = {}
+        log_time(
+            logger, model._timings, "model_creation", comment="Model: initialising"
+        )
+        model_run, debug_data = model_run_from_base(
+            self._config,
+            self._model_run,
+            timeseries_dataframes=timeseries_dataframes,
+            scenario=scenario,
+            override_dict=override_dict,
+        )
+        model._init_from_model_run(model_run, debug_data, debug, base_model=self)
+        model._check_future_deprecation_warnings()
+
+        return model
+
     def _init_from_model_data(self, model_data):
         if "_model_run" in model_data.attrs:
             self._model_run = AttrDict.from_yaml_string(model_data.attrs["_model_run"])
@@ -286,9 +364,18 @@ class Model(object):
         """
         Save built model to LP format at the given ``path``. If the backend
         model has not been built yet, it is built prior to saving.
+        With ``run.backend: sparse``, the LP file is written straight from the
+        model data, without building a backend model.
         """
         io.save_lp(self, path)
 
+    def to_mps(self, path):
+        """
+        Save model to free MPS format at the given ``path``.
+        Only available with ``run.backend: sparse``.
+        """
+        io.save_mps(self, path)
+
     def info(self):
         info_strings = []
         model_name = self.model_config.get("name", "None")
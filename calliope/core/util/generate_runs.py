@@ -16,9 +16,9 @@ import pandas as pd
 from calliope.core import AttrDict
 
 
-def generate_runs(model_file, scenarios=None, additional_args=None, override_dict=None):
+def get_runs(model_file, scenarios=None, override_dict=None):
     """
-    Returns a list of "calliope run" invocations.
+    Returns a list of the scenarios to run.
 
     ``scenarios`` must be specified as either a semicolon-separated
     list of scenarios or a semicolon-separated list of comma-separated
@@ -34,7 +34,10 @@ def generate_runs(model_file, scenarios=None, additional_args=None, override_dic
     if scenarios is None:
         config = AttrDict.from_yaml(model_file)
         if override_dict:
-            override = AttrDict.from_yaml_string(override_dict)
+            if isinstance(override_dict, str):
+                override = AttrDict.from_yaml_string(override_dict)
+            else:
+                override = AttrDict(override_dict)
             config.union(override, allow_override=True, allow_replacement=True)
 
         if "scenarios" in config:
@@ -44,15 +47,34 @@ def generate_runs(model_file, scenarios=None, additional_args=None, override_dic
     else:
         runs = scenarios.split(";")
 
-    commands = []
+    return list(runs)
+
+
+def get_netcdf_names(runs):
+    """
+    Returns the NetCDF file name to save each of the given runs to.
 
+    """
     # len(str(x)) gives us the number of digits in x, for padding
     i_string = "{:0>" + str(len(str(len(runs)))) + "d}"
 
-    for i, run in enumerate(runs):
+    return [f"out_{i_string.format(i + 1)}_{run}.nc" for i, run in enumerate(runs)]
+
+
+def generate_runs(model_file, scenarios=None, additional_args=None, override_dict=None):
+    """
+    Returns a list of "calliope run" invocations, one per scenario given
+    by ``scenarios`` (see :func:`get_runs`).
+
+    """
+    runs = get_runs(model_file, scenarios, override_dict)
+
+    commands = []
+
+    for run, netcdf_name in zip(runs, get_netcdf_names(runs)):
         cmd = (
             f"calliope run {model_file} --scenario {run} "
-            f"--save_netcdf out_{i_string.format(i + 1)}_{run}.nc "
+            f"--save_netcdf {netcdf_name} "
         ).strip()
 
         if override_dict:
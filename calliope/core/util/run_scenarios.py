@@ -0,0 +1,232 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+run_scenarios.py
+~~~~~~~~~~~~~~~~
+
+Run multiple versions of the same model in parallel processes on a
+single machine, sharing the parsed model configuration and timeseries
+data between all runs.
+
+"""
+
+import copy
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from calliope import exceptions
+from calliope.core.attrdict import AttrDict
+from calliope.core.model import Model
+from calliope.core.util.generate_runs import get_netcdf_names, get_runs
+from calliope.core.util.tools import relative_path
+from calliope.preprocess import model_run
+
+logger = logging.getLogger(__name__)
+
+# Name of the solver option setting the number of threads, for solvers that have one
+_SOLVER_THREADS_OPTION = {"cbc": "threads", "cplex": "threads", "gurobi": "Threads"}
+
+# Base model configuration shared by all runs in a worker process, and the model
+# built from it that all runs in the worker process are derived from
+_base_config = None
+_base_model = None
+
+
+def load_base_config(model_file):
+    """
+    Load a model configuration file and all the timeseries files it refers to
+    with ``file=``, including those only referred to in overrides.
+
+    Returns
+    -------
+    config : AttrDict
+        Model configuration, with ``model.timeseries_data_path`` and
+        ``model.timeseries_cache_path`` made absolute so that they no longer
+        depend on the location of ``model_file``.
+    timeseries_files : dict
+        Timeseries files, in the form expected by
+        :func:`calliope.preprocess.model_run.preload_timeseries_files`.
+
+    """
+    config = AttrDict.from_yaml(model_file)
+    timeseries_files = {}
+
+    for path_key in ["timeseries_data_path", "timeseries_cache_path"]:
+        if config.get_key(f"model.{path_key}", None) is not None:
+            config.model[path_key] = os.path.abspath(
+                relative_path(model_file, config.model[path_key])
+            )
+
+    timeseries_data_path = config.get_key("model.timeseries_data_path", None)
+    if timeseries_data_path is None:
+        return config, timeseries_files
+
+    for v in config.as_dict_flat().values():
+        if isinstance(v, str) and v.startswith("file="):
+            file_path = os.path.join(
+                timeseries_data_path, v.split("=", 1)[1].rsplit(":", 1)[0]
+            )
+            if file_path not in timeseries_files and os.path.isfile(file_path):
+                timeseries_files[file_path] = model_run.read_timeseries_file(file_path)
+
+    return config, timeseries_files
+
+
+def _init_worker(config, timeseries_files):
+    global _base_config
+    _base_config = config
+    model_run.preload_timeseries_files(timeseries_files)
+
+
+def _get_base_model():
+    global _base_model
+    if _base_model is None:
+        try:
+            _base_model = Model(copy.deepcopy(_base_config))
+        except Exception as e:
+            # The base configuration may only be valid with overrides applied
+            logger.info(f"Cannot build base model, building each scenario in full: {e}")
+            _base_model = False
+    return _base_model
+
+
+def _run_scenario(scenario, out_file, override_dict, solver_threads):
+    """
+    Build and run a single scenario on top of the worker's base configuration,
+    saving the results to `out_file`. Returns a summary of the run.
+
+    """
+    start_time = time.time()
+    summary = {"scenario": scenario, "netcdf": out_file}
+    try:
+        base_model = _get_base_model()
+        if base_model:
+            model = base_model.derive(scenario=scenario, override_dict=override_dict)
+        else:
+            model = Model(
+                copy.deepcopy(_base_config),
+                scenario=scenario,
+                override_dict=override_dict,
+            )
+        if solver_threads is not None:
+            solver = model.run_config["solver"].replace("_persistent", "")
+            if solver in _SOLVER_THREADS_OPTION:
+                solver_options = dict(
+                    model.run_config.get("solver_options", None) or {}
+                )
+                solver_options[_SOLVER_THREADS_OPTION[solver]] = solver_threads
+                model.run_config["solver_options"] = solver_options
+            else:
+                exceptions.warn(
+                    f"Cannot set the number of threads for solver `{solver}`, "
+                    "ignoring `solver_threads`."
+                )
+        model.run()
+        model.to_netcdf(out_file)
+        summary["termination_condition"] = model._model_data.attrs.get(
+            "termination_condition", "unknown"
+        )
+        summary["objective_function_value"] = model._model_data.attrs.get(
+            "objective_function_value", None
+        )
+    except Exception as e:
+        logger.error(f"Scenario `{scenario}` failed: {e}")
+        summary["netcdf"] = None
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["time_taken"] = time.time() - start_time
+
+    return summary
+
+
+def run_scenarios(
+    model_file,
+    out_dir,
+    scenarios=None,
+    override_dict=None,
+    processes=None,
+    solver_threads=None,
+):
+    """
+    Build, run and save many scenarios of the same model in parallel worker
+    processes on this machine. The model configuration and its timeseries files
+    are read once and shared by all the workers. Each worker builds the model
+    without any scenario applied once, and derives each scenario from it with
+    :meth:`calliope.Model.derive`.
+
+    Parameters
+    ----------
+    model_file : str
+        Path to YAML file with model configuration.
+    out_dir : str
+        Directory in which to save results, with one file of the form
+        ``out_{run_number}_{scenario_name}.nc`` per scenario, and a
+        ``summary.csv`` table of all runs.
+    scenarios : str, optional
+        Semicolon-separated scenarios to run, as in ``calliope generate_runs``,
+        e.g. ``scenario1;scenario2`` or ``override1,override2a;override1,override2b``.
+        If not given, runs all scenarios in the model configuration or,
+        if there are none, all individual overrides.
+    override_dict : str or dict or AttrDict, optional
+        Overrides to apply to all scenarios.
+    processes : int, optional
+        Number of scenarios to run at the same time.
+        If not given, the number of CPUs on this machine.
+    solver_threads : int, optional
+        Number of threads each solver may use.
+        If not given, the solver default (or ``run.solver_options``) is used.
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        One row per scenario, with the NetCDF file it was saved to, its
+        termination condition, objective function value, time taken and
+        any error that stopped it from completing.
+
+    """
+    runs = get_runs(model_file, scenarios, override_dict)
+    out_files = [os.path.join(out_dir, i) for i in get_netcdf_names(runs)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    config, timeseries_files = load_base_config(model_file)
+    logger.info(
+        f"Running {len(runs)} scenarios, with {len(timeseries_files)} "
+        "timeseries files loaded in advance."
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(config, timeseries_files),
+    ) as executor:
+        futures = [
+            executor.submit(_run_scenario, run, out_file, override_dict, solver_threads)
+            for run, out_file in zip(runs, out_files)
+        ]
+        for future in as_completed(futures):
+            summary = future.result()
+            logger.info(
+                "Scenario `{}` finished: {}".format(
+                    summary["scenario"],
+                    summary.get("error", summary.get("termination_condition")),
+                )
+            )
+
+    summary = pd.DataFrame(
+        [future.result() for future in futures],
+        columns=[
+            "scenario",
+            "netcdf",
+            "termination_condition",
+            "objective_function_value",
+            "time_taken",
+            "error",
+        ],
+    ).set_index("scenario")
+    summary.to_csv(os.path.join(out_dir, "summary.csv"))
+
+    return summary
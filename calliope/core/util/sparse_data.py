@@ -0,0 +1,203 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+sparse_data.py
+~~~~~~~~~~~~~~
+
+Storage of mostly empty model data variables in long format, i.e. as the
+flat positions of their non-empty items in the full array, with the values
+at those positions.
+
+Long format variables are lazy xarray variables: they behave like any other
+variable, but are only expanded to a full NumPy array when their values are
+used, and that array is not kept.
+
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from xarray.backends import BackendArray
+from xarray.core import indexing
+
+# Variables are only stored in long format if no more than this fraction of
+# their items are non-empty, since each stored item takes twice the memory
+# (value and position) of an item in a full array
+MAX_DENSITY = 0.5
+
+# Name of the attribute listing the dimensions of a variable saved to NetCDF in
+# long format, and of the dimension of such a variable in the saved file
+_NETCDF_DIMS_ATTR = "long_format_dims"
+_NETCDF_DIM = "{}_long_format"
+
+
+class LongFormatArray(BackendArray):
+    """
+    N-dimensional array of shape `shape` holding `values` at the flat
+    (C-order) positions `flat_index`, and `fill_value` everywhere else.
+    `flat_index` must be sorted and unique.
+
+    """
+
+    __slots__ = ("shape", "dtype", "flat_index", "values", "fill_value")
+
+    def __init__(self, shape, flat_index, values, fill_value=np.nan):
+        self.shape = tuple(shape)
+        self.flat_index = np.asarray(flat_index, dtype=np.int64)
+        self.values = np.asarray(values)
+        self.fill_value = fill_value
+        self.dtype = np.result_type(self.values.dtype, np.asarray(fill_value).dtype)
+
+    @classmethod
+    def from_dense(cls, array, fill_value=np.nan):
+        array = np.asarray(array)
+        flat_index = np.flatnonzero(pd.notnull(array))
+        return cls(array.shape, flat_index, array.ravel()[flat_index], fill_value)
+
+    @property
+    def nnz(self):
+        return len(self.flat_index)
+
+    @property
+    def density(self):
+        return self.nnz / max(self.size, 1)
+
+    def positions(self):
+        """Index of the stored values along each dimension."""
+        return np.unravel_index(self.flat_index, self.shape)
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._getitem
+        )
+
+    def _getitem(self, key):
+        # `key` holds one integer or slice per dimension. Only the stored values
+        # inside the selection are expanded.
+        new_shape = []
+        new_positions = []
+        selected = np.ones(self.nnz, dtype=bool)
+        for dim_key, dim_size, dim_positions in zip(key, self.shape, self.positions()):
+            items = np.arange(dim_size)[dim_key]
+            item_positions = np.full(dim_size, -1)
+            item_positions[items] = np.arange(np.size(items))
+            dim_positions = item_positions[dim_positions]
+            selected &= dim_positions >= 0
+            if not isinstance(dim_key, (int, np.integer)):
+                new_shape.append(len(items))
+                new_positions.append(dim_positions)
+
+        array = np.full(new_shape, self.fill_value, dtype=self.dtype)
+        array[tuple(i[selected] for i in new_positions)] = self.values[selected]
+        return array
+
+    def transpose(self, order):
+        shape = tuple(self.shape[i] for i in order)
+        positions = self.positions()
+        flat_index = np.ravel_multi_index(tuple(positions[i] for i in order), shape)
+        sorter = np.argsort(flat_index, kind="stable")
+        return LongFormatArray(
+            shape, flat_index[sorter], self.values[sorter], self.fill_value
+        )
+
+
+def get_long_format_array(var):
+    """
+    Returns the LongFormatArray in which `var` (an xarray DataArray or Variable)
+    is stored, or None if it is not stored in long format.
+
+    """
+    data = getattr(var, "variable", var)._data
+    return data if isinstance(data, LongFormatArray) else None
+
+
+def stored_values(var):
+    """
+    Returns the values of `var` that are not empty, in the order of their
+    positions, without expanding long format variables.
+
+    """
+    long_format_array = get_long_format_array(var)
+    if long_format_array is not None:
+        values = long_format_array.values
+    else:
+        values = var.values.ravel()
+    return values[pd.notnull(values)]
+
+
+def long_format_variable(
+    dims, shape, flat_index, values, attrs=None, fill_value=np.nan
+):
+    return xr.Variable(
+        dims, LongFormatArray(shape, flat_index, values, fill_value), attrs=attrs
+    )
+
+
+def to_long_format(model_data, max_density=MAX_DENSITY):
+    """
+    Store all multi-dimensional data variables of `model_data` that have
+    no more than `max_density` of their items defined in long format, in place.
+    Variables that are already in long format are left as they are.
+
+    """
+    for var_name, var in model_data.data_vars.items():
+        if (
+            var.ndim < 2
+            or var.dtype.kind not in "fO"
+            or get_long_format_array(var) is not None
+        ):
+            continue
+        long_format_array = LongFormatArray.from_dense(var.values)
+        if long_format_array.density <= max_density:
+            model_data[var_name] = xr.Variable(
+                var.dims, long_format_array, attrs=var.attrs
+            )
+
+    return model_data
+
+
+def encode_long_format(model_data):
+    """
+    Returns a shallow copy of `model_data` in which variables stored in
+    long format are one-dimensional, indexed over the flat positions of their
+    values, so that they can be saved to file without being expanded.
+
+    """
+    encoded = model_data.copy()
+    for var_name, var in model_data.data_vars.items():
+        long_format_array = get_long_format_array(var)
+        if long_format_array is None:
+            continue
+        dim = _NETCDF_DIM.format(var_name)
+        encoded[var_name] = xr.DataArray(
+            long_format_array.values,
+            dims=[dim],
+            coords={dim: long_format_array.flat_index},
+            attrs={**var.attrs, _NETCDF_DIMS_ATTR: " ".join(var.dims)},
+        )
+
+    return encoded
+
+
+def decode_long_format(model_data):
+    """
+    Reverts `encode_long_format` on `model_data`, in place.
+
+    """
+    for var_name, var in list(model_data.data_vars.items()):
+        if _NETCDF_DIMS_ATTR not in var.attrs:
+            continue
+        attrs = var.attrs.copy()
+        dims = attrs.pop(_NETCDF_DIMS_ATTR).split(" ")
+        dim = _NETCDF_DIM.format(var_name)
+        model_data[var_name] = long_format_variable(
+            dims,
+            [model_data.dims[i] for i in dims],
+            model_data[dim].values,
+            var.values,
+            attrs=attrs,
+        )
+        model_data = model_data.drop_vars(dim)
+
+    return model_data
@@ -1,6 +1,7 @@
 from calliope.preprocess.model_run import (  # noqa: F401
     model_run_from_yaml,
     model_run_from_dict,
+    model_run_from_base,
     generate_model_run,
     apply_overrides,
 )
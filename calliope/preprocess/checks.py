@@ -183,6 +183,26 @@ def check_initial(config_model):
         _spores_cost_class = config_model.run.spores_options.get("score_cost_class", {})
         if not isinstance(_spores_cost_class, str):
             errors.append("`run.spores_options.score_cost_class` must be a string")
+        # Check that batches of SPORES only update valid spores options
+        _spores_batches = config_model.run.spores_options.get("batches", None)
+        if _spores_batches is not None:
+            _valid_batch_options = set(DEFAULTS.run.spores_options.keys()).difference(
+                ["batches", "processes"]
+            )
+            if not isinstance(_spores_batches, list) or not all(
+                isinstance(batch, dict) for batch in _spores_batches
+            ):
+                errors.append(
+                    "`run.spores_options.batches` must be a list of dictionaries"
+                )
+            elif any(
+                set(batch.keys()).difference(_valid_batch_options)
+                for batch in _spores_batches
+            ):
+                errors.append(
+                    "`run.spores_options.batches` can only update the spores "
+                    f"options {sorted(_valid_batch_options)}"
+                )
 
     # Only ['in', 'out', 'in_2', 'out_2', 'in_3', 'out_3']
     # are allowed as carrier tiers
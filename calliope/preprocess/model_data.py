@@ -22,8 +22,8 @@ from calliope import exceptions
 from calliope.core.attrdict import AttrDict
 from calliope._version import __version__
 from calliope.preprocess import checks
-from calliope.preprocess import time
-from calliope.core.util import dataset
+from calliope.preprocess import spatial, time
+from calliope.core.util import dataset, sparse_data
 
 
 class ModelDataFactory:
@@ -99,6 +99,10 @@ class ModelDataFactory:
 
         if self.model_run.get_key("model.random_seed", None):
             np.random.seed(seed=self.model_run.model.random_seed)
+        if self.model_run.get_key("model.spatial", None):
+            self.model_data = spatial.apply_spatial_aggregation(
+                self.model_data, self.model_run
+            )
         self.model_data_pre_clustering = self.model_data.copy(deep=True)
         if self.model_run.get_key("model.time", None):
             self.model_data = time.apply_time_clustering(
@@ -112,6 +116,8 @@ class ModelDataFactory:
         self._add_var_attrs()
         self._update_dtypes()
         self._check_data()
+        if self.model_run.get_key("model.sparse_model_data", False):
+            self.model_data = sparse_data.to_long_format(self.model_data)
 
     @staticmethod
     def _empty_or_invalid(var):
@@ -419,21 +425,7 @@ class ModelDataFactory:
         # TODO: this should be redundant once typedconfig is in (params will have predefined dtypes)
         for var_name, var in self.model_data.data_vars.items():
             if var.dtype.kind == "O":
-                no_nans = var.where(var != "nan", drop=True)
-                self.model_data[var_name] = var.where(var != "nan")
-                if no_nans.isin(["True", 0, 1, "False", "0", "1"]).all():
-                    # Turn to bool
-                    self.model_data[var_name] = var.isin(["True", 1, "1"])
-                else:
-                    try:
-                        self.model_data[var_name] = var.astype(np.int_, copy=False)
-                    except (ValueError, OverflowError):
-                        try:
-                            self.model_data[var_name] = var.astype(
-                                np.float_, copy=False
-                            )
-                        except ValueError:
-                            None
+                self.model_data[var_name] = _update_dtype(var)
 
     def _check_data(self):
         if self.node_dict or self.tech_dict:
@@ -445,3 +437,111 @@ class ModelDataFactory:
             self.model_data
         )
         exceptions.print_warnings_and_raise_errors(warnings=warns, errors=errors)
+
+
+def _update_dtype(var):
+    no_nans = var.where(var != "nan", drop=True)
+    if no_nans.isin(["True", 0, 1, "False", "0", "1"]).all():
+        # Turn to bool
+        return var.isin(["True", 1, "1"])
+    try:
+        return var.astype(np.int_, copy=False)
+    except (ValueError, OverflowError):
+        try:
+            return var.astype(np.float_, copy=False)
+        except ValueError:
+            return var.where(var != "nan")
+
+
+def get_param_updates(base_model_run, model_run, base_model_data):
+    """
+    Find the node/tech parameter values that differ between two model runs,
+    where `base_model_data` was built from `base_model_run`.
+
+    Returns
+    -------
+    param_updates : dict or None
+        `{var_name: [(index, value), ...]}` for all the changed values, with
+        `index` a dictionary of dimension names to dimension items. None if the model
+        runs differ in any other way (timeseries, model configuration,
+        technologies, links, or which parameters are defined where), in which
+        case model data must be built from scratch.
+
+    """
+    if (
+        model_run.timeseries_data is not base_model_run.timeseries_data
+        or model_run.timeseries_vars != base_model_run.timeseries_vars
+        or {k: v for k, v in model_run.model.items() if k != "name"}
+        != {k: v for k, v in base_model_run.model.items() if k != "name"}
+        or model_run.techs != base_model_run.techs
+        # Node parameters no longer map to single nodes once aggregated
+        or model_run.model.get("spatial", None)
+    ):
+        return None
+
+    node_dict = model_run.nodes.as_dict_flat()
+    base_node_dict = base_model_run.nodes.as_dict_flat()
+    if node_dict.keys() != base_node_dict.keys():
+        return None
+
+    param_updates = {}
+    for key, val in node_dict.items():
+        base_val = base_node_dict[key]
+        if val == base_val:
+            continue
+        key_match = re.search(
+            "^({0})\\.techs\\.({0})\\.(constraints|costs\\.({0}))\\.({0})$".format(
+                ModelDataFactory.LOOKUP_STR
+            ),
+            key,
+        )
+        if key_match is None or not all(
+            isinstance(i, (int, float)) and not isinstance(i, bool)
+            for i in [val, base_val]
+        ):
+            return None
+        node, tech, _, cost_class, param = key_match.groups()
+        if cost_class is None:
+            var_name, index = param, {"nodes": node, "techs": tech}
+        else:
+            var_name = f"cost_{param}"
+            index = {"nodes": node, "techs": tech, "costs": cost_class}
+        if var_name not in base_model_data.data_vars or set(
+            base_model_data[var_name].dims
+        ) != set(index.keys()):
+            return None
+        param_updates.setdefault(var_name, []).append((index, val))
+
+    return param_updates
+
+
+def update_model_data(base_model_data, param_updates, model_run, check=True):
+    """
+    Returns a copy of `base_model_data` with the parameter values in
+    `param_updates` (as returned by `get_param_updates`) changed, and
+    dataset attributes describing `model_run`.
+    All other data is shared with `base_model_data`.
+    If `check` is True, the final model data checks are run on the copy.
+
+    """
+    model_data = base_model_data.copy()
+    model_data.attrs = {
+        **base_model_data.attrs,
+        "applied_overrides": model_run["applied_overrides"],
+        "scenario": model_run["scenario"],
+    }
+    for var_name, updates in param_updates.items():
+        var = model_data[var_name].astype(object)
+        for index, val in updates:
+            var.loc[index] = val
+        model_data[var_name] = _update_dtype(var).assign_attrs(
+            model_data[var_name].attrs
+        )
+
+    if check:
+        model_data, final_check_comments, warns, errors = checks.check_model_data(
+            model_data
+        )
+        exceptions.print_warnings_and_raise_errors(warnings=warns, errors=errors)
+
+    return model_data
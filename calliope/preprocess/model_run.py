@@ -10,6 +10,7 @@ AttrDict, and building of associated debug information.
 
 """
 
+import copy
 import os
 import logging
 import itertools
@@ -21,10 +22,14 @@ import calliope
 from calliope import exceptions
 from calliope.core.attrdict import AttrDict
 from calliope.core.util.tools import relative_path
-from calliope.preprocess import nodes, checks, util
+from calliope.preprocess import nodes, checks, timeseries_cache, util
 
 logger = logging.getLogger(__name__)
 
+# Timeseries files already read into memory, keyed by absolute file path and
+# holding the file modification time alongside the unprocessed DataFrame.
+# Filled by `preload_timeseries_files`.
+_PRELOADED_TIMESERIES_FILES = {}
 
 # Output of: sns.color_palette('cubehelix', 10).as_hex()
 _DEFAULT_PALETTE = [
@@ -127,6 +132,55 @@ def model_run_from_dict(
     )
 
 
+def model_run_from_base(
+    base_config,
+    base_model_run,
+    timeseries_dataframes=None,
+    scenario=None,
+    override_dict=None,
+):
+    """
+    Generate processed ModelRun configuration by applying a scenario and/or
+    override dictionary on top of an already processed model configuration.
+    Timeseries data is reused from `base_model_run` unless the overrides change
+    which timeseries are loaded or how.
+
+    Parameters
+    ----------
+    base_config : AttrDict
+        Model configuration the base model run was generated from, i.e. the
+        "config_initial" of its debug data.
+    base_model_run : AttrDict
+    timeseries_dataframes : dict, optional
+        Dictionary of timeseries dataframes. If given, timeseries data is
+        always loaded again rather than reused from `base_model_run`.
+    scenario : str, optional
+    override_dict : dict or AttrDict, optional
+
+    """
+    config = copy.deepcopy(base_config)
+    # `timeseries_data_path` has already been interpreted relative to the base
+    # configuration file
+    config.config_path = None
+
+    config_with_overrides, debug_comments, overrides, scenario = apply_overrides(
+        config, scenario=scenario, override_dict=override_dict
+    )
+    applied_overrides = [
+        i for i in base_model_run.applied_overrides.split(";") if i
+    ] + overrides
+
+    return generate_model_run(
+        config_with_overrides,
+        timeseries_dataframes,
+        debug_comments,
+        applied_overrides,
+        scenario if scenario else base_model_run.scenario,
+        base_model_run.subsets,
+        base_model_run=base_model_run,
+    )
+
+
 def combine_overrides(config_model, overrides):
     override_dict = AttrDict()
     for override in overrides:
@@ -167,11 +221,16 @@ def apply_overrides(config, scenario=None, override_dict=None):
         os.path.join(os.path.dirname(calliope.__file__), "config", "defaults.yaml")
     )
 
-    # Interpret timeseries_data_path as relative
-    if "timeseries_data_path" in config.model:
-        config.model.timeseries_data_path = relative_path(
-            config.config_path, config.model.timeseries_data_path
-        )
+    # Interpret timeseries_data_path and the cache paths as relative
+    for path_key in [
+        "timeseries_data_path",
+        "timeseries_cache_path",
+        "clustering_cache_path",
+    ]:
+        if config.model.get(path_key, None) is not None:
+            config.model[path_key] = relative_path(
+                config.config_path, config.model[path_key]
+            )
 
     # FutureWarning: check if config includes an explicit objective cost class.
     # Added in 0.6.4-dev, to be removed in v0.7.0-dev.
@@ -476,15 +535,89 @@ def process_tech_groups(config_model, techs):
     return tech_groups
 
 
+def read_timeseries_file(file_path):
+    """
+    Read a timeseries CSV file, returning its modification time and contents
+    in the form expected by `preload_timeseries_files`.
+
+    """
+    return os.stat(file_path).st_mtime_ns, pd.read_csv(file_path, index_col=0)
+
+
+def preload_timeseries_files(timeseries_files):
+    """
+    Use already-read timeseries files when building models in this process,
+    instead of reading them from disk again. Files which have been modified
+    since they were read are still loaded from disk.
+
+    Parameters
+    ----------
+    timeseries_files : dict
+        Maps file paths to the output of `read_timeseries_file`.
+
+    """
+    _PRELOADED_TIMESERIES_FILES.update(
+        {os.path.abspath(k): v for k, v in timeseries_files.items()}
+    )
+
+
 def load_timeseries_from_file(config_model, tskey):
+    """
+    Load a timeseries CSV file, with its dates parsed, from the files preloaded
+    in this process, the timeseries cache (if `model.timeseries_cache_path` is
+    set) or, failing those, the file itself.
+    """
     file_path = os.path.join(config_model.model.timeseries_data_path, tskey)
-    df = pd.read_csv(file_path, index_col=0)
+    dtformat = config_model.model["timeseries_dateformat"]
+    cache_path = config_model.model.get("timeseries_cache_path", None)
+
+    preloaded = _PRELOADED_TIMESERIES_FILES.get(os.path.abspath(file_path), None)
+    if preloaded is not None and preloaded[0] == os.stat(file_path).st_mtime_ns:
+        df = parse_timeseries(preloaded[1].copy(), tskey, dtformat)
+    else:
+        df = None
+        if cache_path is not None:
+            df = timeseries_cache.read_cached_timeseries(
+                cache_path, file_path, dtformat
+            )
+        if df is None:
+            df = parse_timeseries(pd.read_csv(file_path, index_col=0), tskey, dtformat)
+            if cache_path is not None:
+                try:
+                    timeseries_cache.write_cached_timeseries(
+                        cache_path, file_path, dtformat, df
+                    )
+                except OSError as e:
+                    logger.warning(f"Unable to cache timeseries file {tskey}: {e}")
     df.columns = pd.MultiIndex.from_product(
         [[tskey], df.columns], names=["source", "column"]
     )
     return df
 
 
+def parse_timeseries(df, tskey, dtformat):
+    """
+    Check that timeseries data loaded from `tskey` is numeric and parse its
+    dates using the datetime format `dtformat`.
+    """
+    try:
+        df.apply(pd.to_numeric)
+    except ValueError as e:
+        raise exceptions.ModelError(
+            "Error in loading data from {}. Ensure all entries are "
+            "numeric. Full error: {}".format(tskey, e)
+        )
+    # Parse the dates, checking for errors specific to this
+    try:
+        df.index = _parser(df.index, dtformat)
+    except ValueError as e:
+        raise exceptions.ModelError(
+            "Error in parsing dates in timeseries data from {}, "
+            "using datetime format `{}`: {}".format(tskey, dtformat, e)
+        )
+    return df
+
+
 def check_timeseries_dataframes(timeseries_dataframes):
     """
     Timeseries dataframes should be dict of pandas DataFrames.
@@ -576,35 +709,23 @@ def process_timeseries_data(config_model, model_run, timeseries_dataframes):
 
     # Load each timeseries into timeseries data. tskey is either a filename
     # (called by file=...) or a key in timeseries_dataframes (called by df=...)
+    timeseries_frames = [] if timeseries_data is None else [timeseries_data]
     for tskey in constraint_tsnames | cluster_tsnames:
         # If tskey is a CSV path, load the CSV, else load the dataframe
 
         if tskey[0] == "file":
             df = load_timeseries_from_file(config_model, tskey[1])
         elif tskey[0] == "df":
-            df = load_timeseries_from_dataframe(timeseries_dataframes, tskey[1])
+            df = parse_timeseries(
+                load_timeseries_from_dataframe(timeseries_dataframes, tskey[1]),
+                tskey[1],
+                dtformat,
+            )
         else:
             raise KeyError(f"Unrecognised timeseries data source {tskey[0]}")
+        timeseries_frames.append(df)
 
-        try:
-            df.apply(pd.to_numeric)
-        except ValueError as e:
-            raise exceptions.ModelError(
-                "Error in loading data from {}. Ensure all entries are "
-                "numeric. Full error: {}".format(tskey[1], e)
-            )
-        # Parse the dates, checking for errors specific to this
-        try:
-            df.index = _parser(df.index, dtformat)
-        except ValueError as e:
-            raise exceptions.ModelError(
-                "Error in parsing dates in timeseries data from {}, "
-                "using datetime format `{}`: {}".format(tskey[1], dtformat, e)
-            )
-        if timeseries_data is None:
-            timeseries_data = df
-        else:
-            timeseries_data = pd.concat([timeseries_data, df], axis=1)
+    timeseries_data = pd.concat(timeseries_frames, axis=1)
 
     # Apply time subsetting, if supplied in model_run
     subset_time_config = config_model.model.get("subset_time", None)
@@ -673,6 +794,29 @@ def process_timeseries_data(config_model, model_run, timeseries_dataframes):
     return timeseries_data.rename_axis(index="timesteps"), constraint_tsvars
 
 
+def _has_same_timeseries(config_model, model_run, base_model_run):
+    """
+    Whether the timeseries data of `base_model_run` is also that of a model run
+    being generated from `config_model`.
+    """
+    # Timeseries data given directly in the model configuration is not compared
+    if (
+        "timeseries_data" not in base_model_run
+        or config_model.model.get("timeseries_data", None) is not None
+    ):
+        return False
+
+    for k in ["timeseries_data_path", "timeseries_dateformat", "subset_time"]:
+        if config_model.model.get(k, None) != base_model_run.model.get(k, None):
+            return False
+
+    return _get_names(model_run.nodes.as_dict_flat()) == _get_names(
+        base_model_run.nodes.as_dict_flat()
+    ) and _get_names(config_model.model.as_dict_flat()) == _get_names(
+        base_model_run.model.as_dict_flat()
+    )
+
+
 def generate_model_run(
     config,
     timeseries_dataframes,
@@ -680,6 +824,7 @@ def generate_model_run(
     applied_overrides,
     scenario,
     subsets,
+    base_model_run=None,
 ):
     """
     Returns a processed model_run configuration AttrDict and a debug
@@ -691,6 +836,9 @@ def generate_model_run(
     timeseries_dataframes : dict
     debug_comments : AttrDict
     scenario : str
+    base_model_run : AttrDict, optional
+        If given, its timeseries data is reused if `config` loads the same
+        timeseries in the same way and no `timeseries_dataframes` are given.
     """
     model_run = AttrDict()
     model_run["scenario"] = scenario
@@ -721,10 +869,18 @@ def generate_model_run(
 
     # 5) Fully populate timeseries data
     # Raises ModelErrors if there are problems with timeseries data at this stage
-    (
-        model_run["timeseries_data"],
-        model_run["timeseries_vars"],
-    ) = process_timeseries_data(config, model_run, timeseries_dataframes)
+    if (
+        base_model_run is not None
+        and timeseries_dataframes is None
+        and _has_same_timeseries(config, model_run, base_model_run)
+    ):
+        model_run["timeseries_data"] = base_model_run["timeseries_data"]
+        model_run["timeseries_vars"] = base_model_run["timeseries_vars"]
+    else:
+        (
+            model_run["timeseries_data"],
+            model_run["timeseries_vars"],
+        ) = process_timeseries_data(config, model_run, timeseries_dataframes)
 
     # 6) Grab additional relevant bits from run and model config
     model_run["run"] = config["run"]
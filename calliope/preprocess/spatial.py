@@ -0,0 +1,42 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+spatial.py
+~~~~~~~~~~
+
+Functionality to aggregate nodes into regions
+
+"""
+from calliope.core.attrdict import AttrDict
+from calliope.core.util.tools import plugin_load
+
+
+def apply_spatial_aggregation(model_data, model_run):
+    """
+    Take a Calliope model_data post time dimension addition, prior to any time
+    clustering, and aggregate its nodes into regions as configured in
+    `model.spatial`, e.g. by clustering nodes with similar timeseries and/or
+    location (see :mod:`calliope.spatial.funcs`).
+
+    Parameters
+    ----------
+    model_data : xarray Dataset
+        Preprocessed Calliope model_data, as produced using
+        `calliope.preprocess.build_model_data`
+    model_run : AttrDict
+        preprocessed model_run dictionary, as produced by
+        Calliope.preprocess_model
+
+    Returns
+    -------
+    data : xarray Dataset
+        Dataset in which the nodes have been replaced by regions, with the
+        mapping from original nodes to regions in `lookup_original_node_region`.
+
+    """
+    spatial_config = model_run.model["spatial"]
+    func = plugin_load(spatial_config.function, builtin_module="calliope.spatial.funcs")
+    func_kwargs = spatial_config.get("function_options", AttrDict()).as_dict()
+
+    return func(data=model_data.copy(deep=True), **func_kwargs)
@@ -14,6 +14,7 @@ import pandas as pd
 
 from calliope import exceptions
 from calliope.core.attrdict import AttrDict
+from calliope.core.util import sparse_data
 from calliope.core.util.tools import plugin_load
 
 
@@ -36,6 +37,9 @@ def apply_time_clustering(model_data, model_run):
     - Timestep resampling
         Used to reduce problem size by reducing resolution of all timeseries data.
         E.g. resample from 1H to 6H timesteps
+    - Timestep segmentation
+        Consecutive timesteps with similar profiles within each day are merged
+        into segments of variable duration, which can be combined with clustering.
 
 
     Parameters
@@ -91,6 +95,16 @@ def apply_time_clustering(model_data, model_run):
         func_kwargs = time_config.get("function_options", AttrDict()).as_dict()
         if "file=" in func_kwargs.get("clustering_func", ""):
             func_kwargs.update({"model_run": model_run})
+        elif (
+            time_config.function == "apply_clustering"
+            and model_run.model.get("clustering_cache_path", None) is not None
+        ):
+            func_kwargs.update(
+                {
+                    "cache_path": model_run.model.clustering_cache_path,
+                    "random_seed": model_run.model.get("random_seed", None),
+                }
+            )
         data = func(data=data, timesteps=timesteps, **func_kwargs)
 
     return data
@@ -117,6 +131,7 @@ def add_time_dimension(data, model_run):
 
     """
     key_errors = []
+    sparse = model_run.get_key("model.sparse_model_data", False)
     # Search through every constraint/cost for use of '='
     for variable in model_run.timeseries_vars:
         # 2) convert to a Pandas Series to do 'string contains' search
@@ -160,11 +175,16 @@ def add_time_dimension(data, model_run):
         # dimensions with the time varying data (static data is just duplicated
         # at each timestep)
 
-        data[variable] = (
-            xr.DataArray.from_series(timeseries_data.unstack())
-            .reindex(data[variable].coords)
-            .fillna(data[variable])
-        )
+        if sparse:
+            data[variable] = _long_format_timeseries(
+                data[variable], timeseries_data, len(data.timesteps)
+            )
+        else:
+            data[variable] = (
+                xr.DataArray.from_series(timeseries_data.unstack())
+                .reindex(data[variable].coords)
+                .fillna(data[variable])
+            )
     if key_errors:
         exceptions.print_warnings_and_raise_errors(errors=key_errors)
 
@@ -195,6 +215,47 @@ def add_time_dimension(data, model_run):
     return data
 
 
+def _long_format_timeseries(static_data, timeseries_data, n_timesteps):
+    """
+    Add the time dimension to `static_data` as in `add_time_dimension`, with
+    the data in `timeseries_data` columns (one per `file=` or `df=` item of
+    `static_data`), storing the result in long format. Only the items of
+    `static_data` that are defined are expanded over all timesteps.
+
+    """
+    static_series = static_data.to_series()
+    static_positions = np.flatnonzero(static_series.notnull().values)
+    timeseries_items = timeseries_data.columns
+    if timeseries_items.nlevels == 1:
+        timeseries_items = timeseries_items.get_level_values(0)
+    timeseries_positions = np.searchsorted(
+        static_positions, static_series.index.get_indexer(timeseries_items)
+    )
+    is_static = np.ones(len(static_positions), dtype=bool)
+    is_static[timeseries_positions] = False
+
+    static_values = static_series.values[static_positions[is_static]]
+    try:
+        static_values = static_values.astype(np.float_)
+    except (ValueError, TypeError):
+        pass
+    values = np.empty(
+        (len(static_positions), n_timesteps),
+        dtype=np.result_type(static_values.dtype, timeseries_data.values.dtype),
+    )
+    values[is_static] = static_values[:, np.newaxis]
+    values[timeseries_positions] = timeseries_data.values.T
+
+    return sparse_data.long_format_variable(
+        static_data.dims + ("timesteps",),
+        static_data.shape + (n_timesteps,),
+        (
+            static_positions[:, np.newaxis] * n_timesteps + np.arange(n_timesteps)
+        ).ravel(),
+        values.ravel(),
+    )
+
+
 def add_max_demand_timesteps(model_data):
     model_data["max_demand_timesteps"] = (
         (
@@ -0,0 +1,105 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+timeseries_cache.py
+~~~~~~~~~~~~~~~~~~~
+
+On-disk cache of timeseries CSV files, with their dates already parsed,
+stored as NumPy arrays which are memory-mapped when loaded.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_file_prefix(cache_path, file_path):
+    # All cache entries of one source file share a prefix, so that outdated
+    # entries can be found and removed
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_path, f"{os.path.basename(file_path)}.{path_hash[:12]}.")
+
+
+def _cache_file_stem(cache_path, file_path, dtformat):
+    stat = os.stat(file_path)
+    key = f"{stat.st_mtime_ns}|{stat.st_size}|{dtformat}"
+    key_hash = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return _cache_file_prefix(cache_path, file_path) + key_hash[:12]
+
+
+def read_cached_timeseries(cache_path, file_path, dtformat):
+    """
+    Returns the DataFrame cached for the CSV file at `file_path`, with dates
+    parsed using `dtformat`, or None if the file has not been cached since it
+    was last modified.
+
+    """
+    stem = _cache_file_stem(cache_path, file_path, dtformat)
+    try:
+        with open(stem + ".json", "r") as f:
+            metadata = json.load(f)
+        index = np.load(stem + ".index.npy")
+        values = np.load(stem + ".values.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    df = pd.DataFrame(
+        values, index=pd.DatetimeIndex(index, name=metadata["index_name"])
+    )
+    df.columns = pd.Index(metadata["columns"], dtype=metadata["columns_dtype"])
+    if any(dtype != str(values.dtype) for dtype in metadata["dtypes"]):
+        df = df.astype(dict(zip(df.columns, metadata["dtypes"])))
+
+    return df
+
+
+def write_cached_timeseries(cache_path, file_path, dtformat, df):
+    """
+    Cache `df`, read from the CSV file at `file_path` with dates parsed using
+    `dtformat`, replacing any entries cached for earlier versions of the file.
+    DataFrames with non-numeric data are not cached.
+
+    """
+    if not all(dtype.kind in "biuf" for dtype in df.dtypes):
+        return
+
+    stem = _cache_file_stem(cache_path, file_path, dtformat)
+    prefix = _cache_file_prefix(cache_path, file_path)
+    os.makedirs(cache_path, exist_ok=True)
+    for cached_file in os.listdir(cache_path):
+        cached_file = os.path.join(cache_path, cached_file)
+        if cached_file.startswith(prefix) and not cached_file.startswith(stem):
+            try:
+                os.remove(cached_file)
+            except OSError:  # e.g. still in use by another process
+                pass
+
+    metadata = {
+        "index_name": df.index.name,
+        "columns": df.columns.tolist(),
+        "columns_dtype": str(df.columns.dtype),
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+    }
+    # Files are written under temporary names and then renamed, the metadata
+    # file last, so that an entry is only ever read once it is complete
+    arrays = {
+        ".index.npy": df.index.values.astype("datetime64[ns]"),
+        ".values.npy": df.to_numpy(dtype=np.result_type(*df.dtypes)),
+    }
+    tmp_suffix = f".{os.getpid()}.tmp"
+    for suffix, array in arrays.items():
+        with open(stem + suffix + tmp_suffix, "wb") as f:
+            np.save(f, array)
+        os.replace(stem + suffix + tmp_suffix, stem + suffix)
+    with open(stem + ".json" + tmp_suffix, "w") as f:
+        json.dump(metadata, f)
+    os.replace(stem + ".json" + tmp_suffix, stem + ".json")
+    logger.debug(f"Cached timeseries file {file_path} in {cache_path}")
@@ -0,0 +1,3 @@
+# flake8: noqa
+
+from calliope.spatial import funcs
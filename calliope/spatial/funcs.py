@@ -0,0 +1,509 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+funcs.py
+~~~~~~~~
+
+Functions to aggregate nodes into regions, and to disaggregate results back
+to the original nodes.
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from sklearn import cluster as sk_cluster
+
+from calliope import exceptions
+
+logger = logging.getLogger(__name__)
+
+# Parameters which are a total over all technologies at a node, summed over
+# the nodes of a region. All other numeric parameters are averaged.
+SUMMED_PARAMS = [
+    "energy_cap_equals",
+    "energy_cap_max",
+    "energy_cap_min",
+    "export_max",
+    "resource_area_equals",
+    "resource_area_max",
+    "resource_area_min",
+    "resource_cap_equals",
+    "resource_cap_max",
+    "resource_cap_min",
+    "storage_cap_equals",
+    "storage_cap_max",
+    "storage_cap_min",
+    "units_equals",
+    "units_max",
+    "units_min",
+    "available_area",
+]
+
+# Parameters which switch something on for a technology at a node, switched
+# on for a region if they are switched on at any of its nodes
+SWITCH_PARAMS = [
+    "node_tech",
+    "allowed_carrier_con",
+    "allowed_carrier_prod",
+    "export",
+    "force_asynchronous_prod_con",
+    "force_resource",
+    "include_storage",
+    "one_way",
+    "resource_cap_equals_energy_cap",
+]
+
+# Results which are not totals over the technologies at a node, so that they
+# are copied to (rather than shared between) the original nodes of a region
+INTENSIVE_RESULTS = ["capacity_factor"]
+
+
+def _node_tech_mapping(data, node_region):
+    """
+    Returns the region and technology into which each node/tech combination
+    is merged, as two pandas Series indexed over (nodes, techs), for all
+    combinations in `data.node_tech`. Transmission links between two nodes of
+    the same region are left out, and all other links are renamed to link
+    their regions.
+    """
+    node_techs = data.node_tech.to_series().dropna().index
+    nodes = node_techs.get_level_values("nodes")
+    techs = node_techs.get_level_values("techs")
+    regions = pd.Index(node_region.loc[nodes].values)
+
+    new_techs = pd.Index(techs)
+    if "link_remote_nodes" in data.data_vars:
+        remote_nodes = data.link_remote_nodes.to_series().reindex(node_techs)
+        is_link = remote_nodes.notnull().values
+        remote_regions = node_region.reindex(remote_nodes.values).values
+        new_techs = pd.Index(
+            np.where(
+                is_link,
+                [
+                    "{}:{}".format(tech.split(":")[0], remote_region)
+                    for tech, remote_region in zip(techs, remote_regions)
+                ],
+                techs,
+            )
+        )
+        keep = ~is_link | (remote_regions != regions)
+    else:
+        keep = np.ones(len(node_techs), dtype=bool)
+
+    return (
+        pd.Series(regions[keep], index=node_techs[keep]),
+        pd.Series(new_techs[keep], index=node_techs[keep]),
+    )
+
+
+def _merge_weights(data, pair_group):
+    """
+    Weight of each node/tech combination (indexed as `pair_group`, which gives
+    the merged region/tech combination of each) when averaging parameters:
+    its energy capacity (`energy_cap_equals` or else `energy_cap_max`) if that
+    is finite and positive for all combinations merged together, otherwise 1.
+    """
+    energy_cap = pd.Series(np.nan, index=pair_group.index)
+    for param in ["energy_cap_max", "energy_cap_equals"]:
+        if param in data.data_vars:
+            values = data[param].to_series().reindex(pair_group.index)
+            energy_cap = values.where(values.notnull(), energy_cap)
+    energy_cap = energy_cap.where(np.isfinite(energy_cap) & (energy_cap > 0))
+    all_defined = energy_cap.notnull().groupby(pair_group.values).transform("all")
+    return energy_cap.where(all_defined.values, 1.0)
+
+
+def _merge_rows(values, group, how, weights=None):
+    """
+    Merge the rows of the 2D array `values` with the same `group`, returning
+    one row per group (in sorted order).
+    """
+    df = pd.DataFrame(values)
+    grouped = df.groupby(group)
+    if how == "sum":
+        return grouped.sum(min_count=1).values
+    elif how == "max":
+        return grouped.max().values
+    elif how == "first":
+        # Groups without any values are None, rather than NaN, in object columns
+        return grouped.first().where(lambda x: x.notnull(), np.nan).values
+    elif how == "mean":
+        notnull = df.notnull().astype(float).mul(weights, axis=0)
+        total = df.mul(weights, axis=0).groupby(group).sum(min_count=1)
+        return (total / notnull.groupby(group).sum()).values
+
+
+def _node_regions(data, regions):
+    nodes = data.nodes.to_index()
+    node_region = pd.Series(nodes, index=nodes)
+    for region, region_nodes in regions.items():
+        region_nodes = [region_nodes] if isinstance(region_nodes, str) else region_nodes
+        undefined = set(region_nodes).difference(nodes)
+        if undefined:
+            raise exceptions.ModelError(
+                "Cannot aggregate nodes {} into region `{}`, as they are not "
+                "defined.".format(sorted(undefined), region)
+            )
+        aggregated = node_region.loc[region_nodes]
+        if (aggregated != aggregated.index).any():
+            raise exceptions.ModelError(
+                "Cannot aggregate nodes {} into more than one region.".format(
+                    sorted(aggregated[aggregated != aggregated.index].index)
+                )
+            )
+        node_region.loc[region_nodes] = region
+    clashes = [
+        region
+        for region, region_nodes in regions.items()
+        if region in nodes and region not in region_nodes
+    ]
+    if clashes:
+        raise exceptions.ModelError(
+            "Cannot name regions {} after nodes which are not part of them.".format(
+                sorted(clashes)
+            )
+        )
+    return node_region
+
+
+def aggregate_nodes(data, regions):
+    """
+    Merge groups of nodes into single nodes (regions).
+
+    The technologies of all nodes in a region are merged: capacity limits,
+    available area and `resource` given in absolute terms (`resource_unit:
+    energy`) are summed, switches are on if they are on at any node, and all
+    other numeric parameters (e.g. efficiencies, costs and `resource` per unit
+    capacity or area) are averaged, weighted by the energy capacity of each
+    node if that is finite, otherwise equally. Non-numeric parameters are taken
+    from the first node. Transmission links within a region are removed, and
+    links between regions are merged into one link per technology and pair of
+    regions.
+
+    The mapping from original nodes to regions is kept in
+    `lookup_original_node_region`, and the share of each region's
+    technologies which each original node represents in `original_node_share`,
+    for use in :func:`~calliope.spatial.funcs.disaggregate`.
+
+    Parameters
+    ----------
+    data : xarray.Dataset
+        Calliope model data.
+    regions : dict
+        Nodes to merge, as lists of nodes keyed by the name of their region.
+        Nodes which are not listed are kept as they are.
+
+    Returns
+    -------
+    data_new : xarray.Dataset
+
+    """
+    node_region = _node_regions(data, regions)
+    pair_region, pair_tech = _node_tech_mapping(data, node_region)
+
+    new_nodes = pd.Index(pd.unique(node_region.values), name="nodes")
+    new_techs = pd.Index(sorted(pd.unique(pair_tech.values)), name="techs")
+    new_pairs = pd.MultiIndex.from_arrays([pair_region, pair_tech]).unique()
+    new_pairs = new_pairs.sortlevel()[0]
+    pair_group = pd.Series(
+        new_pairs.get_indexer(pd.MultiIndex.from_arrays([pair_region, pair_tech])),
+        index=pair_region.index,
+    )
+    weights = _merge_weights(data, pair_group)
+
+    n_techs = data.techs.size
+    old_positions = data.nodes.to_index().get_indexer(
+        pair_group.index.get_level_values("nodes")
+    ) * n_techs + data.techs.to_index().get_indexer(
+        pair_group.index.get_level_values("techs")
+    )
+    new_positions = new_nodes.get_indexer(new_pairs.get_level_values(0)) * len(
+        new_techs
+    ) + new_techs.get_indexer(new_pairs.get_level_values(1))
+
+    if "resource_unit" in data.data_vars:
+        resource_unit = data.resource_unit.to_series().reindex(pair_group.index)
+        summed_resource = (
+            resource_unit.groupby(pair_group.values)
+            .first()
+            .reindex(range(len(new_pairs)))
+            == "energy"
+        ).values
+    else:
+        summed_resource = np.ones(len(new_pairs), dtype=bool)
+
+    def _merge_node_techs(var):
+        other_dims = [i for i in var.dims if i not in ["nodes", "techs"]]
+        var_values = var.transpose("nodes", "techs", *other_dims).values
+        other_shape = var_values.shape[2:]
+        values = var_values.reshape((-1, int(np.prod(other_shape))))[old_positions]
+        if var.name in SWITCH_PARAMS:
+            merged = _merge_rows(values, pair_group.values, "max")
+        elif var.dtype.kind not in "fiub":
+            merged = _merge_rows(values, pair_group.values, "first")
+        elif var.name in SUMMED_PARAMS:
+            merged = _merge_rows(values, pair_group.values, "sum")
+        else:
+            merged = _merge_rows(values, pair_group.values, "mean", weights.values)
+            if var.name == "resource":
+                summed = _merge_rows(values, pair_group.values, "sum")
+                merged[summed_resource] = summed[summed_resource]
+
+        dtype = (
+            var.dtype if var.dtype.kind in "fO" else np.result_type(var.dtype, float)
+        )
+        new_values = np.full(
+            (len(new_nodes) * len(new_techs), merged.shape[1]),
+            np.nan,
+            dtype=object if dtype.kind == "O" else float,
+        )
+        new_values[new_positions] = merged
+        return xr.DataArray(
+            new_values.reshape((len(new_nodes), len(new_techs)) + other_shape),
+            dims=("nodes", "techs", *other_dims),
+            coords={dim: var.coords[dim] for dim in other_dims if dim in var.coords},
+            attrs=var.attrs,
+        ).transpose(*var.dims)
+
+    def _merge_nodes(var):
+        var = var.assign_coords(regions=("nodes", node_region.values))
+        grouped = var.groupby("regions")
+        if var.name in SUMMED_PARAMS:
+            merged = grouped.sum("nodes", min_count=1, keep_attrs=True)
+        elif var.dtype.kind in "fiub":
+            merged = grouped.mean("nodes", keep_attrs=True)
+        else:
+            merged = grouped.first(keep_attrs=True)
+        return (
+            merged.rename({"regions": "nodes"})
+            .reindex(nodes=new_nodes)
+            .transpose(*var.dims)
+        )
+
+    # Technology-level data of the first original technology of each technology
+    first_techs = (
+        pair_tech.reset_index(level="techs").groupby(pair_tech.values).techs.first()
+    )
+
+    data_new = data.drop_dims(["nodes", "techs"])
+    for var_name, var in data.data_vars.items():
+        if var_name in ["link_remote_nodes", "link_remote_techs"]:
+            continue
+        elif "nodes" in var.dims and "techs" in var.dims:
+            data_new[var_name] = _merge_node_techs(var)
+        elif "nodes" in var.dims:
+            data_new[var_name] = _merge_nodes(var)
+        elif "techs" in var.dims:
+            data_new[var_name] = var.sel(
+                techs=first_techs.loc[new_techs].values
+            ).assign_coords(techs=new_techs)
+
+    if "link_remote_nodes" in data.data_vars:
+        links = new_pairs[new_pairs.get_level_values(1).str.contains(":")]
+        link_techs = links.get_level_values(1).str.split(":")
+        remote_nodes = pd.Series(link_techs.str[1], index=links)
+        remote_techs = pd.Series(
+            link_techs.str[0] + ":" + links.get_level_values(0), index=links
+        )
+        for var_name, remote in [
+            ("link_remote_nodes", remote_nodes),
+            ("link_remote_techs", remote_techs),
+        ]:
+            remote.index.names = ["nodes", "techs"]
+            data_new[var_name] = (
+                xr.DataArray.from_series(remote)
+                .reindex(nodes=new_nodes, techs=new_techs)
+                .assign_attrs(data[var_name].attrs)
+            )
+
+    # Mapping to the original nodes, for disaggregation
+    share = weights / weights.groupby(pair_group.values).transform("sum").values
+    share = share.groupby(
+        [share.index.get_level_values("nodes"), pair_tech.values]
+    ).sum()
+    share.index.names = ["original_nodes", "techs"]
+    data_new["original_node_share"] = xr.DataArray.from_series(share).reindex(
+        original_nodes=node_region.index.values, techs=new_techs
+    )
+    data_new["lookup_original_node_region"] = xr.DataArray(
+        node_region.values,
+        dims=["original_nodes"],
+        coords={"original_nodes": node_region.index.values},
+    )
+
+    logger.debug(
+        f"Aggregated {len(node_region)} nodes into {len(new_nodes)} regions, "
+        f"and {len(pair_group)} node/tech combinations into {len(new_pairs)}"
+    )
+
+    return data_new
+
+
+def _node_features(data, variables=None, coordinates_weight=1):
+    """
+    Array with one row per node of its (normalized) timeseries and coordinates,
+    to cluster nodes by.
+    """
+    if variables is None:
+        variables = [
+            var
+            for var, var_data in data.data_vars.items()
+            if "nodes" in var_data.dims
+            and "timesteps" in var_data.dims
+            and var_data.dtype.kind in "fi"
+        ]
+    features = []
+    for var in variables:
+        var_data = data[var].astype(float)
+        if "techs" in var_data.dims:
+            # Normalized by the maximum over all nodes and timesteps, per tech
+            var_data = abs(
+                var_data / abs(var_data).groupby("techs").max(..., skipna=True)
+            )
+        features.append(
+            var_data.transpose("nodes", ...).values.reshape(data.nodes.size, -1)
+        )
+    X = np.nan_to_num(
+        np.concatenate(features, axis=1)
+        if features
+        else np.empty((data.nodes.size, 0)),
+        nan=0.0,
+        posinf=0.0,
+        neginf=0.0,
+    )
+
+    if coordinates_weight and "node_coordinates" in data.data_vars:
+        coordinates = data.node_coordinates.transpose("nodes", ...).values
+        coordinates = coordinates - np.nanmean(coordinates, axis=0)
+        coordinates_variance = np.nanvar(coordinates, axis=0).sum()
+        if X.shape[1] > 0 and coordinates_variance > 0:
+            # Scaled such that coordinates vary as much as all timeseries together
+            coordinates = coordinates * np.sqrt(
+                coordinates_weight * X.var(axis=0).sum() / coordinates_variance
+            )
+        X = np.concatenate([X, np.nan_to_num(coordinates)], axis=1)
+
+    return X
+
+
+def cluster_nodes(
+    data,
+    k,
+    clustering_func="kmeans",
+    variables=None,
+    coordinates_weight=1,
+    **kwargs,
+):
+    """
+    Aggregate nodes with similar timeseries and/or location into `k` regions,
+    using :func:`~calliope.spatial.funcs.aggregate_nodes`. Each region is named
+    after its first node.
+
+    Parameters
+    ----------
+    data : xarray.Dataset
+        Calliope model data.
+    k : int
+        Number of regions to create.
+    clustering_func : str, default = 'kmeans'
+        'kmeans' or 'hierarchical' for KMeans or Agglomerative clustering,
+        respectively.
+    variables : list, optional
+        Timeseries data variables (e.g. `resource`) by whose values (normalized
+        per technology) nodes are clustered. If None (default), all timeseries
+        variables are used. If an empty list, nodes are clustered by location only.
+    coordinates_weight : float, default = 1
+        Weight of node coordinates (if defined) in clustering. With a weight of
+        1, the spread of node coordinates is scaled to match the total spread
+        of all timeseries. If 0, nodes are clustered by timeseries only.
+    kwargs : dict
+        Additional keyword arguments for the sklearn clustering class, see
+        http://scikit-learn.org/stable/modules/generated/sklearn.cluster.KMeans.html
+        or http://scikit-learn.org/stable/modules/generated/sklearn.cluster.AgglomerativeClustering.html
+
+    Returns
+    -------
+    data_new : xarray.Dataset
+
+    """
+    if k > data.nodes.size:
+        raise exceptions.ModelError(
+            "Cannot cluster {} nodes into {} regions.".format(data.nodes.size, k)
+        )
+    X = _node_features(data, variables, coordinates_weight)
+
+    if clustering_func == "kmeans":
+        kwargs.setdefault("n_init", 10)
+        labels = sk_cluster.KMeans(k, **kwargs).fit(X).labels_
+    elif clustering_func == "hierarchical":
+        labels = sk_cluster.AgglomerativeClustering(k, **kwargs).fit(X).labels_
+    else:
+        raise exceptions.ModelError(
+            "Unknown node clustering function `{}`, must be `kmeans` or "
+            "`hierarchical`.".format(clustering_func)
+        )
+
+    nodes = data.nodes.to_index().to_series()
+    regions = {
+        region_nodes.iloc[0]: list(region_nodes)
+        for _, region_nodes in nodes.groupby(labels, sort=False)
+    }
+
+    return aggregate_nodes(data, regions)
+
+
+def disaggregate(results, model_data):
+    """
+    Disaggregate `results` (or any other data) of a model whose nodes have been
+    aggregated into regions, back to the original nodes. Technology results are
+    shared between the original nodes of a region in proportion to the weight
+    with which their parameters were merged (see
+    :func:`~calliope.spatial.funcs.aggregate_nodes`), except for capacity
+    factors, which are copied. Results without a technology dimension (e.g.
+    `unmet_demand`) are shared equally between the original nodes of a region.
+    Transmission links keep the technology names linking regions.
+
+    Parameters
+    ----------
+    results : xarray.Dataset
+        e.g. `model.results`.
+    model_data : xarray.Dataset
+        Model data (e.g. `model.inputs`), including `lookup_original_node_region`
+        and `original_node_share`.
+
+    Returns
+    -------
+    disaggregated_results : xarray.Dataset
+
+    """
+    node_region = model_data.lookup_original_node_region
+    share = model_data.original_node_share
+    n_nodes = node_region.to_series().value_counts()
+    node_share = xr.DataArray(
+        1 / n_nodes.loc[node_region.values].values, dims=["original_nodes"]
+    )
+
+    disaggregated = {}
+    for var_name, var in results.data_vars.items():
+        if "nodes" not in var.dims:
+            disaggregated[var_name] = var
+            continue
+        var_original = var.sel(nodes=node_region).drop_vars("nodes")
+        if var_name in INTENSIVE_RESULTS:
+            pass
+        elif "techs" in var.dims:
+            var_original = var_original * share
+        elif var.dtype.kind in "fi":
+            var_original = var_original * node_share
+        disaggregated[var_name] = (
+            var_original.rename({"original_nodes": "nodes"})
+            .transpose(*var.dims)
+            .assign_attrs(var.attrs)
+        )
+
+    return xr.Dataset(disaggregated, attrs=results.attrs)
@@ -0,0 +1,171 @@
+import pytest  # noqa: F401
+
+import calliope
+from calliope.backend.presolve import (
+    Presolve,
+    zero_capacity_node_techs,
+    zero_resource_timesteps,
+)
+from calliope.backend.subsets import MaskCache, create_valid_subset
+
+OVERRIDES = {
+    "model.subset_time": ["2005-01-01", "2005-01-01"],
+    "nodes.region1.techs.ccgt.constraints.energy_cap_max": 0,
+    "links.region1,region2.techs.ac_transmission.constraints.energy_cap_max": 0,
+    "nodes.region2.techs.battery.constraints.energy_cap_equals": 0,
+}
+
+
+def _build_model(override_dict):
+    return calliope.examples.national_scale(override_dict=override_dict)
+
+
+class TestZeroCapacityNodeTechs:
+    @pytest.fixture(scope="class")
+    def model_data(self):
+        return _build_model(OVERRIDES)._model_data
+
+    def test_removed_node_techs(self, model_data):
+        removed = zero_capacity_node_techs(model_data)
+        assert removed.dims == ("nodes", "techs")
+        assert sorted(removed.to_series()[lambda x: x].index) == [
+            ("region1", "ac_transmission:region2"),
+            ("region1", "ccgt"),
+            ("region2", "ac_transmission:region1"),
+            ("region2", "battery"),
+        ]
+
+    def test_keep_one_end_of_link(self, model_data):
+        model_data = model_data.copy()
+        model_data["energy_cap_max"] = model_data.energy_cap_max.copy()
+        model_data.energy_cap_max.loc["region1", "ac_transmission:region2"] = 10
+        removed = zero_capacity_node_techs(model_data)
+        assert not removed.loc["region1", "ac_transmission:region2"]
+        assert not removed.loc["region2", "ac_transmission:region1"]
+        assert removed.loc["region1", "ccgt"]
+
+    @pytest.mark.parametrize(
+        "override",
+        [
+            {"techs.ccgt.constraints.energy_cap_min": 1},
+            {"techs.ccgt.costs.monetary.om_prod": -1},
+            {
+                "nodes.region1.techs.ccgt.switches.force_resource": True,
+                "nodes.region1.techs.ccgt.constraints.resource": 1,
+            },
+        ],
+    )
+    def test_keep_node_tech(self, override):
+        model_data = _build_model(
+            {
+                "model.subset_time": ["2005-01-01", "2005-01-01"],
+                "nodes.region1.techs.ccgt.constraints.energy_cap_max": 0,
+                **override,
+            }
+        )._model_data
+        assert not zero_capacity_node_techs(model_data).loc["region1", "ccgt"]
+
+
+class TestZeroResourceTimesteps:
+    def test_zero_resource_timesteps(self):
+        model_data = _build_model(
+            {
+                "model.subset_time": ["2005-01-01", "2005-01-01"],
+                "techs.ccgt.constraints.resource": 0,
+            }
+        )._model_data
+        zero_resource = zero_resource_timesteps(model_data, model_data.node_tech)
+        assert zero_resource.dims == ("nodes", "techs", "timesteps")
+        assert zero_resource.loc["region1", "ccgt"].all()
+        # supply_plus technologies are not included
+        assert not zero_resource.loc[:, "csp"].any()
+        assert zero_resource.sum() == model_data.timesteps.size
+
+
+class TestPresolveSubsets:
+    @pytest.fixture(scope="class")
+    def model_data(self):
+        return _build_model(OVERRIDES)._model_data
+
+    def test_removed_from_subset(self, model_data):
+        config = model_data.attrs["subsets"]["variables"]["energy_cap"]
+        presolve = Presolve(model_data)
+        subset = create_valid_subset(
+            model_data, "energy_cap", config, MaskCache(presolve)
+        )
+        full_subset = create_valid_subset(model_data, "energy_cap", config)
+        assert ("region1", "ccgt") not in subset
+        assert ("region1", "ccgt") in full_subset
+        assert len(subset) + len(presolve.removed["energy_cap"]) == len(full_subset)
+
+    def test_removed_without_techs(self, model_data):
+        # Nodes left without any technology are also removed from components
+        # that are not indexed over technologies
+        config = model_data.attrs["subsets"]["constraints"]["system_balance"]
+        presolve = Presolve(model_data)
+        presolve.node_tech = model_data.node_tech.where(model_data.nodes != "region1-1")
+        subset = create_valid_subset(
+            model_data, "system_balance", config, MaskCache(presolve)
+        )
+        assert "region1-1" not in subset.get_level_values("nodes")
+        assert "region1-1" in presolve.removed["system_balance"].get_level_values(
+            "nodes"
+        )
+
+
+class TestPresolveModel:
+    @pytest.fixture(scope="class")
+    def models(self):
+        models = {}
+        for presolve in [False, True]:
+            model = _build_model({**OVERRIDES, "run.presolve": presolve})
+            model.run()
+            models[presolve] = model
+        return models
+
+    def test_same_objective(self, models):
+        assert models[True]._model_data.attrs[
+            "objective_function_value"
+        ] == pytest.approx(models[False]._model_data.attrs["objective_function_value"])
+
+    def test_fewer_variables(self, models):
+        backend_model = models[True]._backend_model
+        assert ("region1", "ccgt") not in backend_model.energy_cap
+        assert len(backend_model.carrier_prod) < len(
+            models[False]._backend_model.carrier_prod
+        )
+
+    @pytest.mark.parametrize("var", ["energy_cap", "carrier_prod", "cost"])
+    def test_results_zero(self, models, var):
+        results = models[True].results[var]
+        assert (results.loc[{"nodes": "region1", "techs": "ccgt"}].fillna(0) == 0).all()
+        assert (results.isnull() == models[False].results[var].isnull()).all()
+
+    def test_fixed_zero_resource(self):
+        results = {}
+        for presolve in [False, True]:
+            model = _build_model(
+                {
+                    "model.subset_time": ["2005-01-01", "2005-01-01"],
+                    "techs.ccgt.constraints.resource": 0,
+                    "run.ensure_feasibility": True,
+                    "run.presolve": presolve,
+                }
+            )
+            model.run()
+            results[presolve] = model
+        backend_model = results[True]._backend_model
+        carrier_prod = backend_model.carrier_prod
+        assert all(
+            carrier_prod[idx].fixed
+            for idx in carrier_prod
+            if idx[1:3] == ("region1", "ccgt")
+        )
+        assert not any(
+            i.active
+            for idx, i in backend_model.balance_supply_constraint.items()
+            if idx[:2] == ("region1", "ccgt")
+        )
+        assert results[True]._model_data.attrs[
+            "objective_function_value"
+        ] == pytest.approx(results[False]._model_data.attrs["objective_function_value"])
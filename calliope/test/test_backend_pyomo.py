@@ -1,14 +1,19 @@
 from itertools import product
 import os
 import collections
+import tempfile
 
 
 import pytest  # noqa: F401
 import numpy as np
 import pyomo.core as po
+import xarray as xr
 import logging
 
+import calliope
 import calliope.exceptions as exceptions
+from calliope.backend.pyomo import model as run_pyomo
+from calliope.backend.run import combine_spores_batches
 from calliope.core.attrdict import AttrDict
 from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import (
@@ -58,6 +63,225 @@ class TestModel:
         timestep_0 = "2005-01-01 00:00"
         assert simple_supply._backend_model.timesteps.ord(timestep_0) == 1
 
+    def test_param_values(self, simple_supply):
+        param = simple_supply._backend_model.energy_eff
+        values = param.extract_values_sparse()
+        assert values[("a", "test_supply_elec")] == 0.9
+        assert values[("b", "test_supply_elec")] == 0.9
+        assert param["a", "test_supply_elec"].index() == ("a", "test_supply_elec")
+
+    def test_param_outside_domain(self):
+        m = build_model(
+            {"techs.test_supply_elec.constraints.energy_eff": -1},
+            "simple_supply,two_hours,investment_costs",
+        )
+        with pytest.raises(ValueError) as excinfo:
+            m.run(build_only=True)
+        assert check_error_or_warning(excinfo, "Value not in parameter domain")
+
+
+class TestOperateWindowUpdates:
+    @pytest.fixture(scope="class")
+    def windows(self):
+        m = build_model({}, "simple_supply,investment_costs")
+        model_data = m._model_data
+        timeseries_data_vars = [
+            k
+            for k, v in model_data.data_vars.items()
+            if "timesteps" in v.dims and v.attrs["is_result"] == 0
+        ]
+        first = model_data.isel(timesteps=slice(0, 24))
+        second = model_data.isel(timesteps=slice(24, 48))
+        backend_model = run_pyomo.generate_model(first)
+        changed_params = run_pyomo.update_timeseries_params(
+            backend_model, second[timeseries_data_vars], first[timeseries_data_vars]
+        )
+        return first, second, backend_model, changed_params
+
+    def test_only_changed_values_updated(self, windows):
+        first, second, backend_model, changed_params = windows
+        changed = (
+            first.resource.values != second.resource.values
+        ) & second.resource.notnull().values
+        assert len(changed_params) == changed.sum()
+        assert all(
+            param.parent_component().name == "resource" for param in changed_params
+        )
+
+    def test_same_as_new_model(self, windows):
+        first, second, backend_model, _ = windows
+        new_backend_model = run_pyomo.generate_model(
+            second.assign_coords(timesteps=first.timesteps.values)
+        )
+        lp_files = []
+        with tempfile.TemporaryDirectory() as tempdir:
+            for i, model in enumerate([backend_model, new_backend_model]):
+                path = os.path.join(tempdir, f"{i}.lp")
+                model.write(
+                    path, format="lp", io_options={"symbolic_solver_labels": True}
+                )
+                with open(path, "r") as f:
+                    lp_files.append(f.read())
+        assert lp_files[0] == lp_files[1]
+
+    def test_update_persistent_solver(self, windows):
+        _, _, backend_model, changed_params = windows
+
+        class PersistentSolver:
+            def __init__(self):
+                self.constraints = []
+                self.objective = None
+
+            def remove_constraint(self, constraint):
+                pass
+
+            def add_constraint(self, constraint):
+                self.constraints.append(constraint)
+
+            def set_objective(self, obj):
+                self.objective = obj
+
+        opt = PersistentSolver()
+        run_pyomo.update_persistent_solver(backend_model, opt, changed_params)
+        expected = set(
+            backend_model.balance_demand_constraint[
+                "electricity", param.index()[0], param.index()[1], param.index()[2]
+            ]
+            for param in changed_params
+        )
+        assert set(opt.constraints) == expected
+        assert opt.objective is None
+
+
+class TestSporesBatches:
+    def test_combine_spores_batches(self):
+        batch_results = [
+            xr.Dataset(
+                {"energy_cap": ("spores", [1.0, 2.0])},
+                coords={"spores": [0, 1]},
+                attrs={"termination_condition": "optimal"},
+            ),
+            xr.Dataset(
+                {"energy_cap": ("spores", [3.0, 4.0, 5.0])},
+                coords={"spores": [0, 1, 2]},
+                attrs={"termination_condition": "feasible"},
+            ),
+        ]
+        results = combine_spores_batches(batch_results)
+        assert results.spores.values.tolist() == [0, 1, 2, 3, 4]
+        assert results.spores_batch.values.tolist() == [0, 0, 1, 1, 1]
+        assert results.energy_cap.values.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert results.attrs["termination_condition"] == "feasible"
+
+    def test_combine_spores_batches_infeasible(self):
+        batch_results = [
+            xr.Dataset(coords={"spores": [0]}, attrs={"termination_condition": i})
+            for i in ["optimal", "infeasible"]
+        ]
+        results = combine_spores_batches(batch_results)
+        assert results.attrs["termination_condition"] == "optimal,infeasible"
+
+
+class TestExtractDuals:
+    @pytest.fixture(scope="class")
+    def model(self):
+        m = build_model(
+            {"run.extract_duals": True}, "simple_supply,two_hours,investment_costs"
+        )
+        m.run()
+        return m
+
+    def test_no_duals_by_default(self, simple_supply):
+        assert not hasattr(simple_supply._backend_model, "dual")
+        assert not any(
+            i.startswith(("dual_", "reduced_cost_")) for i in simple_supply.results
+        )
+
+    def test_dual_values(self, model):
+        constraint = model._backend_model.system_balance_constraint
+        duals = model.results.dual_system_balance
+        assert duals.dims == ("carriers", "nodes", "timesteps")
+        assert duals.notnull().sum() == len(constraint)
+        assert sorted(duals.to_series().dropna().values) == sorted(
+            model._backend_model.dual[i] for i in constraint.values()
+        )
+
+    def test_reduced_costs(self, model):
+        reduced_costs = model.results.reduced_cost_energy_cap
+        assert reduced_costs.dims == model.results.energy_cap.dims
+        assert (reduced_costs.notnull() == model.results.energy_cap.notnull()).all()
+
+    def test_duals_saved_to_netcdf(self, model):
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = os.path.join(tempdir, "model.nc")
+            model.to_netcdf(out_path)
+            model_from_disk = calliope.read_netcdf(out_path)
+            xr.testing.assert_allclose(
+                model_from_disk.results.dual_system_balance,
+                model.results.dual_system_balance,
+            )
+
+    class PersistentSolver:
+        """Records the dual values requested from a persistent solver"""
+
+        def __init__(self):
+            self.loaded = []
+
+        def load_duals(self):
+            self.loaded.append("duals")
+
+        def load_rc(self, vars_to_load):
+            self.loaded.append(("rc", len(vars_to_load)))
+
+    def test_load_persistent_duals(self, model):
+        opt = self.PersistentSolver()
+        backend_model = model._backend_model
+        run_pyomo._load_persistent_duals(backend_model, opt)
+        n_variables = len(
+            list(backend_model.component_data_objects(po.Var, active=True))
+        )
+        assert opt.loaded == ["duals", ("rc", n_variables)]
+
+    def test_load_persistent_duals_error_raised(self, model):
+        opt = self.PersistentSolver()
+        opt.load_rc = lambda: None
+        with pytest.raises(TypeError):
+            run_pyomo._load_persistent_duals(model._backend_model, opt)
+
+    def test_load_persistent_duals_milp(self):
+        m = build_model(
+            {"run.extract_duals": True}, "supply_milp,two_hours,investment_costs"
+        )
+        m.run(build_only=True)
+        opt = self.PersistentSolver()
+        run_pyomo._load_persistent_duals(m._backend_model, opt)
+        assert opt.loaded == []
+
+
+class TestIntegerTimesteps:
+    @pytest.fixture(scope="class")
+    def models(self):
+        models = {}
+        for integer_timesteps in [False, True]:
+            m = build_model(
+                {"run.integer_timesteps": integer_timesteps},
+                "simple_supply,two_hours,investment_costs",
+            )
+            m.run()
+            models[integer_timesteps] = m
+        return models
+
+    def test_backend_indexed_over_integers(self, models):
+        assert list(models[True]._backend_model.timesteps) == [0, 1]
+        assert models[True]._backend_model.carrier_prod.index_set().dimen == 4
+        assert all(
+            isinstance(idx[-1], int) for idx in models[True]._backend_model.carrier_prod
+        )
+
+    def test_same_results(self, models):
+        xr.testing.assert_allclose(models[True].results, models[False].results)
+        assert models[True].inputs.timesteps.equals(models[False].inputs.timesteps)
+
 
 @pytest.mark.xfail(reason="Not expecting operate mode to work at the moment")
 class TestChecks:
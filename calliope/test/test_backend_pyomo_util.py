@@ -1,9 +1,29 @@
+import gc
+import weakref
+
 import pytest  # noqa: F401
 
+import numpy as np
+import pandas as pd
 import pyomo.core as po
+import xarray as xr
+
+import calliope
 
 from calliope.test.common.util import build_test_model as build_model
-from calliope.backend.pyomo.util import get_domain, get_param, invalid
+from calliope.core.util.dataset import reorganise_xarray_dimensions
+from calliope.backend.pyomo.util import (
+    datetime_to_integer,
+    get_component_values,
+    get_domain,
+    get_param,
+    get_param_values,
+    get_sparsity_index,
+    get_var,
+    invalid,
+    string_to_datetime,
+    symbolic_labeler,
+)
 
 
 class TestGetParam:
@@ -76,6 +96,158 @@ class TestGetParam:
         """
         assert get_param(simple_supply._backend_model, "random_param", dim) is None
 
+    def test_get_param_same_object(self, simple_supply):
+        """
+        Values taken from the Param default are added to the lookup table, so
+        the same mutable object is returned on every call
+        """
+        backend_model = simple_supply._backend_model
+        dims = ("a", "test_demand_elec")
+        param = get_param(backend_model, "energy_cap_max", dims)
+        assert po.value(param) == np.inf  # see defaults.yaml
+        assert param is get_param(backend_model, "energy_cap_max", dims)
+        assert param is backend_model.energy_cap_max[dims]
+
+    def test_get_param_updated_value(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        dims = ("a", "test_supply_elec")
+        param = get_param(backend_model, "energy_eff", dims + ("2005-01-01 00:00",))
+        initial_value = po.value(param)
+        simple_supply.backend.update_param("energy_eff", {dims: 0.5})
+        assert po.value(param) == 0.5
+        assert po.value(get_param(backend_model, "energy_eff", dims)) == 0.5
+        simple_supply.backend.update_param("energy_eff", {dims: initial_value})
+
+    def test_backend_model_released(self):
+        """
+        Parameter lookups and other values found while building are kept on
+        the backend model, so nothing holds on to it once the model is deleted
+        """
+        model = build_model({}, "simple_supply,two_hours,investment_costs")
+        model.run()
+        backend_model = weakref.ref(model._backend_model)
+        del model
+        gc.collect()
+        assert backend_model() is None
+
+
+class TestGetParamValues:
+    def test_one_dim(self):
+        da = xr.DataArray(
+            [1.0, np.nan, np.inf], coords={"techs": ["a", "b", "c"]}, dims="techs"
+        )
+        assert get_param_values(da) == {"a": 1.0}
+
+    def test_many_dims(self):
+        da = xr.DataArray(
+            [[1, -np.inf], [np.nan, 2]],
+            coords={"nodes": ["a", "b"], "techs": ["x", "y"]},
+            dims=("nodes", "techs"),
+        )
+        assert get_param_values(da) == {("a", "x"): 1.0, ("b", "y"): 2.0}
+
+    def test_object_dtype(self):
+        da = xr.DataArray(
+            np.array(["foo", np.nan, np.inf], dtype=object),
+            coords={"techs": ["a", "b", "c"]},
+            dims="techs",
+        )
+        assert get_param_values(da) == {"a": "foo"}
+
+    def test_same_as_series(self, simple_supply):
+        for var in ["resource", "energy_eff", "name", "force_resource"]:
+            da = simple_supply.inputs[var]
+            with pd.option_context("mode.use_inf_as_na", True):
+                expected = da.to_series().dropna().to_dict()
+            assert get_param_values(da) == expected
+
+
+class TestGetComponentValues:
+    @pytest.fixture
+    def backend_model(self):
+        backend_model = po.ConcreteModel()
+        backend_model.var = po.Var(["a", "b", "c"])
+        backend_model.var["a"].value = 1
+        backend_model.var["c"].value = 3
+        backend_model.expr = po.Expression(
+            ["a", "c"], rule=lambda m, i: 2 * m.var[i] + 1
+        )
+        return backend_model
+
+    def test_var_values(self, backend_model):
+        values = get_component_values(backend_model.var)
+        np.testing.assert_array_equal(values, [1, np.nan, 3])
+
+    def test_expression_values(self, backend_model):
+        values = get_component_values(backend_model.expr, expr=True)
+        np.testing.assert_array_equal(values, [3, 7])
+
+    @pytest.mark.parametrize(
+        ("var", "expr"),
+        [("energy_cap", False), ("carrier_prod", False), ("cost", True)],
+    )
+    def test_results_same_as_get_var(self, simple_supply, var, expr):
+        backend_model = simple_supply._backend_model
+        dims = getattr(backend_model, "__calliope_subsets")[var].names
+        expected = reorganise_xarray_dimensions(
+            get_var(backend_model, var, dims=dims, expr=expr)
+        )
+        result = simple_supply.results[var]
+        assert result.dims == expected.dims
+        np.testing.assert_array_equal(result.values, expected.values)
+
+
+class TestDatetimeToInteger:
+    @pytest.fixture
+    def model_data(self):
+        timesteps = pd.date_range("2005-01-01", periods=4, freq="H")
+        return xr.Dataset(
+            {
+                "lookup": ("timesteps", timesteps[[1, 1, 3, 0]]),
+                "partial": ("timesteps", [timesteps[2], pd.NaT, pd.NaT, pd.NaT]),
+                "foo": ("timesteps", [1.0, 2.0, 3.0, 4.0]),
+            },
+            coords={"timesteps": timesteps},
+        )
+
+    def test_integer_codes(self, model_data):
+        coded = datetime_to_integer(po.ConcreteModel(), model_data.copy())
+        np.testing.assert_array_equal(coded.timesteps.values, [0, 1, 2, 3])
+        np.testing.assert_array_equal(coded.lookup.values, [1, 1, 3, 0])
+        assert coded.partial.values[0] == 2
+        assert pd.isnull(coded.partial.values[1:]).all()
+        assert coded.foo.equals(model_data.foo.assign_coords(timesteps=range(4)))
+
+    def test_round_trip(self, model_data):
+        backend_model = po.ConcreteModel()
+        coded = datetime_to_integer(backend_model, model_data.copy())
+        assert string_to_datetime(backend_model, coded).equals(model_data)
+
+    def test_values_not_in_coords(self, model_data):
+        model_data["lookup"] = model_data.lookup + pd.Timedelta("1D")
+        with pytest.raises(calliope.exceptions.BackendError):
+            datetime_to_integer(po.ConcreteModel(), model_data)
+
+
+class TestSymbolicLabeler:
+    def test_no_integer_timesteps(self, simple_supply):
+        assert symbolic_labeler(simple_supply._backend_model) is None
+
+    def test_timestep_labels(self):
+        model = build_model(
+            {"run.integer_timesteps": True}, "simple_supply,two_hours,investment_costs"
+        )
+        model.run(build_only=True)
+        backend_model = model._backend_model
+        labeler = symbolic_labeler(backend_model)
+        assert labeler(
+            backend_model.carrier_prod[("electricity", "b", "test_supply_elec", 0)]
+        ) == ("carrier_prod(electricity_b_test_supply_elec__2005_01_01_00_00_)")
+        assert labeler(backend_model.energy_cap[("b", "test_supply_elec")]) == (
+            "energy_cap(b_test_supply_elec)"
+        )
+        assert labeler(backend_model.obj) == "obj"
+
 
 class TestGetDomain:
     @pytest.mark.parametrize(
@@ -92,6 +264,45 @@ class TestGetDomain:
         assert get_domain(simple_supply._model_data[var]) == domain
 
 
+class TestGetSparsityIndex:
+    def test_sum_over_one_dim(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        timestep = backend_model.timesteps[1]
+        sparsity_index = get_sparsity_index(backend_model, "carrier_prod", "techs")
+        assert sparsity_index[("electricity", "a", timestep)] == [
+            ("electricity", "a", tech, timestep)
+            for tech in ["test_supply_elec", "test_transmission_elec:b"]
+        ]
+        assert all(len(key) == 3 for key in sparsity_index.keys())
+
+    def test_sum_over_many_dims(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        sparsity_index = get_sparsity_index(backend_model, "cost", ("nodes", "techs"))
+        assert list(sparsity_index.keys()) == ["monetary"]
+        assert set(sparsity_index["monetary"]) == set(backend_model.cost.index_set())
+
+    def test_sum_over_all_dims(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        sparsity_index = get_sparsity_index(
+            backend_model, "energy_cap", ("nodes", "techs")
+        )
+        assert set(sparsity_index[()]) == set(backend_model.energy_cap.index_set())
+
+    def test_missing_component(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        assert get_sparsity_index(backend_model, "unmet_demand", "timesteps") == {}
+
+    def test_stored_on_model(self, simple_supply):
+        backend_model = simple_supply._backend_model
+        sparsity_index = get_sparsity_index(backend_model, "carrier_prod", "techs")
+        assert get_sparsity_index(backend_model, "carrier_prod", "techs") is (
+            sparsity_index
+        )
+        # Kept on the model, rather than in a cache holding on to the model
+        sparsity_indices = getattr(backend_model, "__calliope_sparsity_index")
+        assert sparsity_indices[("carrier_prod", ("techs",))] is sparsity_index
+
+
 class TestInvalid:
     def test_invalid(self):
         pyomo_model = po.ConcreteModel()
@@ -0,0 +1,221 @@
+import os
+import tempfile
+
+import pytest  # noqa: F401
+import numpy as np
+
+import calliope
+from calliope.backend import build_cache
+from calliope.backend.sparse import CachedSparseModel, SparseModel, get_sparse_model
+from calliope.test.common.util import build_test_model as build_model
+from calliope.test.common.util import check_error_or_warning
+
+
+def _read_lp(model, path):
+    model.to_lp(path)
+    with open(path, "r") as f:
+        # The first line is a comment naming the tool that wrote the file
+        return f.readlines()[1:]
+
+
+class TestSparseModel:
+    @pytest.fixture(scope="class")
+    def sparse_model(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        return SparseModel(m._model_data)
+
+    def test_variable_bounds(self, sparse_model):
+        lb, ub, var_types = sparse_model.variable_bounds()
+        labels = sparse_model.variable_labels.tolist()
+        energy_cap = labels.index("energy_cap(a_test_supply_elec)")
+        assert lb[energy_cap] == 0
+        assert ub[energy_cap] == 10
+        assert np.isnan(ub[labels.index("energy_cap(a_test_demand_elec)")])
+        assert (var_types == "continuous").all()
+
+    def test_to_arrays(self, sparse_model):
+        arrays = sparse_model.to_arrays()
+        assert arrays["A"].shape == (
+            len(arrays["row_labels"]),
+            sparse_model.n_variables,
+        )
+        assert len(arrays["c"]) == sparse_model.n_variables
+        assert arrays["sense"] == "minimize"
+        assert (arrays["row_lower"] <= arrays["row_upper"]).all()
+        assert (arrays["lb"] <= arrays["ub"]).all()
+
+    def test_model_data_unchanged(self, sparse_model):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        SparseModel(m._model_data)
+        assert m._model_data.timesteps.dtype.kind == "M"
+
+    def test_operate_mode(self):
+        m = build_model({}, "simple_supply,operate,investment_costs")
+        with pytest.raises(calliope.exceptions.BackendError) as excinfo:
+            SparseModel(m._model_data)
+        assert check_error_or_warning(excinfo, "not available in operate mode")
+
+
+class TestSparseBackend:
+    def test_run_not_available(self):
+        m = build_model(
+            {"run.backend": "sparse"}, "simple_supply,two_hours,investment_costs"
+        )
+        with pytest.raises(calliope.exceptions.BackendError) as excinfo:
+            m.run()
+        assert check_error_or_warning(excinfo, "can only write models to file")
+
+    def test_save_mps(self):
+        m = build_model(
+            {"run.backend": "sparse"}, "supply_milp,two_hours,investment_costs"
+        )
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = os.path.join(tempdir, "model.mps")
+            m.to_mps(out_path)
+            with open(out_path, "r") as f:
+                mps = f.read()
+        for section in ["ROWS", "COLUMNS", "RHS", "BOUNDS", "ENDATA"]:
+            assert f"\n{section}\n" in mps
+        assert " E  c_e_" not in mps
+        assert (
+            " E  system_balance_constraint(electricity_a__2005_01_01_00_00_)\n" in mps
+        )
+        assert "'MARKER' 'INTORG'" in mps
+        assert " UP BND units(a_test_supply_elec) 1\n" in mps
+
+    def test_save_mps_pyomo_backend(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        with pytest.raises(IOError) as excinfo:
+            m.to_mps("model.mps")
+        assert check_error_or_warning(excinfo, "Only the sparse backend")
+
+    @pytest.mark.filterwarnings("ignore:(?s).*Integer:calliope.exceptions.ModelWarning")
+    @pytest.mark.parametrize(
+        "example", ["national_scale", "time_clustering", "urban_scale", "milp"]
+    )
+    def test_identical_lp_files(self, example):
+        lp_files = {}
+        with tempfile.TemporaryDirectory() as tempdir:
+            for backend in ["pyomo", "sparse"]:
+                m = getattr(calliope.examples, example)(
+                    override_dict={"run.backend": backend}
+                )
+                lp_files[backend] = _read_lp(m, os.path.join(tempdir, f"{backend}.lp"))
+        assert lp_files["pyomo"] == lp_files["sparse"]
+
+    @pytest.mark.parametrize(
+        ("override", "scenario"),
+        [
+            ({}, "conversion_and_conversion_plus,two_hours,investment_costs"),
+            (
+                {"run.ensure_feasibility": True},
+                "supply_export,two_hours,investment_costs",
+            ),
+            ({}, "storage_milp,two_hours,investment_costs"),
+            (
+                {
+                    "model.subset_time": ["2005-01-01", "2005-01-04"],
+                    "model.time": {
+                        "function": "apply_clustering",
+                        "function_options": {
+                            "clustering_func": "file=cluster_days.csv:a",
+                            "how": "mean",
+                            "storage_inter_cluster": True,
+                        },
+                    },
+                    "run.cyclic_storage": False,
+                },
+                "simple_storage,investment_costs",
+            ),
+        ],
+    )
+    def test_identical_lp_files_test_model(self, override, scenario):
+        lp_files = {}
+        with tempfile.TemporaryDirectory() as tempdir:
+            for backend in ["pyomo", "sparse"]:
+                m = build_model({**override, "run.backend": backend}, scenario)
+                lp_files[backend] = _read_lp(m, os.path.join(tempdir, f"{backend}.lp"))
+        assert lp_files["pyomo"] == lp_files["sparse"]
+
+
+class TestBuildCache:
+    @pytest.fixture
+    def model_data(self):
+        m = build_model(
+            {"run.backend": "sparse"}, "simple_supply,two_hours,investment_costs"
+        )
+        return m._model_data
+
+    def test_hash_stable(self, model_data):
+        assert build_cache.model_data_hash(model_data) == build_cache.model_data_hash(
+            model_data.copy(deep=True)
+        )
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda x: x.assign(energy_cap_max=x.energy_cap_max * 2),
+            lambda x: x.assign_coords(nodes=["c", "d"]),
+            lambda x: x.assign_attrs(
+                run_config={**x.attrs["run_config"], "ensure_feasibility": True}
+            ),
+        ],
+    )
+    def test_hash_changes(self, model_data, change):
+        assert build_cache.model_data_hash(
+            change(model_data)
+        ) != build_cache.model_data_hash(model_data)
+
+    def test_hash_ignores_solver(self, model_data):
+        changed = model_data.assign_attrs(
+            run_config={**model_data.attrs["run_config"], "solver": "gurobi"}
+        )
+        assert build_cache.model_data_hash(changed) == build_cache.model_data_hash(
+            model_data
+        )
+
+    def test_hash_changes_with_math(self, model_data, monkeypatch, tmpdir):
+        math_module = tmpdir.join("constraints.py")
+        monkeypatch.setattr(build_cache, "_MATH_MODULES", [str(math_module)])
+        math_module.write("x = 1")
+        initial_hash = build_cache.model_data_hash(model_data)
+        math_module.write("x = 2")
+        assert build_cache.model_data_hash(model_data) != initial_hash
+
+    def test_cached_model(self, model_data, tmpdir):
+        model_data.attrs["run_config"]["build_cache_path"] = str(tmpdir)
+        sparse_model = get_sparse_model(model_data)
+        assert isinstance(sparse_model, CachedSparseModel)
+        assert len(os.listdir(tmpdir)) == 1
+
+        cached = get_sparse_model(model_data)
+        expected = SparseModel(model_data).to_arrays()
+        arrays = cached.to_arrays()
+        assert (arrays["A"] != expected["A"]).nnz == 0
+        for key in ["row_lower", "row_upper", "c", "lb", "ub", "integrality"]:
+            np.testing.assert_array_equal(arrays[key], expected[key])
+        for key in ["row_labels", "column_labels"]:
+            assert arrays[key].tolist() == expected[key].tolist()
+
+    def test_identical_lp_files(self, tmpdir):
+        lp_files = []
+        for override in [{}, {"run.build_cache_path": str(tmpdir.join("cache"))}]:
+            m = build_model(
+                {"run.backend": "sparse", **override},
+                "simple_supply,two_hours,investment_costs",
+            )
+            lp_files.append(_read_lp(m, str(tmpdir.join("model.lp"))))
+            lp_files.append(_read_lp(m, str(tmpdir.join("model.lp"))))
+        assert all(lp_file == lp_files[0] for lp_file in lp_files)
+
+    def test_least_recently_used_removed(self, tmpdir):
+        arrays = {"foo": np.zeros(125000)}  # 1 MB
+        for key in ["a", "b", "c"]:
+            build_cache.write_cached_build(str(tmpdir), key, arrays, max_size=3.5)
+            os.utime(tmpdir.join(f"{key}.npz"), ns=(0, len(os.listdir(tmpdir))))
+        assert sorted(os.listdir(tmpdir)) == ["a.npz", "b.npz", "c.npz"]
+
+        assert build_cache.read_cached_build(str(tmpdir), "a") is not None
+        build_cache.write_cached_build(str(tmpdir), "d", arrays, max_size=3.5)
+        assert sorted(os.listdir(tmpdir)) == ["a.npz", "c.npz", "d.npz"]
+        assert build_cache.read_cached_build(str(tmpdir), "b") is None
@@ -7,10 +7,12 @@ import pandas as pd
 
 import calliope
 from calliope.backend.subsets import (
+    MaskCache,
     create_valid_subset,
     _inheritance,
     _get_valid_subset,
     _subset_imask,
+    positions_to_index,
     _imask_foreach,
     VALID_HELPER_FUNCTIONS,
 )
@@ -117,6 +119,40 @@ class TestSubsets:
         assert len(idx) == imask.sum()
         assert all(imask.loc[i] == 1 for i in idx)  # 1 represents boolean True here
 
+    @pytest.mark.parametrize(
+        "foreach", (["techs"], ["nodes", "techs"], ["nodes", "techs", "carriers"])
+    )
+    def test_get_valid_subset_same_as_stacked(self, model_data, foreach):
+        imask = _imask_foreach(model_data, foreach)
+        idx = _get_valid_subset(imask)
+        if len(foreach) == 1:
+            expected = imask[imask].coords.to_index()
+        else:
+            stacked = imask.stack(dim_0=imask.dims)
+            expected = stacked[stacked].coords.to_index()
+        assert idx.equals(expected)
+        assert list(idx.names) == list(expected.names)
+
+    def test_positions_to_index(self, model_data):
+        idx = positions_to_index(
+            model_data.coords,
+            {"techs": np.array([1, 0]), "nodes": np.array([0, 0])},
+        )
+        assert isinstance(idx, pd.MultiIndex)
+        assert idx.names == ["techs", "nodes"]
+        assert list(idx) == [
+            (model_data.techs.item(1), model_data.nodes.item(0)),
+            (model_data.techs.item(0), model_data.nodes.item(0)),
+        ]
+        # levels are the full coordinates
+        assert idx.levels[0].equals(model_data.techs.to_index())
+
+    def test_positions_to_index_one_dim(self, model_data):
+        idx = positions_to_index(model_data.coords, {"techs": np.array([1])})
+        assert not isinstance(idx, pd.MultiIndex)
+        assert idx.name == "techs"
+        assert list(idx) == [model_data.techs.item(1)]
+
     def test_subset_imask_no_squeeze(self, model_data, imask_subset_config):
         """
         Subset on nodes
@@ -182,3 +218,39 @@ class TestSubsets:
                 assert len(
                     constraint_sets[f"{model_name}.{object_type}.{name}"]
                 ) == len(subset)
+
+    def test_mask_cache(self, model_data):
+        mask_cache = MaskCache()
+        calls = []
+
+        def _create():
+            calls.append(1)
+            return model_data.carrier.notnull()
+
+        mask = mask_cache.get(("foo",), _create)
+        assert mask.equals(model_data.carrier.notnull())
+        assert mask.dtype == bool
+
+        # Each lookup returns a new copy of the mask
+        mask.loc[{"techs": "foo"}] = False
+        cached_mask = mask_cache.get(("foo",), _create)
+        assert cached_mask.equals(model_data.carrier.notnull())
+        assert len(calls) == 1
+
+        assert mask_cache.get(("bar",), lambda: False) is False
+        assert len(mask_cache) == 2
+
+    def test_create_valid_subset_mask_cache(self):
+        model = calliope.examples.national_scale()
+        mask_cache = MaskCache()
+        for object_type in ["variables", "constraints", "expressions"]:
+            for name, config in subsets_config[object_type].items():
+                subset = create_valid_subset(model._model_data, name, config)
+                cached_subset = create_valid_subset(
+                    model._model_data, name, config, mask_cache
+                )
+                if subset is None:
+                    assert cached_subset is None
+                else:
+                    assert subset.equals(cached_subset)
+        assert ("data_var", "energy_cap_max") in mask_cache
@@ -0,0 +1,102 @@
+import os
+import tempfile
+
+import pytest  # noqa: F401
+import numpy as np
+import xarray as xr
+import pyomo.core as po
+
+import calliope
+from calliope.backend.linear import LinearArray
+from calliope.test.common.util import build_test_model as build_model
+
+
+class TestLinearArray:
+    def test_to_csr_merges_repeated_variables(self):
+        linear_array = LinearArray(
+            2,
+            np.array([1, 0, 1, 0]),
+            np.array([3, 2, 3, 5]),
+            np.array([1.0, 2.0, -0.5, 4.0]),
+        )
+        indptr, ids, coefs = linear_array.to_csr()
+        assert indptr.tolist() == [0, 2, 3]
+        assert ids.tolist() == [2, 5, 3]
+        assert coefs.tolist() == [2.0, 4.0, 0.5]
+
+    def test_to_csr_drops_zero_coefficients(self):
+        linear_array = LinearArray(
+            2, np.array([0, 0, 1]), np.array([1, 2, 1]), np.array([0.0, 1.0, 0.0])
+        )
+        indptr, ids, coefs = linear_array.to_csr()
+        assert indptr.tolist() == [0, 1, 1]
+        assert ids.tolist() == [2]
+        assert linear_array.has_variables.tolist() == [True, True]
+
+    def test_where(self):
+        linear_array = LinearArray(
+            2, np.array([0, 1]), np.array([1, 2]), np.array([1.0, 1.0]), np.ones(2)
+        ) * np.array([2.0, 3.0])
+        selected = linear_array.where(np.array([False, True]))
+        assert selected.rows.tolist() == [1]
+        assert selected.coefs.tolist() == [3.0]
+        assert selected.constant.tolist() == [0.0, 3.0]
+
+
+class TestVectorisedConstraints:
+    def test_vectorised_constraints_built(self):
+        m = build_model(
+            {"run.backend": "pyomo_vectorised"},
+            "simple_supply,two_hours,investment_costs",
+        )
+        m.run(build_only=True)
+        constraint = m._backend_model.system_balance_constraint
+        assert len(constraint) > 0
+        assert all(i.equality for i in constraint.values())
+
+    def test_required_resource_expression(self):
+        models = {
+            backend: build_model(
+                {"run.backend": backend}, "simple_supply,two_hours,investment_costs"
+            )
+            for backend in ["pyomo", "pyomo_vectorised"]
+        }
+        required_resource = {}
+        for backend, m in models.items():
+            m.run(build_only=True)
+            required_resource[backend] = {
+                k: po.value(v) for k, v in m._backend_model.required_resource.items()
+            }
+        assert required_resource["pyomo"] == required_resource["pyomo_vectorised"]
+
+    def test_required_resource_results(self):
+        results = {}
+        for backend in ["pyomo", "pyomo_vectorised"]:
+            m = build_model(
+                {"run.backend": backend}, "simple_supply,two_hours,investment_costs"
+            )
+            m.run()
+            results[backend] = m.results
+        # Evaluated from the variable values, rather than from each expression
+        assert results["pyomo_vectorised"].required_resource.notnull().any()
+        xr.testing.assert_allclose(
+            results["pyomo"].required_resource,
+            results["pyomo_vectorised"].required_resource,
+        )
+
+    @pytest.mark.filterwarnings("ignore:(?s).*Integer:calliope.exceptions.ModelWarning")
+    @pytest.mark.parametrize(
+        "example", ["national_scale", "time_clustering", "urban_scale", "milp"]
+    )
+    def test_identical_lp_files(self, example):
+        lp_files = {}
+        with tempfile.TemporaryDirectory() as tempdir:
+            for backend in ["pyomo", "pyomo_vectorised"]:
+                m = getattr(calliope.examples, example)(
+                    override_dict={"run.backend": backend}
+                )
+                out_path = os.path.join(tempdir, f"{backend}.lp")
+                m.to_lp(out_path)
+                with open(out_path, "r") as f:
+                    lp_files[backend] = f.read()
+        assert lp_files["pyomo"] == lp_files["pyomo_vectorised"]
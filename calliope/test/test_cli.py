@@ -1,6 +1,7 @@
 import os
 import tempfile
 
+import pandas as pd
 import pytest  # noqa: F401
 from click.testing import CliRunner
 
@@ -187,6 +188,33 @@ class TestCLI:
             assert os.path.isfile(os.path.join(tempdir, "test.sh"))
             assert os.path.isfile(os.path.join(tempdir, "test.sh.array.sh"))
 
+    def test_run_scenarios(self):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem() as tempdir:
+            result = runner.invoke(
+                cli.run_scenarios,
+                [
+                    _MODEL_NATIONAL,
+                    "results",
+                    "--scenarios=time_resampling;time_resampling,reserve_margin",
+                    "--processes=2",
+                    "--solver_threads=1",
+                ],
+            )
+            assert result.exit_code == 0
+            for out_file in [
+                "out_1_time_resampling.nc",
+                "out_2_time_resampling,reserve_margin.nc",
+                "summary.csv",
+            ]:
+                assert os.path.isfile(os.path.join(tempdir, "results", out_file))
+            summary = pd.read_csv(
+                os.path.join(tempdir, "results", "summary.csv"), index_col=0
+            )
+            assert (summary.termination_condition == "optimal").all()
+            assert summary.error.isnull().all()
+
     def test_debug(self):
         runner = CliRunner()
         result = runner.invoke(cli.run, ["foo.yaml", "--debug"])
@@ -66,3 +66,80 @@ class TestModel:
             excinfo,
             "Attempted to add dictionary property `baz` to model, but received argument of type `str`",
         )
+
+
+class TestDeriveModel:
+    @pytest.fixture(scope="class")
+    def base_model(self):
+        return calliope.examples.national_scale(
+            override_dict={"model.subset_time": ["2005-01-01", "2005-01-02"]}
+        )
+
+    @pytest.mark.parametrize(
+        ("override_dict", "param_updates"),
+        [
+            ({"techs.ccgt.costs.monetary.energy_cap": 800}, ["cost_energy_cap"]),
+            (
+                {"nodes.region1.techs.ccgt.constraints.energy_cap_max": 100},
+                ["energy_cap_max"],
+            ),
+            (
+                {"techs.ccgt.constraints.lifetime": 30},
+                ["lifetime", "cost_depreciation_rate"],
+            ),
+            ({"run.solver": "glpk"}, []),
+            ({"techs.ccgt.costs.monetary.om_annual": 5}, None),
+            ({"model.subset_time": ["2005-01-01", "2005-01-03"]}, None),
+        ],
+    )
+    def test_derive_equals_full_build(self, base_model, override_dict, param_updates):
+        derived = base_model.derive(override_dict=override_dict)
+        updates = calliope.preprocess.model_data.get_param_updates(
+            base_model._model_run, derived._model_run, base_model._model_data
+        )
+        if param_updates is None:
+            assert updates is None
+        else:
+            assert sorted(updates.keys()) == sorted(param_updates)
+
+        full = calliope.examples.national_scale(
+            override_dict={
+                "model.subset_time": ["2005-01-01", "2005-01-02"],
+                **override_dict,
+            }
+        )
+        assert derived._model_data.equals(full._model_data)
+        assert derived._model_data_pre_clustering.equals(
+            full._model_data_pre_clustering
+        )
+        for var_name, var in full._model_data.data_vars.items():
+            assert derived._model_data[var_name].dtype == var.dtype
+        assert derived.run_config == full.run_config
+        assert derived._model_data.attrs["applied_overrides"] == ""
+
+    def test_derive_reuses_timeseries(self, base_model):
+        derived = base_model.derive(scenario="reserve_margin")
+        assert (
+            derived._model_run.timeseries_data is base_model._model_run.timeseries_data
+        )
+        assert derived._model_data.attrs["applied_overrides"] == "reserve_margin"
+
+    def test_derive_does_not_change_base(self, base_model):
+        original = base_model._model_data.copy(deep=True)
+        derived = base_model.derive(
+            override_dict={"techs.ccgt.costs.monetary.energy_cap": 800}
+        )
+        derived.run()
+        assert base_model._model_data.equals(original)
+        assert not hasattr(base_model, "results")
+
+    def test_derive_from_netcdf(self, base_model):
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = os.path.join(tempdir, "model.nc")
+            base_model.to_netcdf(out_path)
+            model = calliope.read_netcdf(out_path)
+        with pytest.raises(calliope.exceptions.ModelError) as excinfo:
+            model.derive(scenario="reserve_margin")
+        assert check_error_or_warning(
+            excinfo, "Can only derive new models from a model built"
+        )
@@ -1,6 +1,7 @@
 import pytest
 from pytest import approx
 import os
+import shutil
 
 import pandas as pd
 import numpy as np
@@ -8,7 +9,7 @@ import numpy as np
 import calliope
 import calliope.exceptions as exceptions
 from calliope.core.attrdict import AttrDict
-from calliope.preprocess import time
+from calliope.preprocess import model_run, time
 
 from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import defaults, check_error_or_warning
@@ -660,6 +661,25 @@ class TestChecks:
             excinfo, "`run.spores_options.score_cost_class` must be a string"
         )
 
+    @pytest.mark.parametrize(
+        ("batches", "error"),
+        [
+            ({"slack": 0.1}, "must be a list of dictionaries"),
+            ([0.1, 0.2], "must be a list of dictionaries"),
+            ([{"slack": 0.1}, {"processes": 2}], "can only update the spores options"),
+        ],
+    )
+    def test_invalid_spores_batches(self, batches, error):
+        """
+        Check that batches of SPORES are a list of updates to spores options
+        """
+        override = {"run.spores_options.batches": batches}
+
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            build_model(scenario="spores,simple_supply", override_dict=override)
+
+        assert check_error_or_warning(excinfo, error)
+
     @pytest.mark.parametrize(
         "invalid_key", [("monetary"), ("emissions"), ("name"), ("anything_else_really")]
     )
@@ -1691,3 +1711,65 @@ class TestTime:
             0.096755
         )
         assert model.inputs.resource.loc[("region1-3", "csp")].values[8] == approx(0.0)
+
+    def test_preloaded_timeseries_files(self, monkeypatch):
+        """
+        Timeseries files read in advance should be used in place of the files
+        on disk, unless the files on disk have since been modified.
+        """
+        monkeypatch.setattr(model_run, "_PRELOADED_TIMESERIES_FILES", {})
+        file_path = os.path.join(
+            calliope.examples._PATHS["national_scale"],
+            "timeseries_data",
+            "demand-1.csv",
+        )
+        mtime, df = model_run.read_timeseries_file(file_path)
+        df["demand"] = -1
+        model_run.preload_timeseries_files({file_path: (mtime, df)})
+
+        model = calliope.examples.national_scale()
+        assert (
+            model.inputs.resource.loc[("region1", "demand_power")].values == -1
+        ).all()
+
+        model_run.preload_timeseries_files({file_path: (mtime - 1, df)})
+        model = calliope.examples.national_scale()
+        assert model.inputs.resource.loc[("region1", "demand_power")].values[
+            0
+        ] == approx(-25284.48)
+
+    def test_timeseries_cache(self, tmpdir):
+        """
+        Timeseries files should be cached, giving identical model data when
+        loaded from the cache, and cached again once they are modified.
+        """
+        model_dir = os.path.join(tmpdir, "model")
+        shutil.copytree(calliope.examples._PATHS["national_scale"], model_dir)
+        model_file = os.path.join(model_dir, "model.yaml")
+        cache_path = os.path.join(model_dir, "cache")
+        override_dict = {
+            "model.subset_time": ["2005-01-01", "2005-01-02"],
+            "model.timeseries_cache_path": cache_path,
+        }
+
+        uncached = calliope.Model(
+            model_file,
+            override_dict={"model.subset_time": ["2005-01-01", "2005-01-02"]},
+        )
+        calliope.Model(model_file, override_dict=override_dict)
+        assert len(os.listdir(cache_path)) == 9  # 3 files per timeseries file
+        cached = calliope.Model(model_file, override_dict=override_dict)
+        assert cached._model_data.equals(uncached._model_data)
+        assert cached._model_run.timeseries_data.equals(
+            uncached._model_run.timeseries_data
+        )
+
+        demand_file = os.path.join(model_dir, "timeseries_data", "demand-1.csv")
+        demand = pd.read_csv(demand_file, index_col=0)
+        demand["demand"] = -1
+        demand.to_csv(demand_file)
+        updated = calliope.Model(model_file, override_dict=override_dict)
+        assert (
+            updated.inputs.resource.loc[("region1", "demand_power")].values == -1
+        ).all()
+        assert len(os.listdir(cache_path)) == 9
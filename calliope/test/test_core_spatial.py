@@ -0,0 +1,241 @@
+import numpy as np
+import pytest  # noqa: F401
+
+import calliope
+from calliope import exceptions
+from calliope.spatial import funcs
+from calliope.test.common.util import check_error_or_warning
+
+
+REGIONS = {"region1": ["region1", "region1-1", "region1-2", "region1-3"]}
+
+
+class TestAggregation:
+    @pytest.fixture(scope="class")
+    def model_national(self):
+        return calliope.examples.national_scale(
+            override_dict={
+                "model.random_seed": 23,
+                "model.subset_time": ["2005-01-01", "2005-01-05"],
+            }
+        )
+
+    def test_aggregate_nodes(self, model_national):
+        data = model_national._model_data
+        data_aggregated = funcs.aggregate_nodes(data, REGIONS)
+
+        assert list(data_aggregated.nodes.values) == ["region1", "region2"]
+        assert data_aggregated.lookup_original_node_region.to_series().to_dict() == {
+            "region1": "region1",
+            "region1-1": "region1",
+            "region1-2": "region1",
+            "region1-3": "region1",
+            "region2": "region2",
+        }
+        assert data_aggregated.node_tech.sum() < data.node_tech.sum()
+
+    def test_aggregate_links(self, model_national):
+        data = model_national._model_data
+        data_aggregated = funcs.aggregate_nodes(data, REGIONS)
+
+        link_techs = [tech for tech in data_aggregated.techs.values if ":" in tech]
+        assert sorted(link_techs) == [
+            "ac_transmission:region1",
+            "ac_transmission:region2",
+        ]
+        assert (
+            data_aggregated.link_remote_nodes.loc["region1", "ac_transmission:region2"]
+            == "region2"
+        )
+        assert (
+            data_aggregated.link_remote_techs.loc["region2", "ac_transmission:region1"]
+            == "ac_transmission:region2"
+        )
+
+    def test_aggregate_sums(self, model_national):
+        data = model_national._model_data
+        data_aggregated = funcs.aggregate_nodes(data, REGIONS)
+
+        assert np.isclose(
+            data_aggregated.energy_cap_max.loc["region1", "csp"],
+            data.energy_cap_max.loc[list(REGIONS["region1"]), "csp"].sum(),
+        )
+        assert np.isclose(
+            data_aggregated.resource.loc[:, "demand_power"].sum(),
+            data.resource.loc[:, "demand_power"].sum(),
+        )
+        share = data_aggregated.original_node_share.groupby(
+            data_aggregated.lookup_original_node_region
+        ).sum("original_nodes")
+        assert np.allclose(share.where(share > 0, drop=True).fillna(1), 1)
+
+    def test_aggregate_unchanged(self, model_national):
+        data = model_national._model_data
+        data_aggregated = funcs.aggregate_nodes(data, {})
+
+        assert data_aggregated.nodes.equals(data.nodes)
+        assert np.allclose(
+            data_aggregated.resource.reindex_like(data.resource),
+            data.resource,
+            equal_nan=True,
+        )
+
+    @pytest.mark.parametrize(
+        ("regions", "message"),
+        [
+            ({"region1": ["region1", "region3"]}, "as they are not defined"),
+            (
+                {"region1": ["region1", "region1-1"], "r": ["region1-1"]},
+                "into more than one region",
+            ),
+            ({"region2": ["region1", "region1-1"]}, "after nodes which are not"),
+        ],
+    )
+    def test_aggregate_invalid_regions(self, model_national, regions, message):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            funcs.aggregate_nodes(model_national._model_data, regions)
+
+        assert check_error_or_warning(excinfo, message)
+
+
+class TestClustering:
+    @pytest.fixture(scope="class")
+    def model_national(self):
+        return calliope.examples.national_scale(
+            override_dict={
+                "model.random_seed": 23,
+                "model.subset_time": ["2005-01-01", "2005-01-05"],
+            }
+        )
+
+    @pytest.mark.parametrize("clustering_func", ["kmeans", "hierarchical"])
+    def test_cluster_nodes(self, model_national, clustering_func):
+        data = model_national._model_data
+        data_clustered = funcs.cluster_nodes(data, k=3, clustering_func=clustering_func)
+
+        assert data_clustered.nodes.size == 3
+        assert set(data_clustered.lookup_original_node_region.values) == set(
+            data_clustered.nodes.values
+        )
+
+    def test_cluster_nodes_by_location(self, model_national):
+        data = model_national._model_data
+        data_clustered = funcs.cluster_nodes(data, k=2, variables=[])
+
+        assert data_clustered.lookup_original_node_region.to_series().to_dict() == {
+            "region1": "region1",
+            "region1-1": "region1",
+            "region1-2": "region1",
+            "region1-3": "region1",
+            "region2": "region2",
+        }
+
+    def test_cluster_nodes_too_many(self, model_national):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            funcs.cluster_nodes(model_national._model_data, k=6)
+
+        assert check_error_or_warning(excinfo, "Cannot cluster 5 nodes into 6")
+
+    def test_cluster_nodes_unknown_func(self, model_national):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            funcs.cluster_nodes(model_national._model_data, k=2, clustering_func="foo")
+
+        assert check_error_or_warning(excinfo, "Unknown node clustering function")
+
+
+class TestSpatialModel:
+    @pytest.fixture(scope="class")
+    def model_aggregated(self):
+        model = calliope.examples.national_scale(
+            override_dict={
+                "model.subset_time": ["2005-01-01", "2005-01-02"],
+                "model.spatial": {
+                    "function": "aggregate_nodes",
+                    "function_options": {"regions": REGIONS},
+                },
+            }
+        )
+        model.run()
+        return model
+
+    def test_model_aggregated(self, model_aggregated):
+        assert model_aggregated.results.termination_condition == "optimal"
+        assert list(model_aggregated.inputs.nodes.values) == ["region1", "region2"]
+
+    def test_model_clustered(self):
+        model = calliope.examples.national_scale(
+            override_dict={
+                "model.random_seed": 23,
+                "model.subset_time": ["2005-01-01", "2005-01-10"],
+                "model.spatial": {
+                    "function": "cluster_nodes",
+                    "function_options": {"k": 3},
+                },
+                "model.time": {
+                    "function": "apply_clustering",
+                    "function_options": {
+                        "clustering_func": "kmeans",
+                        "how": "mean",
+                        "k": 3,
+                    },
+                },
+            }
+        )
+        model.run()
+
+        assert model.results.termination_condition == "optimal"
+        assert model.inputs.nodes.size == 3
+        assert model.inputs.timesteps.size == 3 * 24
+
+    def test_disaggregate(self, model_aggregated):
+        results = model_aggregated.results
+        disaggregated = funcs.disaggregate(results, model_aggregated.inputs)
+
+        assert disaggregated.nodes.size == 5
+        for var in ["energy_cap", "carrier_prod"]:
+            assert np.isclose(disaggregated[var].sum(), results[var].sum())
+        assert (
+            disaggregated.capacity_factor.sel(nodes="region1-1").fillna(0)
+            == results.capacity_factor.sel(nodes="region1").fillna(0)
+        ).all()
+
+
+class TestUrbanScale:
+    """
+    Nodes of the urban-scale example have different technologies, some without
+    values of non-numeric parameters (e.g. `resource_unit` of conversion techs)
+    """
+
+    @pytest.fixture(scope="class")
+    def override(self):
+        return {"model.subset_time": ["2005-07-01", "2005-07-02"]}
+
+    def test_aggregate_nodes(self, override):
+        data = calliope.examples.urban_scale(override_dict=override)._model_data
+        data_aggregated = funcs.aggregate_nodes(data, {"A": ["N1", "X2"]})
+
+        assert list(data_aggregated.nodes.values) == ["A", "X1", "X3"]
+        assert not (data_aggregated.resource_unit == None).any()  # noqa: E711
+
+    @pytest.mark.parametrize(
+        "spatial",
+        [
+            {
+                "function": "aggregate_nodes",
+                "function_options": {"regions": {"A": ["N1", "X2", "X3"]}},
+            },
+            {"function": "cluster_nodes", "function_options": {"k": 2}},
+            {"function": "cluster_nodes", "function_options": {"k": 3}},
+        ],
+    )
+    def test_model(self, override, spatial):
+        model = calliope.examples.urban_scale(
+            override_dict={
+                **override,
+                "model.random_seed": 23,
+                "model.spatial": spatial,
+            }
+        )
+        model.run()
+
+        assert model.results.termination_condition == "optimal"
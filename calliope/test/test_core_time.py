@@ -1,10 +1,13 @@
+import os
+
 import pandas as pd
 import numpy as np
 import pytest  # noqa: F401
+from sklearn.cluster import KMeans
 
 import calliope
 from calliope import exceptions
-from calliope.time import funcs, masks
+from calliope.time import cluster_cache, clustering, funcs, masks
 from calliope.test.common.util import (
     build_test_model,
     check_error_or_warning,
@@ -90,6 +93,134 @@ class TestClustering:
 
         assert check_error_or_warning(excinfo, "a good number of clusters is 5")
 
+    def test_hartigans_rule_sequential(self, model_national):
+        """
+        Without parallel fits, the global random number generator is used as it
+        always has been, so the same number of clusters is found for a given seed
+        """
+        data = model_national._model_data[["resource"]]
+        X = clustering.reshape_for_clustering(funcs.normalized_copy(data))
+
+        np.random.seed(23)
+        expected_n_clusters = 1
+        HK = 11
+        while expected_n_clusters <= len(X) and HK > 10:
+            inertia = KMeans(n_clusters=expected_n_clusters).fit(X).inertia_
+            inertia_plus_one = (
+                KMeans(n_clusters=expected_n_clusters + 1).fit(X).inertia_
+            )
+            HK = (inertia / inertia_plus_one - 1) * (len(X) - expected_n_clusters - 1)
+            expected_n_clusters += 1
+
+        for n_jobs in [None, 1]:
+            np.random.seed(23)
+            assert (
+                clustering.hartigan_n_clusters(X, n_jobs=n_jobs)
+                == expected_n_clusters - 1
+            )
+
+    def test_hartigans_rule_n_jobs(self, model_national):
+        data = model_national._model_data[["resource"]]
+        X = clustering.reshape_for_clustering(funcs.normalized_copy(data))
+        n_clusters = []
+        for n_jobs in [2, 3]:
+            np.random.seed(23)
+            n_clusters.append(clustering.hartigan_n_clusters(X, n_jobs=n_jobs))
+        assert n_clusters[0] == n_clusters[1]
+
+    @pytest.mark.parametrize("metric", ["rmse", "abs"])
+    def test_find_nearest_vector_index(self, metric):
+        array = np.random.default_rng(0).random((10, 4))
+        value = array[[3]] + 1e-3
+        assert clustering.find_nearest_vector_index(array, value, metric) == 3
+
+    def test_lookup_clusters(self, model_national):
+        data = funcs.apply_clustering(
+            model_national._model_data,
+            timesteps=None,
+            clustering_func="kmeans",
+            how="closest",
+            normalize=True,
+            k=5,
+        )
+        timesteps = data.timesteps.to_index()
+        first = data.lookup_cluster_first_timestep.to_series()
+        last = data.lookup_cluster_last_timestep.to_series().dropna()
+        assert first.sum() == len(np.unique(timesteps.date)) == len(last)
+        assert (last.index == first[first == 1].index).all()
+        assert (last.values == last.index + pd.Timedelta("23H")).all()
+
+        datestep_last = data.lookup_datestep_last_cluster_timestep.to_series()
+        assert len(datestep_last) == data.datesteps.size
+        assert datestep_last.isin(timesteps).all()
+        clusters = data.timestep_cluster.to_series()
+        for datestep, cluster in data.lookup_datestep_cluster.to_series().items():
+            assert clusters[datestep_last[datestep]] == cluster
+
+    def test_cluster_cache(self, model_national, tmpdir, monkeypatch):
+        data = model_national._model_data
+        kwargs = dict(
+            timesteps=None,
+            clustering_func="kmeans",
+            how="closest",
+            normalize=True,
+            k=5,
+            cache_path=str(tmpdir),
+            random_seed=23,
+        )
+        data_clustered = funcs.apply_clustering(data, **kwargs)
+        assert len(os.listdir(tmpdir)) == 1
+
+        def _get_clusters(*args, **kwargs):
+            raise AssertionError("Clusters should be loaded from the cache")
+
+        monkeypatch.setattr(clustering, "get_clusters", _get_clusters)
+        data_clustered_from_cache = funcs.apply_clustering(data, **kwargs)
+        assert data_clustered_from_cache.equals(data_clustered)
+
+        # Changing the clustering options leads to clustering again
+        with pytest.raises(AssertionError, match="loaded from the cache"):
+            funcs.apply_clustering(data, **{**kwargs, "k": 4})
+
+    def test_cluster_cache_key(self, model_national):
+        data = funcs.normalized_copy(model_national._model_data[["resource"]])
+        key = cluster_cache.cluster_cache_key(data, random_seed=23, k=5)
+        assert key == cluster_cache.cluster_cache_key(
+            data.copy(deep=True), random_seed=23, k=5, n_jobs=1, memmap_dir="foo"
+        )
+        assert key != cluster_cache.cluster_cache_key(data, random_seed=1, k=5)
+        assert key != cluster_cache.cluster_cache_key(data, random_seed=23, k=4)
+        assert key != cluster_cache.cluster_cache_key(data * 0.5, random_seed=23, k=5)
+        # Parallel fits may lead to a different number of clusters
+        parallel_key = cluster_cache.cluster_cache_key(
+            data, random_seed=23, k=5, n_jobs=2
+        )
+        assert key != parallel_key
+        assert parallel_key == cluster_cache.cluster_cache_key(
+            data, random_seed=23, k=5, n_jobs=4
+        )
+
+    def test_cluster_cache_key_clustering_code(
+        self, model_national, monkeypatch, tmpdir
+    ):
+        data = funcs.normalized_copy(model_national._model_data[["resource"]])
+        clustering_module = tmpdir.join("clustering.py")
+        monkeypatch.setattr(clustering, "__file__", str(clustering_module))
+        clustering_module.write("x = 1")
+        key = cluster_cache.cluster_cache_key(data, random_seed=23, k=5)
+        clustering_module.write("x = 2")
+        assert key != cluster_cache.cluster_cache_key(data, random_seed=23, k=5)
+
+    def test_cluster_cache_model(self, tmpdir):
+        override = {
+            "model.random_seed": 23,
+            "model.clustering_cache_path": str(tmpdir),
+        }
+        models = [calliope.examples.time_clustering(override_dict=override)]
+        assert len(os.listdir(tmpdir)) == 1
+        models.append(calliope.examples.time_clustering(override_dict=override))
+        assert models[0]._model_data.equals(models[1]._model_data)
+
     def test_hierarchical_no_hartigans_rule(self, model_national):
         data = model_national._model_data
 
@@ -106,6 +237,63 @@ class TestClustering:
             excinfo, "Cannot undertake hierarchical clustering"
         )
 
+    @pytest.mark.parametrize("chunk_size", [1, 7])
+    def test_reshape_for_clustering_chunks(self, model_national, chunk_size, tmpdir):
+        data = funcs.normalized_copy(model_national._model_data[["resource"]])
+        X = clustering.reshape_for_clustering(data)
+        assert X.shape == (90, data.resource.size / 90)
+        X_chunked = clustering.reshape_for_clustering(data, chunk_size=chunk_size)
+        assert np.array_equal(X, X_chunked)
+        X_memmap = clustering.reshape_for_clustering(
+            data, chunk_size=chunk_size, memmap_file=str(tmpdir.join("X.npy"))
+        )
+        assert isinstance(X_memmap, np.memmap)
+        assert np.array_equal(X, X_memmap)
+
+    @pytest.mark.parametrize("how", ["mean", "closest"])
+    def test_minibatch_kmeans(self, model_national, how, tmpdir):
+        data = model_national._model_data
+
+        data_clustered = funcs.apply_clustering(
+            data,
+            timesteps=None,
+            clustering_func="minibatch_kmeans",
+            how=how,
+            normalize=True,
+            k=5,
+            chunk_size=20,
+            memmap_dir=str(tmpdir),
+        )
+
+        assert len(data_clustered.clusters.to_pandas().unique()) <= 5
+        assert data_clustered.timestep_weights.sum() == data.timesteps.size
+        assert not os.listdir(tmpdir)
+
+    def test_closest_days_chunks(self, model_national):
+        data = model_national._model_data
+        kwargs = dict(timesteps=None, clustering_func="kmeans", how="closest", k=5)
+        np.random.seed(23)
+        data_clustered = funcs.apply_clustering(data, **kwargs)
+        np.random.seed(23)
+        data_clustered_chunks = funcs.apply_clustering(data, chunk_size=7, **kwargs)
+        assert data_clustered.identical(data_clustered_chunks)
+
+    def test_minibatch_kmeans_no_k(self, model_national):
+        data = model_national._model_data
+
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            funcs.apply_clustering(
+                data,
+                timesteps=None,
+                clustering_func="minibatch_kmeans",
+                how="mean",
+                normalize=True,
+            )
+
+        assert check_error_or_warning(
+            excinfo, "Cannot undertake minibatch kmeans clustering"
+        )
+
     def test_15min_clustering(self):
         # The data is identical for '2005-01-01' and '2005-01-03' timesteps,
         # it is only different for '2005-01-02'
@@ -1014,6 +1202,94 @@ class TestResampling:
         assert dtindex.equals(data.timesteps.to_index())
 
 
+class TestSegmentation:
+    @pytest.fixture(scope="class")
+    def model_national(self):
+        return calliope.examples.national_scale(
+            override_dict={
+                "model.random_seed": 23,
+                "model.subset_time": ["2005-01-01", "2005-01-31"],
+            }
+        )
+
+    def test_segmentation(self, model_national):
+        data = model_national._model_data
+        data_segmented = funcs.apply_segmentation(data, timesteps=None, n_segments=6)
+
+        timesteps = data_segmented.timesteps.to_index()
+        assert (timesteps.to_series().groupby(timesteps.date).count() <= 6).all()
+        daily_resolution = data_segmented.timestep_resolution.groupby(
+            "timesteps.date"
+        ).sum()
+        assert (daily_resolution == 24).all()
+        assert np.allclose(
+            data_segmented.resource.sum("timesteps"), data.resource.sum("timesteps")
+        )
+        assert (data_segmented.timestep_weights == 1).all()
+        assert data_segmented.attrs["allow_operate_mode"] == 0
+
+    def test_segmentation_all_timesteps(self, model_national):
+        data = model_national._model_data
+        data_segmented = funcs.apply_segmentation(data, timesteps=None, n_segments=24)
+
+        assert data_segmented.timesteps.equals(data.timesteps)
+        assert data_segmented.resource.equals(data.resource)
+
+    def test_segmentation_subset(self, model_national):
+        data = model_national._model_data
+        timesteps = data.timesteps.loc["2005-01-03":]
+        data_segmented = funcs.apply_segmentation(
+            data, timesteps=timesteps, n_segments=4
+        )
+
+        assert data_segmented.timesteps.loc[:"2005-01-02"].equals(
+            data.timesteps.loc[:"2005-01-02"]
+        )
+        assert data_segmented.timesteps.loc["2005-01-03":].size == 29 * 4
+
+    @pytest.mark.parametrize("how", ["mean", "closest"])
+    def test_clustering_segments(self, model_national, how):
+        data = model_national._model_data
+        data_clustered = funcs.apply_clustering(
+            data,
+            timesteps=None,
+            clustering_func="kmeans",
+            how=how,
+            k=4,
+            storage_inter_cluster=True,
+            n_segments=6,
+        )
+        timesteps = data_clustered.timesteps.to_index()
+        assert len(timesteps) <= 4 * 6
+        assert (
+            data_clustered.timestep_resolution * data_clustered.timestep_weights
+        ).sum() == data.timesteps.size
+        last_timesteps = data_clustered.lookup_datestep_last_cluster_timestep
+        assert last_timesteps.to_series().isin(timesteps).all()
+        last = data_clustered.lookup_cluster_last_timestep.to_series().dropna()
+        assert (
+            last.values
+            + pd.to_timedelta(
+                data_clustered.timestep_resolution.loc[last.values].values, unit="h"
+            )
+            == last.index + pd.Timedelta("1D")
+        ).all()
+
+    def test_clustering_segments_model(self):
+        override = {
+            "model.subset_time": ["2005-01-01", "2005-01-31"],
+            "model.time.function_options": {
+                "storage_inter_cluster": True,
+                "k": 4,
+                "n_segments": 6,
+            },
+        }
+        model = calliope.examples.time_clustering(override_dict=override)
+        model.run()
+        assert model.results.termination_condition == "optimal"
+        assert model._model_data.timesteps.size <= 4 * 6
+
+
 class TestFuncs:
     @pytest.fixture
     def model_national(self, scope="module"):
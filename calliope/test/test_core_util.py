@@ -5,9 +5,10 @@ import datetime
 import os
 import tempfile
 
+import numpy as np
 import xarray as xr
 
-from calliope.core.util import dataset
+from calliope.core.util import dataset, sparse_data
 
 from calliope.core.util.tools import memoize, memoize_instancemethod
 
@@ -75,6 +76,85 @@ class TestDataset:
         )
 
 
+class TestSparseData:
+    @pytest.fixture()
+    def example_dataarray(self):
+        array = np.full((3, 4, 5), np.nan)
+        array[0, 1, :] = np.arange(5)
+        array[2, 3, 2] = 7
+        return xr.DataArray(
+            array,
+            dims=("nodes", "techs", "timesteps"),
+            coords={
+                "nodes": ["a", "b", "c"],
+                "techs": ["foo", "bar", "baz", "qux"],
+                "timesteps": range(5),
+            },
+            attrs={"is_result": 0},
+        )
+
+    @pytest.fixture()
+    def example_dataset(self, example_dataarray):
+        return sparse_data.to_long_format(
+            xr.Dataset({"foo": example_dataarray, "bar": example_dataarray.fillna(1)})
+        )
+
+    def test_to_long_format(self, example_dataset, example_dataarray):
+        long_format_array = sparse_data.get_long_format_array(example_dataset.foo)
+        assert long_format_array.nnz == 6
+        assert long_format_array.values.tolist() == [0, 1, 2, 3, 4, 7]
+        assert sparse_data.get_long_format_array(example_dataset.bar) is None
+        assert example_dataset.foo.attrs == {"is_result": 0}
+        assert example_dataset.foo.equals(example_dataarray)
+
+    @pytest.mark.parametrize(
+        "indexer",
+        [
+            {"nodes": 2, "timesteps": slice(1, 4)},
+            {"techs": [3, 1]},
+            {"nodes": 0, "techs": 1, "timesteps": 4},
+        ],
+    )
+    def test_indexing(self, example_dataset, example_dataarray, indexer):
+        assert example_dataset.foo.isel(indexer).equals(example_dataarray.isel(indexer))
+
+    def test_transpose(self, example_dataset, example_dataarray):
+        transposed = example_dataset.foo.transpose("timesteps", "nodes", "techs")
+        assert sparse_data.get_long_format_array(transposed) is not None
+        assert transposed.equals(
+            example_dataarray.transpose("timesteps", "nodes", "techs")
+        )
+
+    def test_copy_and_load(self, example_dataset, example_dataarray):
+        copied = example_dataset.copy(deep=True)
+        assert sparse_data.get_long_format_array(copied.foo) is not None
+        copied.load()
+        assert isinstance(copied.foo.variable._data, np.ndarray)
+        assert sparse_data.get_long_format_array(example_dataset.foo) is not None
+        assert copied.foo.equals(example_dataarray)
+
+    def test_stored_values(self, example_dataset):
+        assert sparse_data.stored_values(example_dataset.foo).tolist() == [
+            0,
+            1,
+            2,
+            3,
+            4,
+            7,
+        ]
+        assert len(sparse_data.stored_values(example_dataset.bar)) == 60
+
+    def test_encode_decode_long_format(self, example_dataset):
+        encoded = sparse_data.encode_long_format(example_dataset)
+        assert encoded.foo.dims == ("foo_long_format",)
+        assert sparse_data.get_long_format_array(example_dataset.foo) is not None
+        decoded = sparse_data.decode_long_format(encoded)
+        assert "foo_long_format" not in decoded.dims
+        assert sparse_data.get_long_format_array(decoded.foo) is not None
+        assert decoded.foo.attrs == {"is_result": 0}
+        assert decoded.identical(example_dataset)
+
+
 class TestMemoization:
     @memoize_instancemethod
     def instance_method(self, a, b):
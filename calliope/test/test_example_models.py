@@ -240,6 +240,36 @@ class TestNationalScaleExampleModelSpores:
             spores_model._model_data.loc[{"spores": slice(init_spore + 1, None)}]
         )
 
+    def test_nationalscale_spores_batches(self):
+        model = calliope.examples.national_scale(
+            override_dict={
+                "model.subset_time": ["2005-01-01", "2005-01-03"],
+                "run.solver": "cbc",
+                "run.spores_options.batches": [{"slack": 0.05}, {"slack": 0.2}],
+                "run.spores_options.processes": 2,
+            },
+            scenario="spores",
+        )
+        model.run()
+
+        # Two batches of three spores + first optimal run
+        assert np.allclose(model.results.spores, range(8))
+        assert np.allclose(model.results.spores_batch, [0] * 4 + [1] * 4)
+
+        single_batch_model = calliope.examples.national_scale(
+            override_dict={
+                "model.subset_time": ["2005-01-01", "2005-01-03"],
+                "run.solver": "cbc",
+                "run.spores_options.slack": 0.2,
+            },
+            scenario="spores",
+        )
+        single_batch_model.run()
+        assert np.allclose(
+            model.results.energy_cap.loc[{"spores": slice(4, None)}],
+            single_batch_model.results.energy_cap,
+        )
+
     def test_fail_with_spores_as_input_dim(self, base_model_data):
         spores_model = calliope.Model(
             config=None, model_data=base_model_data.loc[{"spores": [0, 1]}]
@@ -6,6 +6,7 @@ import xarray as xr
 
 import calliope
 from calliope import exceptions
+from calliope.core.util import sparse_data
 
 
 class TestIO:
@@ -173,6 +174,33 @@ class TestIO:
             model_from_disk.to_netcdf(out_path)
             assert os.path.isfile(out_path)
 
+    def test_save_read_netcdf_sparse_model_data(self):
+        model = calliope.examples.national_scale(
+            override_dict={
+                "model.sparse_model_data": True,
+                "model.subset_time": ["2005-01-01", "2005-01-02"],
+            }
+        )
+        model.run()
+        long_format_vars = [
+            k
+            for k, v in model._model_data.data_vars.items()
+            if sparse_data.get_long_format_array(v) is not None
+        ]
+        assert "resource" in long_format_vars
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = os.path.join(tempdir, "model.nc")
+            model.to_netcdf(out_path)
+            with xr.open_dataset(out_path) as saved_model_data:
+                assert saved_model_data.resource.dims == ("resource_long_format",)
+            model_from_file = calliope.read_netcdf(out_path)
+
+        for var_name in long_format_vars:
+            var = model_from_file._model_data[var_name]
+            assert sparse_data.get_long_format_array(var) is not None
+            assert var.equals(model._model_data[var_name])
+        assert "resource_long_format" not in model_from_file._model_data.dims
+
     def test_save_lp(self, model):
         with tempfile.TemporaryDirectory() as tempdir:
             out_path = os.path.join(tempdir, "model.lp")
@@ -181,6 +209,24 @@ class TestIO:
             with open(out_path, "r") as f:
                 assert "energy_cap(region1_ccgt)" in f.read()
 
+    def test_save_lp_integer_timesteps(self):
+        lp_files = []
+        with tempfile.TemporaryDirectory() as tempdir:
+            for integer_timesteps in [False, True]:
+                model = calliope.examples.national_scale(
+                    override_dict={
+                        "model.subset_time": ["2005-01-01", "2005-01-01"],
+                        "run.integer_timesteps": integer_timesteps,
+                    }
+                )
+                out_path = os.path.join(tempdir, f"model_{integer_timesteps}.lp")
+                model.to_lp(out_path)
+                with open(out_path, "r") as f:
+                    lp_files.append(f.read())
+
+        assert "carrier_prod(power_region1_ccgt__2005_01_01_00_00_)" in lp_files[1]
+        assert lp_files[0] == lp_files[1]
+
     @pytest.mark.skip(
         reason="SPORES mode will fail until the cost max group constraint can be reproduced"
     )
@@ -1,6 +1,7 @@
 import pytest
 import os
 import logging
+import tempfile
 
 import numpy as np
 import pandas as pd
@@ -8,11 +9,12 @@ import pandas as pd
 import calliope
 from calliope.preprocess.model_data import ModelDataFactory
 from calliope.core.attrdict import AttrDict
+from calliope.core.util import sparse_data
 from calliope._version import __version__
 import calliope.exceptions as exceptions
 
 from calliope.preprocess import model_run_from_yaml
-from calliope.test.common.util import check_error_or_warning
+from calliope.test.common.util import build_test_model, check_error_or_warning
 
 
 @pytest.fixture(scope="module")
@@ -421,3 +423,43 @@ class TestModelData:
         assert "cost_energy_cap" in attr_dict["defaults"]
         assert "energy_cap_max" in attr_dict["defaults"]
         assert "available_area" in attr_dict["defaults"]
+
+
+class TestSparseModelData:
+    @pytest.fixture(scope="class")
+    def models(self):
+        return {
+            sparse: build_test_model(
+                {"model.sparse_model_data": sparse},
+                "simple_supply,two_hours,investment_costs",
+            )
+            for sparse in [False, True]
+        }
+
+    def test_timeseries_in_long_format(self, models):
+        resource = models[True]._model_data.resource
+        long_format_array = sparse_data.get_long_format_array(resource)
+        assert long_format_array is not None
+        assert resource.dims == ("nodes", "techs", "timesteps")
+        assert long_format_array.nnz == resource.notnull().sum()
+        assert (
+            sparse_data.get_long_format_array(models[False]._model_data.resource)
+            is None
+        )
+
+    def test_same_model_data(self, models):
+        dense, sparse = models[False]._model_data, models[True]._model_data
+        assert set(dense.data_vars) == set(sparse.data_vars)
+        for var_name, var in dense.data_vars.items():
+            assert var.dims == sparse[var_name].dims
+            assert var.equals(sparse[var_name])
+
+    def test_same_lp_file(self, models):
+        lp_files = {}
+        with tempfile.TemporaryDirectory() as tempdir:
+            for sparse, model in models.items():
+                out_path = os.path.join(tempdir, f"{sparse}.lp")
+                model.to_lp(out_path)
+                with open(out_path, "r") as f:
+                    lp_files[sparse] = f.readlines()[1:]
+        assert lp_files[False] == lp_files[True]
@@ -10,7 +10,8 @@ import xarray as xr
 import numpy as np
 import pandas as pd
 
-from calliope.backend import parsing, equation_parser
+from calliope.backend import parsing, equation_parser, linear
+from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import check_error_or_warning
 from calliope import AttrDict
 from calliope.backend.backends import BackendModel
@@ -909,6 +910,75 @@ class TestEvaluateRule:
         assert evaluated_ == expected
 
 
+class TestEvaluateArrays:
+    @pytest.fixture(scope="class")
+    def backend_interface(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        array_model = linear.ArrayModel(m._model_data)
+        array_model.build_variables(m._model_data.attrs["subsets"]["variables"])
+        return linear.ArrayBackendInterface(array_model)
+
+    def evaluate_arrays(self, backend_interface, constraint_string):
+        constraint_obj = parsing.ParsedConstraint(
+            string_to_dict(constraint_string), "foo"
+        )
+        constraint_obj.parse_strings()
+        equation_dict = constraint_obj.equations[0]
+        subset_ = constraint_obj.evaluate_subset(
+            backend_interface._array_model.model_data, equation_dict["where"]
+        )
+        return subset_, constraint_obj.evaluate_arrays(
+            "foo", equation_dict, backend_interface, subset_
+        )
+
+    def test_evaluate_arrays_constraint(self, backend_interface):
+        subset_, evaluated_ = self.evaluate_arrays(
+            backend_interface,
+            """
+            foreach: [node in nodes, tech in techs]
+            where: "energy_cap_max and energy_eff"
+            equation: energy_cap[node, tech] * 2 - $cap <= energy_cap_max[node, tech] / energy_eff[node, tech]
+            components:
+                cap:
+                    - expression: energy_cap[node, tech]
+            """,
+        )
+        model_data = backend_interface._array_model.model_data
+        array_model = backend_interface._array_model
+        expected_ids = array_model.variable("energy_cap", evaluated_.rows).ids
+
+        assert isinstance(evaluated_, linear.ConstraintArray)
+        assert evaluated_.rows.to_index(model_data).equals(subset_)
+        assert np.isnan(evaluated_.lower).all()
+        assert np.allclose(
+            evaluated_.upper,
+            [
+                model_data.energy_cap_max.loc[i].item()
+                / model_data.energy_eff.loc[i].item()
+                for i in subset_
+            ],
+        )
+        indptr, ids, coefs = evaluated_.body.to_csr()
+        assert indptr.tolist() == list(range(len(subset_) + 1))
+        assert ids.tolist() == expected_ids.tolist()
+        assert coefs.tolist() == [1.0] * len(subset_)
+
+    def test_evaluate_arrays_default_param(self, backend_interface):
+        _, evaluated_ = self.evaluate_arrays(
+            backend_interface,
+            """
+            foreach: [node in nodes, tech in techs]
+            where: "energy_cap_max"
+            equation: energy_cap[node, tech] >= energy_cap_min[node, tech] + 1
+            """,
+        )
+        default = backend_interface._array_model.model_data.attrs["defaults"][
+            "energy_cap_min"
+        ]
+        assert (evaluated_.lower == default + 1).all()
+        assert np.isnan(evaluated_.upper).all()
+
+
 class TestEvaluateSubset:
     @pytest.fixture
     def expected_subset(self, model_data):
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 import numpy as np
 import pyparsing
@@ -609,3 +611,114 @@ class TestParserMasking:
         with pytest.raises(pyparsing.ParseException) as excinfo:
             imasking.parse_string(instring, parse_all=True)
         assert check_error_or_warning(excinfo, "Expected")
+
+
+class TestParsedWhereStrings:
+    @pytest.fixture
+    def parsed_where_strings(self, monkeypatch):
+        monkeypatch.setattr(subset_parser, "_PARSED_WHERE_STRINGS", {})
+        monkeypatch.setattr(subset_parser, "_PARSED_WHERE_STRINGS_UPDATED", False)
+        return subset_parser._PARSED_WHERE_STRINGS
+
+    def test_grammar_generated_once(self):
+        assert (
+            subset_parser.generate_where_string_parser()
+            is subset_parser.generate_where_string_parser()
+        )
+        assert (
+            equation_parser.generate_equation_parser()
+            is equation_parser.generate_equation_parser()
+        )
+
+    def test_parse_where_string_reused(self, parsed_where_strings, eval_kwargs):
+        parsed_ = subset_parser.parse_where_string("with_inf and run.foo=True")
+        assert subset_parser.parse_where_string("with_inf and run.foo=True") is parsed_
+        assert list(parsed_where_strings.keys()) == ["with_inf and run.foo=True"]
+        evaluated_ = parsed_[0].eval(**eval_kwargs)
+        assert evaluated_.equals(eval_kwargs["model_data"]["with_inf_as_bool"])
+
+    def test_parse_where_string_malformed(self, parsed_where_strings):
+        with pytest.raises(pyparsing.ParseException):
+            subset_parser.parse_where_string("with_inf and or all_inf")
+        assert not parsed_where_strings
+
+    def test_save_load_parsed_where_strings(
+        self, parsed_where_strings, eval_kwargs, tmpdir
+    ):
+        path = str(tmpdir.join("parsed.pkl"))
+        subset_parser.parse_where_string("with_inf and run.foo=True")
+        subset_parser.save_parsed_where_strings(path)
+        assert not subset_parser._PARSED_WHERE_STRINGS_UPDATED
+
+        parsed_where_strings.clear()
+        subset_parser.load_parsed_where_strings(path)
+        evaluated_ = parsed_where_strings["with_inf and run.foo=True"][0].eval(
+            **eval_kwargs
+        )
+        assert evaluated_.equals(eval_kwargs["model_data"]["with_inf_as_bool"])
+        assert not subset_parser._PARSED_WHERE_STRINGS_UPDATED
+
+    def test_load_outdated_parsed_where_strings(
+        self, parsed_where_strings, monkeypatch, tmpdir
+    ):
+        path = str(tmpdir.join("parsed.pkl"))
+        subset_parser.parse_where_string("with_inf")
+        subset_parser.save_parsed_where_strings(path)
+        parsed_where_strings.clear()
+
+        monkeypatch.setattr(
+            subset_parser, "_parsed_where_strings_key", lambda: "new_grammar"
+        )
+        subset_parser.load_parsed_where_strings(path)
+        assert not parsed_where_strings
+
+    def test_cache_parsed_where_strings(
+        self, parsed_where_strings, monkeypatch, tmpdir
+    ):
+        subsets_config = parse_yaml(
+            """
+            variables:
+                foo: {foreach: [techs], where: "with_inf"}
+                bar: {foreach: [techs]}
+            constraints:
+                baz: {foreach: [techs], where: "all_inf and run.foo=True"}
+            """
+        )
+        subsets.cache_parsed_where_strings(
+            subsets_config, {"cache_parsed_where_strings": False}
+        )
+        assert not parsed_where_strings
+        assert not tmpdir.join("subsets.parsed.pkl").exists()
+
+        subsets.cache_parsed_where_strings(
+            subsets_config, {"cache_parsed_where_strings": str(tmpdir)}
+        )
+        assert set(parsed_where_strings.keys()) == {
+            "with_inf",
+            "all_inf and run.foo=True",
+        }
+        assert tmpdir.join("subsets.parsed.pkl").exists()
+
+    def test_cache_parsed_where_strings_user_cache(
+        self, parsed_where_strings, monkeypatch, tmpdir
+    ):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        monkeypatch.setenv("LOCALAPPDATA", str(tmpdir))
+        subsets.cache_parsed_where_strings(
+            {"variables": {"foo": {"foreach": ["techs"], "where": "with_inf"}}},
+            {"cache_parsed_where_strings": True},
+        )
+        assert tmpdir.join("calliope", "subsets.parsed.pkl").exists()
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX file permissions")
+    def test_load_parsed_where_strings_writable_by_others(
+        self, parsed_where_strings, tmpdir
+    ):
+        path = str(tmpdir.join("parsed.pkl"))
+        subset_parser.parse_where_string("with_inf")
+        subset_parser.save_parsed_where_strings(path)
+        parsed_where_strings.clear()
+
+        os.chmod(path, 0o666)
+        subset_parser.load_parsed_where_strings(path)
+        assert not parsed_where_strings
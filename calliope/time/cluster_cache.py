@@ -0,0 +1,103 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+cluster_cache.py
+~~~~~~~~~~~~~~~~
+
+On-disk cache of the clusters to which each day is assigned by time
+clustering, keyed by a hash of the data that is clustered and of the
+clustering options, so that models clustering identical timeseries in the
+same way skip clustering.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from calliope._version import __version__
+from calliope.time import clustering
+
+logger = logging.getLogger(__name__)
+
+# Clustering options which have no effect on the clusters found
+_IGNORED_OPTIONS = ["memmap_dir"]
+
+
+def cluster_cache_key(data, random_seed=None, **kwargs):
+    """
+    Returns a hash of all variables (including coordinates) of `data`, the
+    (normalized) data to cluster, the seed of the random number generator, the
+    clustering options `kwargs`, and the source code of the clustering module.
+
+    """
+    key_hash = hashlib.sha1(__version__.encode("utf-8"))
+    # The Calliope version is not changed by editing the clustering code (e.g.
+    # in a development install)
+    with open(clustering.__file__, "rb") as f:
+        key_hash.update(f.read())
+    options = {k: v for k, v in kwargs.items() if k not in _IGNORED_OPTIONS}
+    # Hartigan's rule finds the same number of clusters for any `n_jobs` above 1,
+    # but not necessarily the same as when fitting sequentially
+    options["n_jobs"] = options.get("n_jobs", None) not in [None, 1]
+    key_hash.update(
+        json.dumps([random_seed, options], sort_keys=True, default=str).encode("utf-8")
+    )
+    for var_name in sorted(data.variables):
+        values = data[var_name].values
+        key_hash.update(
+            json.dumps([var_name, data[var_name].dims, values.dtype.str]).encode(
+                "utf-8"
+            )
+        )
+        if values.dtype.kind == "O":
+            values = pd.util.hash_array(values.ravel())
+        key_hash.update(np.ascontiguousarray(values).tobytes())
+
+    return key_hash.hexdigest()
+
+
+def _cache_file(cache_path, key):
+    return os.path.join(cache_path, f"clusters.{key}.npz")
+
+
+def read_cached_clusters(cache_path, key):
+    """
+    Returns the clusters cached under `key` in `cache_path`, as a pandas
+    Series of cluster numbers indexed by the first timestep of each day,
+    or None if there is no such cache entry.
+
+    """
+    try:
+        with np.load(_cache_file(cache_path, key), allow_pickle=False) as cached:
+            clusters = pd.Series(cached["clusters"], index=cached["dates"])
+    except (OSError, ValueError, KeyError):
+        return None
+    logger.debug(f"Loaded time clusters from {_cache_file(cache_path, key)}")
+    return clusters
+
+
+def write_cached_clusters(cache_path, key, clusters):
+    """
+    Cache `clusters`, as returned by
+    :func:`calliope.time.clustering.get_clusters`, under `key` in `cache_path`.
+
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    cache_file = _cache_file(cache_path, key)
+    # Written under a temporary name and then renamed, so that an entry is only
+    # ever read once it is complete
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(
+            f,
+            dates=clusters.index.values.astype("datetime64[ns]"),
+            clusters=clusters.values,
+        )
+    os.replace(tmp_file, cache_file)
+    logger.debug(f"Cached time clusters in {cache_file}")
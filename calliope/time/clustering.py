@@ -8,11 +8,16 @@ clustering.py
 Functions to cluster data along the time dimension.
 
 """
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 import xarray as xr
 
-from sklearn.metrics import mean_squared_error
+from scipy import sparse
+from scipy.spatial.distance import cdist
 from sklearn import cluster as sk_cluster
 
 from calliope import exceptions
@@ -38,7 +43,17 @@ def _stack_data(data, dates, times):
     return stacked_var
 
 
-def reshape_for_clustering(data, loc_techs=None, variables=None):
+def _day_chunks(n_days, chunk_size=None):
+    """
+    Slices over `n_days` days, `chunk_size` days at a time (all at once if None)
+    """
+    chunk_size = n_days if not chunk_size else chunk_size
+    return [slice(i, i + chunk_size) for i in range(0, n_days, chunk_size)]
+
+
+def reshape_for_clustering(
+    data, loc_techs=None, variables=None, chunk_size=None, memmap_file=None
+):
     """
     Create an array of timeseries values, where each day has a row of all
     hourly timeseries data from all relevant variables
@@ -51,6 +66,13 @@ def reshape_for_clustering(data, loc_techs=None, variables=None):
         If clustering over a subset of loc_techs, they are listed here
     variables : string or list-like, default = None
         If clustering over a subset of timeseries variables, they are listed here
+    chunk_size : int, default = None
+        If given, the data is read and reshaped this many days at a time, so
+        that only one chunk of each variable is held in memory in addition to
+        the returned array. If None, each variable is reshaped at once.
+    memmap_file : str, default = None
+        If given, the returned array is memory-mapped to a NumPy `.npy` file at
+        this path rather than held in memory.
 
     Returns
     -------
@@ -67,14 +89,13 @@ def reshape_for_clustering(data, loc_techs=None, variables=None):
         dates = np.unique([i.split("-")[0] for i in timesteps])
         times = np.unique([i.split("-")[1] for i in timesteps])
 
-    reshaped_data = np.array([[] for i in dates])
     # if 'variables' is given then we will loop over that, otherwise we loop over
     # all timeseries variables
     relevent_vars = variables if variables else data.data_vars
 
-    # loop over variables to get our arrays
+    var_data = []
     for var in relevent_vars:
-        temp_data = data[var].copy()
+        temp_data = data[var]
         # if there is a loc_tech subset, index over that
         if loc_techs:
             loc_tech_dim = [i for i in data[var].dims if "loc_techs" in i][0]
@@ -82,17 +103,39 @@ def reshape_for_clustering(data, loc_techs=None, variables=None):
                 set(temp_data[loc_tech_dim].values).intersection(loc_techs)
             )
             temp_data = temp_data.loc[{loc_tech_dim: relevent_loc_techs}]
-
-        # stack all non-time dimensions to get one row of data for each timestep
-        stacked_var = _stack_data(temp_data, dates, times)
-        # reshape the array to split days and timesteps within days, now we have
-        # one row of data per day
-
-        reshaped_data = np.concatenate([reshaped_data, stacked_var.values], axis=1)
-    # put all the columns of data together, keeping rows as days. Also convert
-    # all nans to zeros
-
-    X = np.nan_to_num(reshaped_data, nan=0.0, posinf=0.0, neginf=0.0)
+        var_data.append(temp_data)
+
+    # Each variable has one column per timestep in a day for each combination
+    # of its non-time dimensions, so the array can be allocated before filling
+    # it in with one variable (and chunk of days) at a time
+    n_columns = [
+        int(np.prod([v.sizes[dim] for dim in v.dims if dim != "timesteps"]))
+        * len(times)
+        for v in var_data
+    ]
+    shape = (len(dates), sum(n_columns))
+    if memmap_file is not None:
+        X = np.lib.format.open_memmap(memmap_file, mode="w+", shape=shape)
+    else:
+        X = np.empty(shape)
+
+    timesteps_per_day = len(times)
+    first_column = 0
+    for temp_data, var_columns in zip(var_data, n_columns):
+        columns = slice(first_column, first_column + var_columns)
+        for days in _day_chunks(len(dates), chunk_size):
+            chunk = temp_data.isel(
+                timesteps=slice(
+                    days.start * timesteps_per_day, days.stop * timesteps_per_day
+                )
+            )
+            # stack all non-time dimensions to get one row of data for each day
+            stacked_var = _stack_data(chunk, dates[days], times)
+            # Also convert all nans to zeros
+            X[days, columns] = np.nan_to_num(
+                stacked_var.values, nan=0.0, posinf=0.0, neginf=0.0
+            )
+        first_column += var_columns
 
     return X
 
@@ -129,11 +172,9 @@ def get_mean_from_clusters(data, clusters, timesteps_per_day):
             data[var].loc[{"timesteps": data.timesteps[: len(t_coords)]}].copy()
         )
         clustered_array["timesteps"] = t_coords
-        for cluster_id, cluster_members in cluster_map.items():
-            current_cluster = [
-                i for i in t_coords if i.startswith("{}-".format(cluster_id))
-            ]
-            clustered_array.loc[{"timesteps": current_cluster}] = (
+        for i, (cluster_id, cluster_members) in enumerate(cluster_map.items()):
+            current_cluster = slice(i * timesteps_per_day, (i + 1) * timesteps_per_day)
+            clustered_array[{"timesteps": current_cluster}] = (
                 data[var]
                 .loc[{"timesteps": cluster_members}]
                 .groupby("timesteps.time")
@@ -145,6 +186,18 @@ def get_mean_from_clusters(data, clusters, timesteps_per_day):
     return ds
 
 
+def _vector_distances(array, values, metric="rmse"):
+    # Error between each row of `values` (rows) and each row of `array` (columns)
+    if metric == "rmse":
+        return cdist(values, array, "sqeuclidean") / array.shape[1]
+    elif metric == "abs":
+        return np.abs(values.sum(axis=1)[:, np.newaxis] - array.sum(axis=1))
+    else:
+        raise ValueError(
+            "Error metric can only be `rmse` or `abs`, {} given".format(metric)
+        )
+
+
 def find_nearest_vector_index(array, value, metric="rmse"):
     """
     compares the data for one cluster to every day in the timeseries, to find the
@@ -168,19 +221,12 @@ def find_nearest_vector_index(array, value, metric="rmse"):
         If 'abs' will compare the absolute difference between `value` and
         each date in `array`.
     """
-    if metric == "rmse":
-        error = np.array([mean_squared_error(i, value[0]) for i in array])
-    elif metric == "abs":
-        error = np.array([np.linalg.norm(sum(y)) for y in array - value])
-    else:
-        raise ValueError(
-            "Error metric can only be `rmse` or `abs`, {} given".format(metric)
-        )
+    return _vector_distances(array, value[:1], metric)[0].argmin()
 
-    return error.argmin()
 
-
-def get_closest_days_from_clusters(data, mean_data, clusters, daily_timesteps):
+def get_closest_days_from_clusters(
+    data, mean_data, clusters, daily_timesteps, chunk_size=None
+):
     """
     Given a set of mean cluster timeseries profiles, find the day in the full
     timeseries that matches each cluster profile most closely.
@@ -199,6 +245,9 @@ def get_closest_days_from_clusters(data, mean_data, clusters, daily_timesteps):
         hours assigned to each timestep in a day (e.g. an entry of 0.25 = 15 minutes).
         We expect uniform timesteps between days, which is checked prior to
         reaching this function.
+    chunk_size : int, optional
+        If given, days are compared to the cluster profiles this many days at
+        a time, rather than all at once.
 
     Returns
         new_data : xarray Dataset
@@ -211,19 +260,31 @@ def get_closest_days_from_clusters(data, mean_data, clusters, daily_timesteps):
     """
     dtindex = data["timesteps"].to_index()
     timesteps_per_day = len(daily_timesteps)
-    chosen_days = {}
-
-    for cluster in sorted(clusters.unique()):
-        subset_t = [
-            t
-            for t in mean_data.timesteps.values
-            if t.startswith("{}-".format(int(cluster)))
-        ]
 
-        target = reshape_for_clustering(mean_data.loc[dict(timesteps=subset_t)])
-        lookup_array = reshape_for_clustering(data)
-
-        chosen_days[cluster] = find_nearest_vector_index(lookup_array, target)
+    # One row per cluster, in the order of the clusters in `mean_data`
+    targets = reshape_for_clustering(mean_data)
+    mean_data_clusters = pd.unique(
+        [int(t.split("-")[0]) for t in mean_data.timesteps.values]
+    )
+    n_days = len(dtindex) // timesteps_per_day
+    nearest = np.zeros(len(targets), dtype=int)
+    nearest_distance = np.full(len(targets), np.inf)
+    for days in _day_chunks(n_days, chunk_size):
+        lookup_array = reshape_for_clustering(
+            data.isel(
+                timesteps=slice(
+                    days.start * timesteps_per_day, days.stop * timesteps_per_day
+                )
+            )
+        )
+        distances = _vector_distances(lookup_array, targets)
+        chunk_nearest = distances.argmin(axis=1)
+        chunk_distance = distances[np.arange(len(targets)), chunk_nearest]
+        # Ties are resolved in favour of the earliest day, as in a single pass
+        closer = chunk_distance < nearest_distance
+        nearest[closer] = days.start + chunk_nearest[closer]
+        nearest_distance[closer] = chunk_distance[closer]
+    chosen_days = dict(sorted(zip(mean_data_clusters, nearest)))
 
     days_list = sorted(list(set(chosen_days.values())))
     new_t_coord = _timesteps_from_daily_index(
@@ -240,18 +301,17 @@ def get_closest_days_from_clusters(data, mean_data, clusters, daily_timesteps):
 
 
 def _timesteps_from_daily_index(idx, daily_timesteps):
-    new_idx = pd.Index(
-        [
-            date + pd.DateOffset(hours=sum(daily_timesteps[:timestep]))
-            for date in idx
-            for timestep in range(len(daily_timesteps))
-        ]
+    offsets = pd.to_timedelta(
+        np.cumsum(np.r_[0, daily_timesteps[:-1]]).astype(float), unit="h"
     )
-    return new_idx
+    new_idx = pd.DatetimeIndex(idx).repeat(len(daily_timesteps)) + np.tile(
+        offsets, len(idx)
+    )
+    return new_idx.rename(None)
 
 
 def map_clusters_to_data(
-    data, clusters, how, daily_timesteps, storage_inter_cluster=True
+    data, clusters, how, daily_timesteps, storage_inter_cluster=True, chunk_size=None
 ):
     """
     Returns a copy of data that has been clustered.
@@ -264,6 +324,9 @@ def map_clusters_to_data(
     storage_inter_cluster : bool, default=True
         If True, add `datesteps` to model_data, for use in the backend to build
         inter_cluster storage decision variables and constraints
+    chunk_size : int, optional
+        If given and `how` is 'closest', days are compared to the cluster means
+        this many days at a time.
     """
     # FIXME hardcoded time intervals ('1H', '1D')
 
@@ -297,7 +360,7 @@ def map_clusters_to_data(
 
     elif how == "closest":
         new_data, chosen_ts = get_closest_days_from_clusters(
-            data, new_data, clusters, daily_timesteps
+            data, new_data, clusters, daily_timesteps, chunk_size=chunk_size
         )
         # Deal with the case where more than one cluster has the same closest day
         # An easy way is to rename the original clusters with the chosen days
@@ -355,6 +418,9 @@ def get_clusters(
     timesteps=None,
     k=None,
     variables=None,
+    n_jobs=None,
+    chunk_size=None,
+    memmap_dir=None,
     **kwargs,
 ):
     """
@@ -366,7 +432,9 @@ def get_clusters(
     data : xarray.Dataset
         Should be normalized
     func : str
-        'kmeans' or 'hierarchical' for KMeans or Agglomerative clustering, respectively
+        'kmeans' or 'hierarchical' for KMeans or Agglomerative clustering,
+        respectively, or 'minibatch_kmeans' to fit KMeans clustering by
+        streaming through the days in chunks of `chunk_size` days.
     timesteps_per_day : int
         Total number of timesteps in a day
     tech : list, optional
@@ -380,12 +448,28 @@ def get_clusters(
     variables : list, optional
         data variables (e.g. `resource`, `energy_eff`) by whose values the data
         will be clustered. If none (default), all timeseries variables will be used.
+    n_jobs : int, optional
+        Number of cluster sizes to fit in parallel when using Hartigan's rule
+        to infer the number of clusters. If none (default), they are fitted
+        one at a time.
+    chunk_size : int, optional
+        Number of days to reshape for clustering at a time and, with
+        'minibatch_kmeans', the number of days in each batch (1024 if none).
+        If none (default), all days are reshaped at once.
+    memmap_dir : str, optional
+        If given, the array of reshaped data (one row per day) is memory-mapped
+        to a temporary file in this directory, which is removed once clustering
+        is complete, so that it does not have to fit in memory.
     kwargs : dict
         Additional keyword arguments available depend on the `func`.
         For available KMeans kwargs see:
         http://scikit-learn.org/stable/modules/generated/sklearn.cluster.KMeans.html
         For available hierarchical kwargs see:
         http://scikit-learn.org/stable/modules/generated/sklearn.cluster.AgglomerativeClustering.html
+        For available minibatch KMeans kwargs see:
+        http://scikit-learn.org/stable/modules/generated/sklearn.cluster.MiniBatchKMeans.html
+        With 'minibatch_kmeans', `max_iter` (default 10) is the number of passes
+        over all days.
     Returns
     -------
     clusters : dataframe
@@ -403,17 +487,47 @@ def get_clusters(
     else:
         timesteps = data.timesteps.values
 
-    X = reshape_for_clustering(data, tech, variables)
+    if memmap_dir is not None:
+        fd, memmap_file = tempfile.mkstemp(suffix=".npy", dir=memmap_dir)
+        os.close(fd)
+    else:
+        memmap_file = None
+
+    try:
+        X = reshape_for_clustering(data, tech, variables, chunk_size, memmap_file)
+        clustered_data = _fit_clusters(X, func, k, n_jobs, chunk_size, **kwargs)
+    finally:
+        if memmap_file is not None:
+            X = None  # Close the memory map before removing its file
+            os.remove(memmap_file)
+
+    # Determine the cluster membership of each day
+    day_clusters = clustered_data.labels_
+
+    # Create mapping of timesteps to clusters
+    clusters = pd.Series(day_clusters, index=timesteps[::timesteps_per_day])
+
+    return clusters, clustered_data
+
 
+def _fit_clusters(X, func, k, n_jobs, chunk_size, **kwargs):
     if func == "kmeans":
         if k is None:
-            k = hartigan_n_clusters(X)
+            k = hartigan_n_clusters(X, n_jobs=n_jobs)
             exceptions.warn(
                 "Used Hartigan's rule to determine that"
                 "a good number of clusters is {}.".format(k)
             )
         clustered_data = sk_cluster.KMeans(k, n_init=10).fit(X)
 
+    elif func == "minibatch_kmeans":
+        if k is None:
+            raise exceptions.ModelError(
+                "Cannot undertake minibatch kmeans clustering without a predefined "
+                "number of clusters (k)"
+            )
+        clustered_data = _fit_minibatch_kmeans(X, k, chunk_size, **kwargs)
+
     elif func == "hierarchical":
         if k is None:
             raise exceptions.ModelError(
@@ -422,20 +536,78 @@ def get_clusters(
             )
         clustered_data = sk_cluster.AgglomerativeClustering(k).fit(X)
 
-    # Determine the cluster membership of each day
-    day_clusters = clustered_data.labels_
+    return clustered_data
 
-    # Create mapping of timesteps to clusters
-    clusters = pd.Series(day_clusters, index=timesteps[::timesteps_per_day])
 
-    return clusters, clustered_data
+def _fit_minibatch_kmeans(X, k, chunk_size=None, max_iter=10, **kwargs):
+    """
+    Fit sklearn.cluster.MiniBatchKMeans to `X` one chunk of rows (days) at a
+    time, in a random order in each of `max_iter` passes, so that only one
+    chunk is read into memory at a time if `X` is memory-mapped.
+    """
+    # Every batch, including the first which initialises the clusters, must
+    # have at least as many days as there are clusters
+    chunk_size = max(k, 1024 if chunk_size is None else chunk_size)
+    kwargs.setdefault("n_init", 3)
+    clustered_data = sk_cluster.MiniBatchKMeans(
+        k, batch_size=chunk_size, max_iter=max_iter, **kwargs
+    )
+    chunks = _day_chunks(len(X), chunk_size)
+    # A final chunk with fewer days than clusters is merged into the one before
+    if len(chunks) > 1 and len(X) - chunks[-1].start < k:
+        chunks = chunks[:-2] + [slice(chunks[-2].start, len(X))]
+
+    for _ in range(max_iter):
+        for i in np.random.permutation(len(chunks)):
+            clustered_data.partial_fit(X[chunks[i]])
+
+    # partial_fit only labels the last chunk, so all days are labelled here
+    clustered_data.labels_ = np.concatenate(
+        [clustered_data.predict(X[chunk]) for chunk in chunks]
+    )
+    return clustered_data
+
+
+def get_segment_starts(X, day_starts, n_segments):
+    """
+    Boolean array over the rows (timesteps) of `X` which is True where a
+    segment starts. Each day (starting at the positions in `day_starts`) is
+    split into at most `n_segments` segments of consecutive timesteps by
+    agglomerative (Ward) clustering, in which only neighbouring timesteps
+    can be merged.
+    """
+    starts = np.zeros(len(X), dtype=bool)
+    for start, end in zip(day_starts, np.r_[day_starts[1:], len(X)]):
+        starts[start] = True
+        if end - start <= n_segments:
+            starts[start:end] = True
+            continue
+        X_day = X[start:end]
+        connectivity = sparse.diags(
+            [1, 1], [-1, 1], shape=(len(X_day), len(X_day)), format="csr"
+        )
+        labels = (
+            sk_cluster.AgglomerativeClustering(
+                n_segments, connectivity=connectivity, linkage="ward"
+            )
+            .fit(X_day)
+            .labels_
+        )
+        starts[start + 1 : end] = labels[1:] != labels[:-1]
+    return starts
 
 
-def hartigan_n_clusters(X, threshold=10):
+def hartigan_n_clusters(X, threshold=10, n_jobs=None):
     """
     Try clustering using sklearn.cluster.kmeans, for several cluster sizes.
     Using Hartigan's rule, we will return the number of clusters after which
     the benefit of clustering is low.
+
+    If `n_jobs` is greater than 1, `n_jobs` cluster sizes are fitted at a time
+    in parallel threads, each once only. The random state of each fit then
+    depends only on its cluster size, so the result is the same for any
+    `n_jobs` greater than 1 (but may differ from that found sequentially). Up
+    to `n_jobs - 1` cluster sizes beyond those needed are also fitted.
     """
 
     def _H_rule(inertia, inertia_plus_one, n_clusters, len_input):
@@ -446,16 +618,53 @@ def hartigan_n_clusters(X, threshold=10):
     n_clusters = 1
     HK = threshold + 1
 
-    while n_clusters <= len_input and HK > threshold:
-        kmeans = sk_cluster.KMeans(n_clusters=n_clusters).fit(X)
-        kmeans_plus_one = sk_cluster.KMeans(n_clusters=n_clusters + 1).fit(X)
+    if n_jobs is None or n_jobs == 1:
+        while n_clusters <= len_input and HK > threshold:
+            kmeans = sk_cluster.KMeans(n_clusters=n_clusters).fit(X)
+            kmeans_plus_one = sk_cluster.KMeans(n_clusters=n_clusters + 1).fit(X)
 
-        inertia = kmeans.inertia_
-        inertia_plus_one = kmeans_plus_one.inertia_
+            inertia = kmeans.inertia_
+            inertia_plus_one = kmeans_plus_one.inertia_
 
-        HK = _H_rule(inertia, inertia_plus_one, n_clusters, len_input)
+            HK = _H_rule(inertia, inertia_plus_one, n_clusters, len_input)
+
+            n_clusters += 1
+
+    else:
+        seed = np.random.randint(np.iinfo(np.int32).max)
+
+        def _inertia(n_clusters):
+            random_state = np.random.SeedSequence(seed, spawn_key=(n_clusters,))
+            return (
+                sk_cluster.KMeans(
+                    n_clusters=n_clusters,
+                    random_state=random_state.generate_state(1)[0],
+                )
+                .fit(X)
+                .inertia_
+            )
 
-        n_clusters += 1
+        inertias = {}
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            while n_clusters <= len_input and HK > threshold:
+                if n_clusters + 1 not in inertias:
+                    # Fit the cluster sizes needed now along with the next ones,
+                    # `n_jobs` at a time
+                    to_fit = [
+                        i
+                        for i in range(n_clusters, n_clusters + n_jobs + 1)
+                        if i not in inertias and (i <= n_clusters + 1 or i <= len_input)
+                    ][:n_jobs]
+                    inertias.update(zip(to_fit, executor.map(_inertia, to_fit)))
+
+                HK = _H_rule(
+                    inertias[n_clusters],
+                    inertias[n_clusters + 1],
+                    n_clusters,
+                    len_input,
+                )
+
+                n_clusters += 1
 
     if HK > threshold:  # i.e. we went to the limit where n_clusters = len_input
         exceptions.warn("Based on threshold, number of clusters = number of dates")
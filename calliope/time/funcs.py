@@ -10,14 +10,13 @@ Functions to process time series data.
 """
 
 import logging
-import datetime
 
 import numpy as np
 import pandas as pd
 import xarray as xr
 
 from calliope import exceptions
-from calliope.time import clustering
+from calliope.time import cluster_cache, clustering
 
 logger = logging.getLogger(__name__)
 
@@ -112,6 +111,9 @@ def apply_clustering(
     scale_clusters="mean",
     storage_inter_cluster=True,
     model_run=None,
+    cache_path=None,
+    random_seed=None,
+    n_segments=None,
     **kwargs,
 ):
     """
@@ -135,8 +137,23 @@ def apply_clustering(
         given by scale_clusters. For example, 'mean' scales along each loc_tech
         and variable to match inputs and outputs. Other options for matching
         include 'sum', 'max', and 'min'. If None, no scaling occurs.
+    cache_path : str, optional
+        Directory in which to cache the clusters assigned to each day, keyed by
+        a hash of the (normalized) data to cluster, `clustering_func`,
+        `random_seed` and `kwargs`, to be reused when the same data is next
+        clustered in the same way. Only used by clustering functions other than
+        `file=`.
+    random_seed : int, optional
+        Seed with which the global random number generator has been set before
+        clustering. Only used as part of the cache key.
+    n_segments : int, optional
+        If given, the timesteps within each clustered day are then merged into
+        this many segments of variable duration, using
+        :func:`~calliope.time.funcs.apply_segmentation`.
     **kwargs : optional
-        Arguments passed to clustering_func.
+        Arguments passed to clustering_func, see
+        :func:`~calliope.time.clustering.get_clusters`. `chunk_size`, if given,
+        is also used to find the closest days to clusters in chunks of days.
 
     Returns
     -------
@@ -210,13 +227,26 @@ def apply_clustering(
             clusters.loc[:] = [i[0] for i in clusters.values]
 
     else:
-        result = clustering.get_clusters(
-            data_normalized,
-            clustering_func,
-            timesteps_per_day=timesteps_per_day,
-            **kwargs,
-        )
-        clusters = result[0]  # Ignore other stuff returned
+        clusters = None
+        if cache_path is not None:
+            cache_key = cluster_cache.cluster_cache_key(
+                data_normalized,
+                random_seed=random_seed,
+                clustering_func=clustering_func,
+                timesteps_per_day=timesteps_per_day,
+                **kwargs,
+            )
+            clusters = cluster_cache.read_cached_clusters(cache_path, cache_key)
+        if clusters is None:
+            result = clustering.get_clusters(
+                data_normalized,
+                clustering_func,
+                timesteps_per_day=timesteps_per_day,
+                **kwargs,
+            )
+            clusters = result[0]  # Ignore other stuff returned
+            if cache_path is not None:
+                cluster_cache.write_cached_clusters(cache_path, cache_key, clusters)
 
     data_new = clustering.map_clusters_to_data(
         data_to_cluster,
@@ -224,6 +254,7 @@ def apply_clustering(
         how=how,
         daily_timesteps=daily_timesteps,
         storage_inter_cluster=storage_inter_cluster,
+        chunk_size=kwargs.get("chunk_size", None),
     )
 
     # It's now safe to add the original coordinates back in (preserving all the
@@ -256,6 +287,20 @@ def apply_clustering(
 
     lookup_clusters(data_new_scaled)
 
+    if n_segments is not None:
+        # Segmented after scaling, as segments keep the sum and (time-weighted)
+        # mean of all timeseries
+        data_new_scaled = apply_segmentation(
+            data_new_scaled,
+            timesteps=None
+            if timesteps is None
+            else data_new_scaled.timesteps.to_index().difference(
+                data.timesteps.to_index().difference(timesteps)
+            ),
+            n_segments=n_segments,
+            normalize=normalize,
+        )
+
     return data_new_scaled
 
 
@@ -327,6 +372,133 @@ def resample(data, timesteps, resolution):
     return data_rs
 
 
+def apply_segmentation(data, timesteps, n_segments, normalize=True, variables=None):
+    """
+    Merge consecutive timesteps with similar timeseries values within each
+    day into segments of variable duration.
+
+    Within each day, timesteps are merged into `n_segments` segments by
+    agglomerative clustering, in which only neighbouring timesteps or segments
+    can be merged. Each segment is labelled by its first timestep, its
+    `timestep_resolution` is the sum of the resolution of its timesteps, and
+    `resource` is summed (as in :func:`~calliope.time.funcs.resample`). All
+    other timeseries data are averaged, weighted by timestep resolution.
+    `timestep_weights` and clusters are unchanged, so that the function can
+    be applied to clustered data (see `n_segments` in
+    :func:`~calliope.time.funcs.apply_clustering`).
+
+    Parameters
+    ----------
+    data : xarray.Dataset
+        Calliope model data.
+    timesteps : pandas.DatetimeIndex or list of timesteps or None
+        If given, only apply segmentation to these timesteps.
+    n_segments : int
+        Maximum number of segments in each day. Days with this many timesteps
+        or fewer are unchanged.
+    normalize : bool, optional
+        If True (default), data is normalized before timesteps are compared,
+        using :func:`~calliope.time.funcs.normalized_copy`.
+    variables : list, optional
+        Data variables (e.g. `resource`) by whose values timesteps are
+        compared. If None (default), all timeseries variables are used.
+
+    Returns
+    -------
+    data_new : xarray.Dataset
+
+    """
+    data_new, data_coords = _drop_timestep_vars(data, timesteps)
+
+    # Variables by whose values timesteps are compared, one column per
+    # combination of their non-time dimensions
+    if variables is None:
+        variables = [
+            var
+            for var in data_new.data_vars
+            if not var.startswith(("timestep_", "lookup_"))
+            and data_new[var].dtype.kind in "fi"
+        ]
+    data_to_compare = data_new[variables].astype(float)
+    if normalize:
+        with pd.option_context("mode.use_inf_as_na", True):
+            data_to_compare = normalized_copy(data_to_compare)
+    X = np.concatenate(
+        [
+            data_to_compare[var]
+            .transpose("timesteps", ...)
+            .values.reshape(data_new.timesteps.size, -1)
+            for var in variables
+        ],
+        axis=1,
+    )
+    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+    dates = data_new.timesteps.to_index().normalize()
+    day_starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    starts = np.flatnonzero(clustering.get_segment_starts(X, day_starts, n_segments))
+
+    resolution = data_new.timestep_resolution.values
+    segment_resolution = np.add.reduceat(resolution, starts)
+    segment_timesteps = data_new.timesteps.values[starts]
+
+    def _segment(var):
+        dims = var.dims
+        values = var.transpose("timesteps", ...).values
+        if values.dtype.kind == "f":
+            notnull = ~np.isnan(values)
+            values = np.where(notnull, values, 0)
+            if var.name in ["timestep_resolution", "resource"]:
+                values = np.add.reduceat(values, starts, axis=0)
+            else:  # Mean weighted by timestep resolution
+                shape = (-1,) + (1,) * (values.ndim - 1)
+                values = np.add.reduceat(
+                    values * resolution.reshape(shape), starts, axis=0
+                ) / segment_resolution.reshape(shape)
+            # Segments without any data stay empty
+            values[np.add.reduceat(notnull, starts, axis=0) == 0] = np.nan
+        else:  # e.g. timestep clusters, the same for all timesteps in a day
+            values = values[starts]
+        return xr.DataArray(
+            values,
+            dims=("timesteps",) + tuple(i for i in dims if i != "timesteps"),
+            coords={
+                k: v for k, v in var.coords.items() if k in dims and k != "timesteps"
+            },
+            attrs=var.attrs,
+        ).transpose(*dims)
+
+    data_new = xr.Dataset(
+        {var: _segment(data_new[var]) for var in data_new.data_vars},
+        coords={"timesteps": segment_timesteps},
+        attrs=data_new.attrs,
+    )
+    data_new.timesteps.attrs = data.timesteps.attrs
+    logger.debug(
+        f"Merged {len(dates)} timesteps into {len(starts)} segments of "
+        "variable duration"
+    )
+
+    # Having timesteps with different lengths does not permit operational mode
+    data_new.attrs["allow_operate_mode"] = 0
+
+    # It's now safe to add the original coordinates back in (preserving all the
+    # loc_tech sets that aren't used to index a variable in the DataArray)
+    data_new.update(data_coords)
+
+    data_new = _copy_non_t_vars(data, data_new)  # add back in non timeseries data
+
+    if timesteps is not None:
+        # Combine leftover parts of passed in data with new data
+        data_new = _combine_datasets(data.drop_sel(timesteps=timesteps), data_new)
+        data_new = _copy_non_t_vars(data, data_new)
+
+    if "lookup_cluster_first_timestep" in data.data_vars:
+        lookup_clusters(data_new)
+
+    return data_new
+
+
 def drop(data, timesteps):
     """
     Drop timesteps from data, adjusting the timestep weight of remaining
@@ -366,36 +538,34 @@ def lookup_clusters(dataset):
     2. the last timestep of the cluster corresponding to a date in the original timeseries
     """
 
-    data_dict_first = dict(dims=["timesteps"], data=[])
-    data_dict_last = dict(dims=["timesteps"], data=[])
-    for timestep in dataset.timesteps:
-        t = pd.to_datetime(timestep.item()).date().strftime("%Y-%m-%d")
-        timestep_first = dataset.timesteps.loc[t][0]
-        timestep_last = dataset.timesteps.loc[t][-1]
-        if timestep == timestep_first:
-            data_dict_first["data"].append(1)
-            data_dict_last["data"].append(timestep_last.values)
-        else:
-            data_dict_first["data"].append(0)
-            data_dict_last["data"].append(None)
-    dataset["lookup_cluster_first_timestep"] = xr.DataArray.from_dict(data_dict_first)
-    dataset["lookup_cluster_last_timestep"] = xr.DataArray.from_dict(data_dict_last)
+    timesteps = dataset.timesteps.to_index()
+    timesteps_per_date = pd.Series(timesteps, index=timesteps).groupby(timesteps.date)
+    is_first = timesteps == timesteps_per_date.transform("first").values
+    dataset["lookup_cluster_first_timestep"] = xr.DataArray(
+        is_first.astype(int), dims=["timesteps"]
+    )
+    dataset["lookup_cluster_last_timestep"] = xr.DataArray(
+        np.where(is_first, timesteps_per_date.transform("last").values, None),
+        dims=["timesteps"],
+    ).astype("datetime64[ns]")
 
     if "datesteps" in dataset.dims:
-        last_timesteps = dict(dims=["datesteps"], data=[])
         cluster_date = dataset.timestep_cluster.to_pandas().resample("1D").mean()
-        for datestep in dataset.datesteps.to_index():
-            cluster = dataset.lookup_datestep_cluster.loc[
-                datestep.strftime("%Y-%m-%d")
-            ].item()
-            last_timesteps["data"].append(
-                datetime.datetime.combine(
-                    cluster_date[cluster_date == cluster].index[0].date(),
-                    dataset.timesteps.to_index().time[-1],
-                )
-            )
-        dataset["lookup_datestep_last_cluster_timestep"] = xr.DataArray.from_dict(
-            last_timesteps
+        # First date in the clustered timeseries of each cluster
+        cluster_first_date = (
+            cluster_date.index.to_series().groupby(cluster_date.values).first()
+        )
+        datestep_clusters = dataset.lookup_datestep_cluster.loc[
+            dataset.datesteps.to_index().strftime("%Y-%m-%d")
+        ].values
+        # Last timestep of each date, which can differ between dates if they
+        # have been segmented
+        last_timestep = pd.Series(timesteps).groupby(timesteps.normalize()).last()
+        dataset["lookup_datestep_last_cluster_timestep"] = xr.DataArray(
+            last_timestep.loc[
+                cluster_first_date.loc[datestep_clusters].dt.normalize().values
+            ].values,
+            dims=["datesteps"],
         )
 
     return dataset